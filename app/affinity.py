@@ -0,0 +1,289 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from db import get_connection
+
+AFFINITY_BUILD_BATCH = 100000
+AFFINITY_RETRY_MAX = float(os.environ.get("AFFINITY_RETRY_MAX", "300"))  # longest wait between failed builds, seconds
+_SHIFT = np.int64(32)
+_LOW = np.int64(0xFFFFFFFF)
+
+
+def basket_pairs(baskets, items):
+    """All within-basket pairs (i < j) for rows sorted by basket.
+
+    `baskets` and `items` are parallel int arrays; rows of one basket must be
+    contiguous and items within a basket distinct. Returns pair keys
+    (i << 32 | j) without building any per-basket Python objects.
+    """
+    if len(items) < 2:
+        return np.empty(0, dtype=np.int64)
+    # Sort items within each basket so every pair comes out as (smaller, larger)
+    order = np.lexsort((items, baskets))
+    baskets, items = baskets[order], items[order]
+    starts = np.flatnonzero(np.r_[True, baskets[1:] != baskets[:-1]])
+    sizes = np.diff(np.r_[starts, len(items)])
+    ends = np.repeat(starts + sizes, sizes)
+    # Element at position p pairs with every later element of its basket
+    partners = ends - np.arange(len(items)) - 1
+    left = np.repeat(np.arange(len(items)), partners)
+    # Offset of each pair within its left element's run: 1, 2, ..., partners[p]
+    run_starts = np.repeat(np.cumsum(partners) - partners, partners)
+    right = left + 1 + (np.arange(len(left)) - run_starts)
+    return (items[left].astype(np.int64) << _SHIFT) | items[right].astype(np.int64)
+
+
+class AffinityEngine:
+    """Sparse product x product co-occurrence counts kept in memory.
+
+    Products are mapped to compact integer indexes and each co-purchased
+    pair (i < j) is stored once as a 64-bit key in a sorted array with a
+    parallel count array. The matrix is built in one streaming pass over
+    order_items and then updated with every checkout's basket; updates are
+    buffered and merged on the next read. Support, confidence and lift for
+    all pairs are computed with array arithmetic at read time.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._index = {}
+        self._product_ids = []
+        self._names = []
+        self._item_orders = np.zeros(0, dtype=np.int64)   # baskets containing product i
+        self._keys = np.empty(0, dtype=np.int64)           # sorted pair keys
+        self._counts = np.empty(0, dtype=np.int64)
+        self._pending = []                                 # pair keys from baskets not merged yet
+        self._num_baskets = 0
+        self._multi_item_baskets = 0                       # baskets with at least one pair
+        self._building = False
+        self._build_buffer = []
+        self._started = False
+        self.ready = False
+        self.built_at = None
+        self.build_seconds = None
+
+    # === Building ===
+
+    def _product_index(self, product_id, name=None):
+        product_id = str(product_id)
+        i = self._index.get(product_id)
+        if i is None:
+            i = len(self._product_ids)
+            self._index[product_id] = i
+            self._product_ids.append(product_id)
+            self._names.append(name if name is not None else product_id)
+            if i >= len(self._item_orders):
+                grown = np.zeros(max(16, 2 * len(self._item_orders)), dtype=np.int64)
+                grown[:len(self._item_orders)] = self._item_orders
+                self._item_orders = grown
+        elif name is not None:
+            self._names[i] = name
+        return i
+
+    def _add_chunk(self, baskets, items):
+        """Fold a chunk of (basket, item) rows with distinct items per basket into the counts"""
+        keys = basket_pairs(baskets, items)
+        np.add.at(self._item_orders, items, 1)
+        basket_ids, sizes = np.unique(baskets, return_counts=True)
+        self._num_baskets += len(basket_ids)
+        self._multi_item_baskets += int(np.count_nonzero(sizes > 1))
+        self._pending.append(keys)
+
+    def _merge_pending(self):
+        if not self._pending:
+            return
+        keys = np.concatenate([self._keys, *self._pending])
+        counts = np.concatenate([self._counts, np.ones(len(keys) - len(self._keys), dtype=np.int64)])
+        self._keys, inverse = np.unique(keys, return_inverse=True)
+        self._counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        self._pending = []
+
+    def build(self, conn, batch_size=AFFINITY_BUILD_BATCH, order_items_table="order_items", products_table="products"):
+        """Rebuild the matrix from order_items in a single streaming pass"""
+        with self._lock:
+            self._building = True
+            self._build_buffer = []
+        try:
+            fresh = AffinityEngine()
+            start = time.perf_counter()
+            conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+            cur = conn.cursor()
+            cur.execute(f"SELECT product_id, name FROM {products_table}")
+            for product_id, name in cur.fetchall():
+                fresh._product_index(product_id, name)
+            cur.close()
+
+            with conn.cursor(name="affinity_build") as cur:
+                cur.itersize = batch_size
+                cur.execute(f"SELECT DISTINCT order_id, product_id FROM {order_items_table} ORDER BY order_id")
+                carry_order, carry_items = None, []
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    baskets, items = [], []
+                    basket_no = 0
+                    # A basket may straddle two batches, so its rows are carried into the next one
+                    for order_id, product_id in rows:
+                        if order_id != carry_order:
+                            if carry_items:
+                                baskets.extend([basket_no] * len(carry_items))
+                                items.extend(carry_items)
+                                basket_no += 1
+                            carry_order, carry_items = order_id, []
+                        carry_items.append(fresh._product_index(product_id))
+                    if baskets:
+                        fresh._add_chunk(np.array(baskets, dtype=np.int64), np.array(items, dtype=np.int64))
+                if carry_items:
+                    fresh._add_chunk(np.zeros(len(carry_items), dtype=np.int64), np.array(carry_items, dtype=np.int64))
+            fresh._merge_pending()
+
+            with self._lock:
+                # Checkouts that committed while the pass ran are replayed unless the snapshot already had them
+                buffered = self._build_buffer
+                missing = set()
+                if buffered:
+                    cur = conn.cursor()
+                    cur.execute("""
+                        SELECT o.id FROM unnest(%s::uuid[]) AS o(id)
+                        WHERE NOT EXISTS (SELECT 1 FROM order_items oi WHERE oi.order_id = o.id)
+                    """, ([order_id for order_id, _ in buffered],))
+                    missing = {str(row[0]) for row in cur.fetchall()}
+                    cur.close()
+                for order_id, product_ids in buffered:
+                    if str(order_id) in missing:
+                        fresh._add_basket(product_ids)
+                fresh._merge_pending()
+                self._adopt(fresh)
+                self._building = False
+                self._build_buffer = []
+                self.ready = True
+                self.built_at = time.time()
+                self.build_seconds = time.perf_counter() - start
+        finally:
+            with self._lock:
+                self._building = False
+            conn.rollback()
+            conn.set_session(isolation_level="DEFAULT", readonly="DEFAULT")
+
+    def _adopt(self, other):
+        self._index, self._product_ids, self._names = other._index, other._product_ids, other._names
+        self._item_orders, self._keys, self._counts = other._item_orders, other._keys, other._counts
+        self._pending = other._pending
+        self._num_baskets, self._multi_item_baskets = other._num_baskets, other._multi_item_baskets
+
+    def _add_basket(self, product_ids):
+        items = np.array(sorted({self._product_index(p) for p in product_ids}), dtype=np.int64)
+        if len(items):
+            self._add_chunk(np.zeros(len(items), dtype=np.int64), items)
+
+    def add_order(self, order_id, product_ids):
+        """Count one checked-out basket"""
+        with self._lock:
+            if self._building:
+                self._build_buffer.append((order_id, list(product_ids)))
+            if self.ready:
+                self._add_basket(product_ids)
+
+    # === Reading ===
+
+    def _metrics(self, keys, counts):
+        left = (keys >> _SHIFT).astype(np.int64)
+        right = (keys & _LOW).astype(np.int64)
+        n = max(self._num_baskets, 1)
+        support = counts / n
+        left_support = self._item_orders[left] / n
+        right_support = self._item_orders[right] / n
+        confidence = counts / np.maximum(self._item_orders[left], 1)
+        lift = support / np.maximum(left_support * right_support, 1e-12)
+        return left, right, support, confidence, lift
+
+    def top_pairs(self, k=10):
+        """Most co-purchased pairs as (name1, name2, count, affinity %, confidence, lift)"""
+        with self._lock:
+            self._merge_pending()
+            keys, counts = self._keys, self._counts
+            if not len(keys):
+                return []
+            k = min(k, len(keys))
+            top = np.argpartition(-counts, k - 1)[:k]
+            top = top[np.argsort(-counts[top], kind="stable")]
+            left, right, _, confidence, lift = self._metrics(keys[top], counts[top])
+            multi = max(self._multi_item_baskets, 1)
+            return [
+                (self._names[l], self._names[r], int(c), round(int(c) * 100.0 / multi, 2), round(float(conf), 3), round(float(li), 2))
+                for l, r, c, conf, li in zip(left, right, counts[top], confidence, lift)
+            ]
+
+    def frequently_bought_with(self, product_id, k=5):
+        """Top-k products co-purchased with `product_id`, with support/confidence/lift from its side"""
+        with self._lock:
+            self._merge_pending()
+            i = self._index.get(str(product_id))
+            if i is None or not len(self._keys):
+                return []
+            left = self._keys >> _SHIFT
+            right = self._keys & _LOW
+            mask = (left == i) | (right == i)
+            keys, counts = self._keys[mask], self._counts[mask]
+            if not len(keys):
+                return []
+            others = np.where((keys >> _SHIFT) == i, keys & _LOW, keys >> _SHIFT)
+            k = min(k, len(keys))
+            top = np.argpartition(-counts, k - 1)[:k]
+            top = top[np.argsort(-counts[top], kind="stable")]
+            n = max(self._num_baskets, 1)
+            counts, others = counts[top], others[top]
+            support = counts / n
+            confidence = counts / max(self._item_orders[i], 1)
+            lift = confidence / np.maximum(self._item_orders[others] / n, 1e-12)
+            return [
+                {
+                    "product_id": self._product_ids[o],
+                    "name": self._names[o],
+                    "times_bought_together": int(c),
+                    "support": round(float(s), 5),
+                    "confidence": round(float(conf), 4),
+                    "lift": round(float(li), 3),
+                }
+                for o, c, s, conf, li in zip(others, counts, support, confidence, lift)
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "products": len(self._product_ids),
+                "pairs": int(len(self._keys)),
+                "baskets": self._num_baskets,
+                "built_at": self.built_at,
+                "build_seconds": self.build_seconds,
+                "memory_bytes": int(self._keys.nbytes + self._counts.nbytes + self._item_orders.nbytes),
+            }
+
+    def start(self):
+        """Build in a background thread; pages fall back to mv_product_affinity until it is ready"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._build_in_background, name="affinity-build", daemon=True).start()
+
+    def _build_in_background(self):
+        # Retried until it succeeds (e.g. the database was not up yet), backing off from 1s
+        delay = 1.0
+        while True:
+            try:
+                with get_connection() as conn:
+                    self.build(conn)
+                return
+            except Exception as e:
+                print(f"Affinity engine build failed, retrying in {delay:g}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, AFFINITY_RETRY_MAX)
+
+
+affinity_engine = AffinityEngine()
@@ -0,0 +1,250 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from cache import result_cache, ttl_from_env
+from db import get_connection
+
+BEHAVIOR_WORKERS = int(os.environ.get("BEHAVIOR_WORKERS", "5"))
+BEHAVIOR_UNIT_TIMEOUT = float(os.environ.get("BEHAVIOR_UNIT_TIMEOUT", "30"))   # seconds before a unit's query is cancelled
+BEHAVIOR_PAGE_WAIT = float(os.environ.get("BEHAVIOR_PAGE_WAIT", "2"))          # seconds a page waits for units in flight
+
+
+class AnalysisUnit:
+    """One independently computed, cached and timed part of /customer-behavior"""
+
+    def __init__(self, name, sql, tables, parse, ttl):
+        self.name = name
+        self.sql = sql
+        self.tables = tables
+        self.parse = parse
+        self.ttl = ttl
+
+
+UNITS = [
+    AnalysisUnit(
+        "customer_segments",
+        """
+            WITH customer_segments AS (
+                -- Segment customers based on their spending and order frequency
+                SELECT
+                    u.user_id,
+                    CASE
+                        WHEN COUNT(DISTINCT o.order_id) >= 5 AND SUM(o.total_amount) >= 1000 THEN 'VIP'
+                        WHEN COUNT(DISTINCT o.order_id) >= 3 AND SUM(o.total_amount) >= 500 THEN 'Regular'
+                        ELSE 'Casual'
+                    END as customer_segment
+                FROM users u
+                LEFT JOIN orders o ON u.user_id = o.user_id
+                GROUP BY u.user_id
+            )
+            SELECT
+                COUNT(*) FILTER (WHERE customer_segment = 'VIP') as vip_customers,
+                COUNT(*) FILTER (WHERE customer_segment = 'Regular') as regular_customers,
+                COUNT(*) FILTER (WHERE customer_segment = 'Casual') as casual_customers
+            FROM customer_segments;
+        """,
+        ("users", "orders"),
+        lambda row: {"vip": row[0], "regular": row[1], "casual": row[2]},
+        ttl_from_env("customer_segments", 600),
+    ),
+    AnalysisUnit(
+        "product_performance",
+        """
+            WITH product_performance AS (
+                -- Month-over-month change in each product's order count
+                SELECT
+                    ROUND(
+                        (COUNT(DISTINCT oi.order_id) * 100.0 /
+                        LAG(COUNT(DISTINCT oi.order_id)) OVER (PARTITION BY oi.product_id ORDER BY DATE_TRUNC('month', oi.order_date)) - 100),
+                        2
+                    ) as monthly_growth_rate
+                FROM order_items oi
+                GROUP BY oi.product_id, DATE_TRUNC('month', oi.order_date)
+            )
+            SELECT
+                COUNT(*) FILTER (WHERE monthly_growth_rate > 0) as growing_products,
+                COUNT(*) FILTER (WHERE monthly_growth_rate < 0) as declining_products
+            FROM product_performance;
+        """,
+        ("order_items",),
+        lambda row: {"growing": row[0], "declining": row[1]},
+        ttl_from_env("product_performance", 600),
+    ),
+    AnalysisUnit(
+        "category_analysis",
+        """
+            SELECT p.category
+            FROM products p
+            JOIN order_items oi ON p.product_id = oi.product_id
+            GROUP BY p.category
+            ORDER BY SUM(oi.quantity * oi.unit_price) DESC
+            LIMIT 1;
+        """,
+        ("products", "order_items"),
+        lambda row: {"top_category": row[0] if row else None},
+        ttl_from_env("category_analysis", 600),
+    ),
+    AnalysisUnit(
+        "repeat_customers",
+        """
+            WITH category_customers AS (
+                SELECT p.category, o.user_id, COUNT(DISTINCT o.order_id) as orders_count
+                FROM products p
+                JOIN order_items oi ON p.product_id = oi.product_id
+                JOIN orders o ON oi.order_id = o.order_id AND oi.order_date = o.order_date
+                GROUP BY p.category, o.user_id
+            ),
+            category_totals AS (
+                SELECT category, COUNT(*) as unique_customers
+                FROM category_customers
+                GROUP BY category
+            )
+            -- Average, over every repeat (category, customer) pair, of 100 / customers in that category
+            SELECT ROUND(AVG(100.0 / ct.unique_customers), 2) as avg_category_retention
+            FROM category_customers cc
+            JOIN category_totals ct ON ct.category = cc.category
+            WHERE cc.orders_count > 1;
+        """,
+        ("products", "orders", "order_items"),
+        lambda row: {"avg_retention": row[0]},
+        ttl_from_env("repeat_customers_by_category", 600),
+    ),
+    AnalysisUnit(
+        "time_analysis",
+        """
+            SELECT EXTRACT(HOUR FROM order_date) as hour_of_day, EXTRACT(DOW FROM order_date) as day_of_week
+            FROM orders
+            GROUP BY hour_of_day, day_of_week
+            ORDER BY COUNT(*) DESC
+            LIMIT 1;
+        """,
+        ("orders",),
+        lambda row: {"peak_hour": int(row[0]), "peak_day": int(row[1])} if row else {"peak_hour": None, "peak_day": None},
+        ttl_from_env("time_analysis", 600),
+    ),
+]
+
+
+class BehaviorAnalysis:
+    """Runs the customer-behavior units concurrently over pooled connections.
+
+    Each unit's result is cached on its own with its own table tags, so a
+    checkout only recomputes the units it affects. A page waits at most
+    BEHAVIOR_PAGE_WAIT seconds for units in flight; units that are not back
+    by then are shown from their last good result ("stale") or as
+    "pending", and finish in the background for the next view. Every unit
+    query runs under its own statement_timeout.
+    """
+
+    def __init__(self, units=UNITS, workers=BEHAVIOR_WORKERS, unit_timeout=BEHAVIOR_UNIT_TIMEOUT):
+        self.units = {unit.name: unit for unit in units}
+        self.unit_timeout = unit_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="behavior")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._last_good = {}     # unit -> (value, computed_at)
+        self._errors = {}
+        self._timings = {name: {"runs": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": None} for name in self.units}
+
+    def _compute(self, unit):
+        start = time.perf_counter()
+        try:
+            with get_connection() as conn:
+                cur = conn.cursor()
+                cur.execute("SET LOCAL statement_timeout = %s", (int(self.unit_timeout * 1000),))
+                cur.execute(unit.sql)
+                value = unit.parse(cur.fetchone())
+                cur.close()
+        except Exception as e:
+            with self._lock:
+                self._errors[unit.name] = str(e)
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                t = self._timings[unit.name]
+                t["runs"] += 1
+                t["total_ms"] += elapsed_ms
+                t["max_ms"] = max(t["max_ms"], elapsed_ms)
+                t["last_ms"] = elapsed_ms
+        with self._lock:
+            self._last_good[unit.name] = (value, time.time())
+            self._errors.pop(unit.name, None)
+        return value
+
+    def _submit(self, unit):
+        """Start (or join) a recompute of `unit`; the result lands in the result cache"""
+        with self._lock:
+            future = self._in_flight.get(unit.name)
+            if future is not None:
+                return future
+            generation = result_cache.generation(unit.tables)
+
+            def run():
+                try:
+                    value = self._compute(unit)
+                    result_cache.set(("behavior", unit.name), value, unit.ttl, unit.tables, generation)
+                    return value
+                finally:
+                    with self._lock:
+                        self._in_flight.pop(unit.name, None)
+
+            future = self._executor.submit(run)
+            self._in_flight[unit.name] = future
+            return future
+
+    def snapshot(self, wait_seconds=BEHAVIOR_PAGE_WAIT):
+        """Current value and status of every unit, waiting briefly for any recompute it starts"""
+        values, futures = {}, {}
+        for name, unit in self.units.items():
+            hit, value = result_cache.get(("behavior", name))
+            if hit:
+                values[name] = value
+            else:
+                futures[name] = self._submit(unit)
+        if futures:
+            wait(list(futures.values()), timeout=wait_seconds)
+
+        now = time.time()
+        units = {}
+        for name in self.units:
+            future = futures.get(name)
+            if future is None:
+                status = "ready"
+            elif future.done() and future.exception() is None:
+                values[name] = future.result()
+                status = "ready"
+            else:
+                status = "failed" if future.done() else "pending"
+            with self._lock:
+                last_good = self._last_good.get(name)
+                error = self._errors.get(name) if status == "failed" else None
+                last_ms = self._timings[name]["last_ms"]
+            if name not in values and last_good is not None:
+                values[name] = last_good[0]
+                status = "stale" if status == "pending" else status
+            units[name] = {
+                "status": status,
+                "age_seconds": round(now - last_good[1], 1) if last_good else None,
+                "duration_ms": round(last_ms, 1) if last_ms is not None else None,
+                "error": error,
+            }
+        return values, units
+
+    def timings(self):
+        """Per-unit run count and last/avg/max duration, to see which analysis dominates"""
+        with self._lock:
+            return {
+                name: {
+                    "runs": t["runs"],
+                    "last_ms": round(t["last_ms"], 1) if t["last_ms"] is not None else None,
+                    "avg_ms": round(t["total_ms"] / t["runs"], 1) if t["runs"] else None,
+                    "max_ms": round(t["max_ms"], 1),
+                }
+                for name, t in self._timings.items()
+            }
+
+
+behavior_analysis = BehaviorAnalysis()
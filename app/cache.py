@@ -0,0 +1,173 @@
+import functools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "1") != "0"
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "1024"))
+
+
+def ttl_from_env(name, default):
+    """TTL in seconds for a cached result, overridable with CACHE_TTL_<NAME>"""
+    return float(os.environ.get(f"CACHE_TTL_{name.upper()}", default))
+
+
+def estimate_size(value):
+    """Approximate deep size in bytes of a query result (rows of tuples/dicts/scalars)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v) for v in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size", "tables")
+
+    def __init__(self, value, expires_at, size, tables):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.tables = tables
+
+
+class ResultCache:
+    """Bounded in-process cache for dashboard query results.
+
+    Entries expire after a per-entry TTL, the least recently used entries are
+    evicted once the entry count or the estimated memory footprint is over
+    its cap, and every entry is tagged with the tables it was computed from
+    so a write can drop exactly the results it makes stale. Each process has
+    its own cache, so with several workers a write only clears the worker
+    that handled it and the others catch up when their TTL runs out.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES, max_entries=RESULT_CACHE_MAX_ENTRIES,
+                 enabled=RESULT_CACHE_ENABLED):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._by_table = defaultdict(set)
+        # Bumped on every invalidation so a result computed while a write was
+        # committing is not stored over the invalidation
+        self._generations = defaultdict(int)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._counters = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def generation(self, tables):
+        with self._lock:
+            return tuple(self._generations[t] for t in tables)
+
+    def get(self, key):
+        """Return (True, value) on a live hit, else (False, None)"""
+        name = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                self._counters[name]["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._counters[name]["hits"] += 1
+            return True, entry.value
+
+    def set(self, key, value, ttl, tables, generation=None):
+        if not self.enabled or ttl <= 0:
+            return
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation(tables):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, time.monotonic() + ttl, size, tuple(tables))
+            self._bytes += size
+            for table in tables:
+                self._by_table[table].add(key)
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def invalidate(self, *tables):
+        """Drop every cached result that was computed from any of `tables`"""
+        with self._lock:
+            for table in tables:
+                self._generations[table] += 1
+                for key in list(self._by_table.get(table, ())):
+                    if key in self._entries:
+                        self._remove(key)
+                        self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def cached(self, name, ttl, tables):
+        """Decorator caching a function's result under `name` plus its arguments"""
+        tables = tuple(tables)
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                key = (name, args, tuple(sorted(kwargs.items())))
+                hit, value = self.get(key)
+                if hit:
+                    return value
+                generation = self.generation(tables)
+                value = fn(*args, **kwargs)
+                self.set(key, value, ttl, tables, generation)
+                return value
+
+            wrapper.cache_name = name
+            return wrapper
+
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            hits = sum(c["hits"] for c in self._counters.values())
+            misses = sum(c["misses"] for c in self._counters.values())
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+                "by_name": {name: dict(c) for name, c in self._counters.items()},
+            }
+
+
+result_cache = ResultCache()
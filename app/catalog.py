@@ -0,0 +1,73 @@
+import base64
+import json
+import os
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+CATALOG_PAGE_SIZE = int(os.environ.get("CATALOG_PAGE_SIZE", "48"))
+CATALOG_STREAM_BATCH = int(os.environ.get("CATALOG_STREAM_BATCH", "500"))  # rows fetched per round trip when streaming
+
+# sort -> (ORDER BY, seek predicate, column holding the sort value). Each order is
+# walked by one of the partial indexes on products (is_active), forwards or backwards,
+# and product_id breaks ties so every row has exactly one position in the order.
+SORTS = {
+    "newest": ("created_at DESC, product_id DESC", "(created_at, product_id) < (%s, %s)", "created_at"),
+    "price_low": ("price ASC, product_id ASC", "(price, product_id) > (%s, %s)", "price"),
+    "price_high": ("price DESC, product_id DESC", "(price, product_id) < (%s, %s)", "price"),
+}
+
+
+def encode_cursor(sort_value, product_id):
+    """Opaque `after` token for the row a page ended on"""
+    value = sort_value.isoformat() if isinstance(sort_value, datetime) else str(sort_value)
+    raw = json.dumps([value, str(product_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(sort, token):
+    """(sort value, product_id) from an `after` token, or None if it is missing or malformed"""
+    if not token:
+        return None
+    try:
+        value, product_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        value = datetime.fromisoformat(value) if SORTS[sort][2] == "created_at" else Decimal(value)
+        return value, str(uuid.UUID(product_id))
+    except (ValueError, TypeError, AttributeError, ArithmeticError):
+        return None
+
+
+def _query(sort, after):
+    order_by, seek, key = SORTS[sort]
+    query = f"""
+        SELECT product_id, name, price, category, {key}
+        FROM products
+        WHERE is_active = TRUE
+    """
+    if after is not None:
+        query += f" AND {seek}"
+    return query + f" ORDER BY {order_by}"
+
+
+def fetch_page(conn, sort="newest", after=None, limit=CATALOG_PAGE_SIZE):
+    """One page of active products after the `after` cursor.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page. Cost
+    is an index seek plus `limit` rows no matter how deep the page is.
+    """
+    cur = conn.cursor()
+    cur.execute(_query(sort, after) + " LIMIT %s;", (*(after or ()), limit + 1))
+    rows = cur.fetchall()
+    cur.close()
+    next_cursor = encode_cursor(rows[limit - 1][4], rows[limit - 1][0]) if len(rows) > limit else None
+    return [row[:4] for row in rows[:limit]], next_cursor
+
+
+def stream_products(conn, sort="newest", after=None, batch_size=CATALOG_STREAM_BATCH):
+    """Yield every active product after `after` through a server-side cursor, batch_size rows per round trip"""
+    with conn.cursor(name="catalog_stream") as cur:
+        cur.itersize = batch_size
+        cur.execute(_query(sort, after), after or ())
+        for row in cur:
+            yield row[:4]
+    conn.rollback()
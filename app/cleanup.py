@@ -14,6 +14,8 @@ def cleanup_postgres():
         
         # Drop all tables
         cur.execute("""
+            DROP TABLE IF EXISTS product_rating_stats CASCADE;
+            DROP TABLE IF EXISTS product_sales_stats CASCADE;
             DROP TABLE IF EXISTS reviews CASCADE;
             DROP TABLE IF EXISTS order_items CASCADE;
             DROP TABLE IF EXISTS orders CASCADE;
@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool
+from pymongo import MongoClient
+
+# === Database connection settings ===
+DB_NAME = os.environ.get("DB_NAME", "postgres")
+DB_USER = os.environ.get("DB_USER", "carterrobinson")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "")
+DB_HOST = os.environ.get("DB_HOST", "localhost")
+DB_PORT = os.environ.get("DB_PORT", "5432")
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME", "ecommerce_mongodb")
+
+# === Pool settings ===
+PG_POOL_MIN = int(os.environ.get("PG_POOL_MIN", "1"))
+PG_POOL_MAX = int(os.environ.get("PG_POOL_MAX", "10"))
+PG_POOL_TIMEOUT = float(os.environ.get("PG_POOL_TIMEOUT", "5"))          # seconds to wait for a free connection
+PG_CONNECT_TIMEOUT = int(os.environ.get("PG_CONNECT_TIMEOUT", "5"))      # seconds for the TCP/auth handshake
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_TIMEOUT_MS = int(os.environ.get("MONGO_TIMEOUT_MS", "5000"))
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within PG_POOL_TIMEOUT"""
+
+
+class PostgresPool:
+    """Bounded, thread-safe pool of PostgreSQL connections.
+
+    psycopg2's ThreadedConnectionPool raises as soon as it is exhausted, so
+    checkouts are gated by a semaphore that lets callers wait up to
+    `timeout` seconds for a connection to be returned.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, **conn_kwargs):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, **conn_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def getconn(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(f"No database connection available after {self.timeout}s")
+        waited = time.perf_counter() - start
+        try:
+            conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return conn
+
+    def putconn(self, conn):
+        # Never hand a broken or mid-transaction connection to the next request
+        close = bool(conn.closed)
+        if not close:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                close = True
+        try:
+            self._pool.putconn(conn, close=close)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_size": self.maxconn,
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "utilization": round(self._in_use / self.maxconn, 3),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._total_wait / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_pg_pool = None
+_mongo_client = None
+_init_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide PostgreSQL pool, creating it on first use"""
+    global _pg_pool
+    if _pg_pool is None:
+        with _init_lock:
+            if _pg_pool is None:
+                _pg_pool = PostgresPool(
+                    PG_POOL_MIN,
+                    PG_POOL_MAX,
+                    PG_POOL_TIMEOUT,
+                    dbname=DB_NAME,
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    connect_timeout=PG_CONNECT_TIMEOUT,
+                )
+    return _pg_pool
+
+
+@contextmanager
+def get_connection():
+    """Check a connection out of the pool for the duration of a `with` block.
+
+    Anything not committed inside the block is rolled back when the
+    connection is returned.
+    """
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    try:
+        yield conn
+    finally:
+        db_pool.putconn(conn)
+
+
+def get_mongo_client():
+    """Return the process-wide MongoClient (it maintains its own connection pool)"""
+    global _mongo_client
+    if _mongo_client is None:
+        with _init_lock:
+            if _mongo_client is None:
+                _mongo_client = MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+                )
+    return _mongo_client
+
+
+def get_mongo_db():
+    return get_mongo_client()[MONGO_DB_NAME]
+
+
+def pool_stats():
+    """Wait time and utilization figures for the /pool-stats endpoint"""
+    stats = {"postgres": get_pool().stats() if _pg_pool is not None else None}
+    if _mongo_client is not None:
+        options = _mongo_client.options.pool_options
+        stats["mongodb"] = {"max_size": options.max_pool_size, "min_size": options.min_pool_size}
+    else:
+        stats["mongodb"] = None
+    return stats
+
+
+def close_all():
+    global _pg_pool, _mongo_client
+    with _init_lock:
+        if _pg_pool is not None:
+            _pg_pool.closeall()
+            _pg_pool = None
+        if _mongo_client is not None:
+            _mongo_client.close()
+            _mongo_client = None
@@ -1,14 +1,32 @@
+import argparse
+import itertools
 import psycopg2
 from pymongo import MongoClient
 import random
-from datetime import datetime, timedelta
-import uuid
+from datetime import datetime, timedelta, timezone
 import names
 from faker import Faker
 
+import ids
+
 # Initialize Faker for realistic data
 fake = Faker()
 
+# With --seed, the history ends here instead of now, and v7 keys are stamped one
+# millisecond apart from it instead of by the clock, so the dataset repeats exactly
+SEEDED_HISTORY_END = datetime(2026, 1, 1)
+history_end = None     # None: now
+id_clock = None        # milliseconds for seeded v7 keys
+
+def new_id():
+    """A key of the configured UUID_VERSION whose random bits come from `random`, so --seed fixes them"""
+    return ids.new_id(random, next(id_clock) if id_clock else None)
+
+def random_date():
+    """A timestamp within the year before the end of the history"""
+    end = history_end or datetime.now()
+    return fake.date_time_between(start_date=end - timedelta(days=365), end_date=end)
+
 # Database connections
 def get_pg_connection():
     return psycopg2.connect(
@@ -28,11 +46,11 @@ def generate_users(num_users=100):
     users_mongo = []
     
     for _ in range(num_users):
-        user_id = str(uuid.uuid4())
+        user_id = new_id()
         name = names.get_full_name()
         email = fake.email()
         signup_source = random.choice(['organic', 'referral', 'social', 'paid'])
-        created_at = fake.date_time_between(start_date='-1y', end_date='now')
+        created_at = random_date()
         
         # PostgreSQL format
         users_pg.append((
@@ -61,12 +79,12 @@ def generate_products(num_products=50):
     products_mongo = []
     
     for _ in range(num_products):
-        product_id = str(uuid.uuid4())
+        product_id = new_id()
         name = fake.catch_phrase()
         category = random.choice(categories)
         price = round(random.uniform(10, 1000), 2)
         description = fake.text(max_nb_chars=200)
-        created_at = fake.date_time_between(start_date='-1y', end_date='now')
+        created_at = random_date()
         is_active = random.choice([True, True, True, False])  # 75% active
         
         # PostgreSQL format
@@ -100,9 +118,9 @@ def generate_orders(users, products, num_orders=200):
     orders_mongo = []
     
     for _ in range(num_orders):
-        order_id = str(uuid.uuid4())
+        order_id = new_id()
         user = random.choice(users)
-        order_date = fake.date_time_between(start_date='-1y', end_date='now')
+        order_date = random_date()
         status = random.choice(['completed', 'completed', 'completed', 'cancelled'])
         
         # Generate 1-5 items per order
@@ -121,13 +139,14 @@ def generate_orders(users, products, num_orders=200):
         
         # PostgreSQL order items
         for product in order_items:
-            order_item_id = str(uuid.uuid4())
+            order_item_id = new_id()
             quantity = random.randint(1, 3)
             unit_price = product[3]  # price
             
             order_items_pg.append((
                 order_item_id,
                 order_id,
+                order_date,
                 product[0],  # product_id
                 quantity,
                 unit_price
@@ -158,12 +177,12 @@ def generate_reviews(users, products, num_reviews=300):
     reviews_mongo = []
     
     for _ in range(num_reviews):
-        review_id = str(uuid.uuid4())
+        review_id = new_id()
         user = random.choice(users)
         product = random.choice(products)
         rating = random.randint(1, 5)
         comment = fake.text(max_nb_chars=200)
-        review_date = fake.date_time_between(start_date='-1y', end_date='now')
+        review_date = random_date()
         
         # PostgreSQL format
         reviews_pg.append((
@@ -188,6 +207,18 @@ def generate_reviews(users, products, num_reviews=300):
     return reviews_pg, reviews_mongo
 
 def main():
+    global history_end, id_clock
+    parser = argparse.ArgumentParser(description="Regenerate a small dataset in both PostgreSQL and MongoDB")
+    parser.add_argument("--seed", type=int,
+                        help=f"seed random, names, Faker and the ids, and end the history at "
+                             f"{SEEDED_HISTORY_END:%Y-%m-%d}, for a repeatable dataset")
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)   # names draws from the global random module too
+        Faker.seed(args.seed)
+        history_end = SEEDED_HISTORY_END
+        id_clock = itertools.count(int(history_end.replace(tzinfo=timezone.utc).timestamp() * 1000))
+
     print("Starting data generation...")
     
     # Generate data
@@ -218,6 +249,12 @@ def main():
             VALUES (%s, %s, %s, %s, %s, %s, %s)
         """, products_pg)
         
+        # Monthly partitions for the generated history
+        first_order = min(order[2] for order in orders_pg)
+        last_order = max(order[2] for order in orders_pg)
+        for table in ('orders', 'order_items'):
+            cur.execute("SELECT create_monthly_partitions(%s, %s, %s)", (table, first_order.date(), last_order.date()))
+
         print("Inserting orders...")
         cur.executemany("""
             INSERT INTO orders (order_id, user_id, order_date, status, total_amount)
@@ -226,8 +263,8 @@ def main():
         
         print("Inserting order items...")
         cur.executemany("""
-            INSERT INTO order_items (order_item_id, order_id, product_id, quantity, unit_price)
-            VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO order_items (order_item_id, order_id, order_date, product_id, quantity, unit_price)
+            VALUES (%s, %s, %s, %s, %s, %s)
         """, order_items_pg)
         
         print("Inserting reviews...")
@@ -238,6 +275,7 @@ def main():
         
         conn.commit()
         print("PostgreSQL data generation complete!")
+        print("Run `python rollups.py backfill` to rebuild the rating/sales rollups.")
         
     except Exception as e:
         print(f"PostgreSQL error: {str(e)}")
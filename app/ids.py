@@ -0,0 +1,48 @@
+import os
+import threading
+import time
+import uuid
+
+# 7 (default): time-ordered UUIDs, so inserts append to the right edge of each primary key
+# index; 4: random uuid4() keys, as before
+UUID_VERSION = int(os.environ.get("UUID_VERSION", "7"))
+
+# The same choice for keys generated inside SQL statements (see database/migrations/0005_uuid_v7.sql)
+NEW_ID_SQL = "uuid_generate_v7()" if UUID_VERSION == 7 else "gen_random_uuid()"
+
+_lock = threading.Lock()
+_last = {"ms": 0, "counter": 0}
+
+
+def uuid7(rand=None, ms=None):
+    """A version-7 UUID (RFC 9562): 48-bit Unix milliseconds, a 12-bit counter, 62 random bits.
+
+    The counter starts at a random value each millisecond and counts up within it, so ids
+    from one process sort in the order they were made. `rand` is an object with
+    getrandbits() (e.g. a seeded random.Random); os.urandom is used by default. With `ms`
+    the id is stamped with that Unix millisecond instead of the clock and its counter is
+    drawn from `rand` as well, so a seeded caller gets the same ids every run.
+    """
+    if ms is not None:
+        counter = rand.getrandbits(12)
+    else:
+        with _lock:
+            ms = time.time_ns() // 1_000_000
+            if ms > _last["ms"]:
+                _last["ms"], _last["counter"] = ms, int.from_bytes(os.urandom(2), "big") >> 5
+            else:
+                _last["counter"] += 1
+                if _last["counter"] > 0xFFF:
+                    _last["ms"], _last["counter"] = _last["ms"] + 1, 0
+            ms, counter = _last["ms"], _last["counter"]
+    tail = rand.getrandbits(62) if rand is not None else int.from_bytes(os.urandom(8), "big") >> 2
+    return uuid.UUID(int=ms << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | tail)
+
+
+def new_id(rand=None, ms=None):
+    """Text key for a new row, of the configured UUID_VERSION (see uuid7 for `rand` and `ms`)"""
+    if UUID_VERSION == 7:
+        return str(uuid7(rand, ms))
+    if rand is not None:
+        return str(uuid.UUID(int=rand.getrandbits(128), version=4))
+    return str(uuid.uuid4())
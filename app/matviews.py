@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from collections import defaultdict
+
+from cache import result_cache
+from db import get_connection
+
+MATVIEW_REFRESH_INTERVAL = float(os.environ.get("MATVIEW_REFRESH_INTERVAL", "300"))   # seconds between full refreshes
+MATVIEW_REFRESH_AFTER_WRITES = int(os.environ.get("MATVIEW_REFRESH_AFTER_WRITES", "50"))  # 0 = schedule only
+
+# Materialized view -> base tables it is computed from
+MATVIEWS = {
+    "mv_repeat_customers": ("orders",),
+    "mv_product_affinity": ("order_items", "products"),
+}
+
+
+class MatviewRefresher:
+    """Background REFRESH MATERIALIZED VIEW CONCURRENTLY for the analytics views.
+
+    Every view is refreshed on startup and then every `interval` seconds.
+    Writes reported through note_write() count against each view that reads
+    the written tables, and a view that has seen `after_writes` of them is
+    refreshed early. Readers keep using the previous contents while a
+    refresh runs, and an advisory lock keeps several app processes from
+    refreshing the same view at once.
+    """
+
+    def __init__(self, views=MATVIEWS, interval=MATVIEW_REFRESH_INTERVAL, after_writes=MATVIEW_REFRESH_AFTER_WRITES):
+        self.views = views
+        self.interval = interval
+        self.after_writes = after_writes
+        self._pending = defaultdict(int)
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="matview-refresher", daemon=True)
+                self._thread.start()
+
+    def note_write(self, *tables):
+        """Record a committed write to `tables`; wakes the refresher once a view crosses the threshold"""
+        with self._lock:
+            for view, deps in self.views.items():
+                if any(t in deps for t in tables):
+                    self._pending[view] += 1
+                    if self.after_writes and self._pending[view] >= self.after_writes:
+                        self._wake.set()
+
+    def refresh(self, view):
+        """Refresh one view; returns the duration in ms, or None if another process holds it"""
+        with get_connection() as conn:
+            conn.autocommit = True
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (view,))
+                if not cur.fetchone()[0]:
+                    return None
+                try:
+                    start = time.perf_counter()
+                    cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+                    duration_ms = (time.perf_counter() - start) * 1000
+                    cur.execute("""
+                        INSERT INTO matview_refreshes (view_name, refreshed_at, duration_ms)
+                        VALUES (%s, now(), %s)
+                        ON CONFLICT (view_name) DO UPDATE
+                        SET refreshed_at = EXCLUDED.refreshed_at, duration_ms = EXCLUDED.duration_ms
+                    """, (view, duration_ms))
+                finally:
+                    cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (view,))
+                    cur.close()
+            finally:
+                conn.autocommit = False
+        result_cache.invalidate(view)
+        return duration_ms
+
+    def _run(self):
+        next_full = 0.0
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                if now >= next_full:
+                    due = list(self.views)
+                    next_full = now + self.interval
+                else:
+                    due = [v for v, n in self._pending.items() if self.after_writes and n >= self.after_writes]
+                for view in due:
+                    self._pending.pop(view, None)
+                self._wake.clear()
+            for view in due:
+                try:
+                    self.refresh(view)
+                except Exception as e:
+                    print(f"Refreshing {view} failed: {e}")
+            self._wake.wait(timeout=max(0.0, next_full - time.monotonic()))
+
+
+def refresh_status(cur, view):
+    """Last refresh time and duration for `view`, read on the caller's cursor"""
+    cur.execute("SELECT refreshed_at, duration_ms FROM matview_refreshes WHERE view_name = %s", (view,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return {"view": view, "refreshed_at": row[0], "duration_ms": row[1]}
+
+
+matview_refresher = MatviewRefresher()
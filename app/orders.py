@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from ids import NEW_ID_SQL, new_id
+
+# Turns an active cart into an order in one statement: the cart row is locked so a
+# double-submitted checkout cannot convert it twice, identical cart lines are folded
+# into one order item, prices come from `products`, and the order total is summed
+# from the same rows that become order items. The per-product sales rollup is
+# bumped in the same statement so it can never drift from order_items.
+CHECKOUT_SQL = f"""
+    WITH cart AS (
+        SELECT cart_id
+        FROM carts
+        WHERE cart_id = %(cart_id)s AND status = 'active'
+        FOR UPDATE
+    ),
+    items AS (
+        SELECT ci.product_id, COUNT(*) AS quantity, p.price AS unit_price
+        FROM cart c
+        JOIN cart_items ci ON ci.cart_id = c.cart_id
+        JOIN products p ON p.product_id = ci.product_id
+        WHERE ci.removed_at IS NULL
+        GROUP BY ci.product_id, p.price
+    ),
+    new_order AS (
+        INSERT INTO orders (order_id, user_id, order_date, status, total_amount)
+        SELECT %(order_id)s::uuid, %(user_id)s::uuid, %(order_date)s, 'completed', SUM(quantity * unit_price)
+        FROM items
+        HAVING COUNT(*) > 0
+        RETURNING order_id, order_date, total_amount
+    ),
+    new_items AS (
+        INSERT INTO order_items (order_item_id, order_id, order_date, product_id, quantity, unit_price)
+        SELECT {NEW_ID_SQL}, o.order_id, o.order_date, i.product_id, i.quantity, i.unit_price
+        FROM items i
+        CROSS JOIN new_order o
+        RETURNING product_id
+    ),
+    sales AS (
+        INSERT INTO product_sales_stats (product_id, units_sold, revenue, order_count)
+        SELECT i.product_id, i.quantity, i.quantity * i.unit_price, 1
+        FROM items i
+        CROSS JOIN new_order o
+        ON CONFLICT (product_id) DO UPDATE
+        SET units_sold = product_sales_stats.units_sold + EXCLUDED.units_sold,
+            revenue = product_sales_stats.revenue + EXCLUDED.revenue,
+            order_count = product_sales_stats.order_count + EXCLUDED.order_count
+    ),
+    converted AS (
+        UPDATE carts
+        SET status = 'converted'
+        WHERE cart_id = %(cart_id)s AND EXISTS (SELECT 1 FROM new_order)
+        RETURNING cart_id
+    )
+    SELECT o.order_id, o.total_amount, (SELECT array_agg(product_id) FROM new_items), (SELECT COUNT(*) FROM converted)
+    FROM new_order o;
+"""
+
+
+def place_order(conn, cart_id, user_id):
+    """Check out a cart in a single round trip and commit.
+
+    Returns (order_id, total_amount, product_ids), or None when the cart is
+    empty or no longer active.
+    """
+    cur = conn.cursor()
+    cur.execute(CHECKOUT_SQL, {
+        "cart_id": cart_id,
+        "order_id": new_id(),
+        "user_id": user_id,
+        "order_date": datetime.now(),
+    })
+    row = cur.fetchone()
+    conn.commit()
+    cur.close()
+    if row is None:
+        return None
+    order_id, total_amount, product_ids, _ = row
+    return order_id, total_amount, product_ids
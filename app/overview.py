@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from db import get_connection
+
+OVERVIEW_REFRESH_INTERVAL = float(os.environ.get("OVERVIEW_REFRESH_INTERVAL", "300"))  # seconds before a background refresh
+
+# Every table is read once: each derived subquery aggregates one table in a single
+# pass, and the lists ride along as JSON so the whole snapshot is one statement
+# (and therefore one consistent MVCC snapshot). Top products are ranked on the
+# revenue of every order line, whatever the order's status, so they come from
+# order_items rather than the completed-only product_sales_stats rollup.
+OVERVIEW_SQL = """
+    SELECT
+        p.active_products,
+        o.order_count, o.revenue_sum,
+        u.user_count,
+        r.review_count, r.rating_sum,
+        c.cart_count, c.abandoned_count,
+        (
+            SELECT COALESCE(json_agg(t), '[]') FROM (
+                SELECT o.order_id, u.name, o.order_date, o.total_amount, o.status
+                FROM orders o
+                JOIN users u ON o.user_id = u.user_id
+                ORDER BY o.order_date DESC
+                LIMIT 10
+            ) t
+        ) as recent_orders,
+        (
+            SELECT COALESCE(json_agg(t), '[]') FROM (
+                SELECT p.name, s.revenue
+                FROM (
+                    SELECT product_id, SUM(quantity * unit_price) as revenue
+                    FROM order_items
+                    GROUP BY product_id
+                ) s
+                JOIN products p ON p.product_id = s.product_id
+                ORDER BY s.revenue DESC
+                LIMIT 10
+            ) t
+        ) as top_products
+    FROM
+        (SELECT COUNT(*) FILTER (WHERE is_active = TRUE) as active_products FROM products) p,
+        (SELECT COUNT(*) as order_count, COALESCE(SUM(total_amount), 0) as revenue_sum FROM orders) o,
+        (SELECT COUNT(*) as user_count FROM users) u,
+        (SELECT COUNT(*) as review_count, COALESCE(SUM(rating), 0) as rating_sum FROM reviews) r,
+        (SELECT COUNT(*) as cart_count, COUNT(*) FILTER (WHERE status = 'abandoned') as abandoned_count FROM carts) c;
+"""
+
+# Which writes noted during a refresh the snapshot is missing, by the key each
+# write path notes: the order, review or cart it inserted, or the cart it abandoned
+MISSING_WRITES_SQL = """
+    SELECT 'order', k.id FROM unnest(%(order)s::uuid[]) AS k(id)
+    WHERE NOT EXISTS (SELECT 1 FROM orders o WHERE o.order_id = k.id)
+    UNION ALL
+    SELECT 'review', k.id FROM unnest(%(review)s::uuid[]) AS k(id)
+    WHERE NOT EXISTS (SELECT 1 FROM reviews r WHERE r.review_id = k.id)
+    UNION ALL
+    SELECT 'cart', k.id FROM unnest(%(cart)s::uuid[]) AS k(id)
+    WHERE NOT EXISTS (SELECT 1 FROM carts c WHERE c.cart_id = k.id)
+    UNION ALL
+    SELECT 'abandon', k.id FROM unnest(%(abandon)s::uuid[]) AS k(id)
+    WHERE NOT EXISTS (SELECT 1 FROM carts c WHERE c.cart_id = k.id AND c.status = 'abandoned')
+"""
+DELTA_KINDS = ("order", "review", "cart", "abandon")
+
+COUNTERS = (
+    "active_products", "order_count", "revenue_sum", "user_count",
+    "review_count", "rating_sum", "cart_count", "abandoned_count",
+)
+
+
+class OverviewSnapshot:
+    """In-memory statistics for /data-overview.
+
+    The snapshot is loaded with OVERVIEW_SQL and then kept current by the
+    write paths (note_order, note_review, note_cart, note_abandon), so the
+    totals move with every checkout, rating and cart without touching the
+    database. The recent-order and top-product lists are only as fresh as
+    the last refresh, which happens in the background once the snapshot is
+    older than `interval` seconds, or on demand via refresh().
+    """
+
+    def __init__(self, interval=OVERVIEW_REFRESH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._counters = None
+        self._recent_orders = []
+        self._top_products = []
+        self._loaded_at = None
+        self._load_seconds = None
+        self._refresh_started = None   # monotonic start of the refresh in progress
+        self._deltas = []              # (kind, key, counter deltas) noted during a refresh
+
+    # === Loading ===
+
+    def refresh(self, conn=None, wait=False):
+        """Reload the snapshot in one query; returns False if another refresh is already running"""
+        if not self._refresh_lock.acquire(blocking=wait):
+            return False
+        try:
+            if conn is None:
+                with get_connection() as conn:
+                    self._load(conn)
+            else:
+                self._load(conn)
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def _load(self, conn):
+        with self._lock:
+            self._refresh_started = time.monotonic()
+            self._deltas = []
+        start = time.perf_counter()
+        try:
+            # REPEATABLE READ keeps the snapshot OVERVIEW_SQL read for the visibility check below
+            conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+            cur = conn.cursor()
+            cur.execute(OVERVIEW_SQL)
+            row = cur.fetchone()
+            cur.close()
+            counters = dict(zip(COUNTERS, row[:len(COUNTERS)]))
+            recent_orders = [
+                (o["order_id"], o["name"], datetime.fromisoformat(o["order_date"]),
+                 Decimal(str(o["total_amount"])) if o["total_amount"] is not None else None, o["status"])
+                for o in row[len(COUNTERS)]
+            ]
+            top_products = [(p["name"], Decimal(str(p["revenue"]))) for p in row[len(COUNTERS) + 1]]
+
+            with self._lock:
+                # Writes that committed while the query ran are replayed unless the snapshot already had them
+                buffered = self._deltas
+                missing = set()
+                if buffered:
+                    keys = {kind: [key for k, key, _ in buffered if k == kind] for kind in DELTA_KINDS}
+                    cur = conn.cursor()
+                    cur.execute(MISSING_WRITES_SQL, keys)
+                    missing = {(kind, str(key)) for kind, key in cur.fetchall()}
+                    cur.close()
+                for kind, key, delta in buffered:
+                    if (kind, str(key)) in missing:
+                        for name, value in delta.items():
+                            counters[name] += value
+                self._counters = counters
+                self._recent_orders = recent_orders
+                self._top_products = top_products
+                self._loaded_at = time.time()
+                self._load_seconds = time.perf_counter() - start
+        finally:
+            with self._lock:
+                self._refresh_started = None
+                self._deltas = []
+            conn.rollback()
+            conn.set_session(isolation_level="DEFAULT", readonly="DEFAULT")
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Overview snapshot refresh failed: {e}")
+
+    # === Write-path counters ===
+
+    def _apply(self, kind, key, **delta):
+        with self._lock:
+            if self._counters is not None:
+                for name, value in delta.items():
+                    self._counters[name] += value
+            if self._refresh_started is not None:
+                self._deltas.append((kind, key, delta))
+
+    def note_order(self, order_id, total_amount):
+        self._apply("order", order_id, order_count=1, revenue_sum=Decimal(total_amount))
+
+    def note_review(self, review_id, rating):
+        self._apply("review", review_id, review_count=1, rating_sum=rating)
+
+    def note_cart(self, cart_id):
+        self._apply("cart", cart_id, cart_count=1)
+
+    def note_abandon(self, cart_id):
+        self._apply("abandon", cart_id, abandoned_count=1)
+
+    # === Reading ===
+
+    def get(self):
+        """Current statistics for the overview page, loading them first if there are none yet"""
+        if self._counters is None:
+            # Concurrent first requests wait for a single load rather than each running one
+            with self._refresh_lock:
+                if self._counters is None:
+                    with get_connection() as conn:
+                        self._load(conn)
+        elif time.time() - self._loaded_at > self.interval and not self._refresh_lock.locked():
+            threading.Thread(target=self._refresh_in_background, name="overview-refresh", daemon=True).start()
+
+        with self._lock:
+            c = dict(self._counters)
+            return {
+                "total_products": c["active_products"],
+                "total_orders": c["order_count"],
+                "total_revenue": c["revenue_sum"],
+                "avg_order_value": c["revenue_sum"] / c["order_count"] if c["order_count"] else 0,
+                "total_users": c["user_count"],
+                "total_reviews": c["review_count"],
+                "avg_rating": c["rating_sum"] / c["review_count"] if c["review_count"] else 0,
+                "abandonment_rate": c["abandoned_count"] * 100.0 / c["cart_count"] if c["cart_count"] else 0,
+                "recent_orders": list(self._recent_orders),
+                "top_products": list(self._top_products),
+                "snapshot_age": time.time() - self._loaded_at,
+                "snapshot_seconds": self._load_seconds,
+            }
+
+
+overview_snapshot = OverviewSnapshot()
@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+
+from db import get_connection
+
+PARTITION_MONTHS_AHEAD = int(os.environ.get("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_CHECK_INTERVAL = float(os.environ.get("PARTITION_CHECK_INTERVAL", str(6 * 3600)))  # seconds
+
+# Tables range partitioned by month (see database/schema.sql). order_items references
+# orders, so it comes first: partitions.py archive detaches in this order.
+PARTITIONED_TABLES = ("order_items", "orders", "sessions")
+
+
+def ensure_partitions(conn, months_ahead=PARTITION_MONTHS_AHEAD, tables=PARTITIONED_TABLES):
+    """Create any missing partition from this month to `months_ahead` months out; returns how many"""
+    cur = conn.cursor()
+    created = 0
+    for table in tables:
+        cur.execute("""
+            SELECT create_monthly_partitions(%s, CURRENT_DATE, (CURRENT_DATE + make_interval(months => %s))::date)
+        """, (table, months_ahead))
+        created += cur.fetchone()[0]
+    conn.commit()
+    cur.close()
+    return created
+
+
+class PartitionMaintainer:
+    """Keeps monthly partitions created ahead of the clock.
+
+    On startup and then every `interval` seconds, create_monthly_partitions()
+    adds any missing partition from this month to `months_ahead` months out,
+    so checkouts and sessions never hit a month without a partition.
+    Detaching and archiving old months is an operator task
+    (`python partitions.py archive`).
+    """
+
+    def __init__(self, tables=PARTITIONED_TABLES, months_ahead=PARTITION_MONTHS_AHEAD, interval=PARTITION_CHECK_INTERVAL):
+        self.tables = tables
+        self.months_ahead = months_ahead
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+                self._thread.start()
+
+    def ensure(self):
+        """Create the missing partitions up to months_ahead; returns how many were created"""
+        with get_connection() as conn:
+            return ensure_partitions(conn, self.months_ahead, self.tables)
+
+    def _run(self):
+        while True:
+            try:
+                self.ensure()
+            except Exception as e:
+                print(f"Creating partitions failed: {e}")
+            time.sleep(self.interval)
+
+
+partition_maintainer = PartitionMaintainer()
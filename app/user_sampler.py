@@ -0,0 +1,103 @@
+import os
+import random
+import threading
+import time
+import uuid
+
+from db import get_connection
+
+USER_SAMPLER_REFRESH = float(os.environ.get("USER_SAMPLER_REFRESH", "300"))  # seconds between reloads
+USER_SAMPLER_BATCH = 50000
+
+
+class UserSampler:
+    """Uniform random user ids served from memory.
+
+    All ids are loaded once (and then periodically in a background thread)
+    into one packed bytearray of 16-byte UUIDs, so a draw is a single random
+    index into it and never touches the database. Until the first load
+    finishes, draws fall back to a TABLESAMPLE query.
+    """
+
+    def __init__(self, table="users", column="user_id", refresh_interval=USER_SAMPLER_REFRESH, background=True):
+        self.table = table
+        self.column = column
+        self.refresh_interval = refresh_interval
+        self.background = background
+        self._ids = bytearray()
+        self._count = 0
+        self._loaded_at = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return self._count
+
+    @property
+    def memory_bytes(self):
+        return len(self._ids)
+
+    @property
+    def loaded_at(self):
+        return self._loaded_at
+
+    def refresh(self, conn):
+        """Reload every id from the table; the swap is atomic for concurrent readers"""
+        ids = bytearray()
+        # Named cursor streams the ids instead of materializing the whole table client-side
+        with conn.cursor(name=f"user_sampler_{self.table}") as cur:
+            cur.itersize = USER_SAMPLER_BATCH
+            cur.execute(f"SELECT {self.column} FROM {self.table}")
+            for (user_id,) in cur:
+                ids += uuid.UUID(str(user_id)).bytes
+        conn.rollback()
+        self._ids, self._count = ids, len(ids) // 16
+        self._loaded_at = time.time()
+        return self._count
+
+    def sample(self, conn=None):
+        """Return a uniformly random user id in O(1), or sample the table while the cache is cold"""
+        if self.background:
+            self._ensure_started()
+        ids, count = self._ids, self._count
+        if count:
+            i = random.randrange(count) * 16
+            return str(uuid.UUID(bytes=bytes(ids[i:i + 16])))
+        if conn is None:
+            with get_connection() as conn:
+                return self.sample_from_table(conn)
+        return self.sample_from_table(conn)
+
+    def sample_from_table(self, conn):
+        cur = conn.cursor()
+        cur.execute(f"SELECT {self.column} FROM {self.table} TABLESAMPLE SYSTEM (1) LIMIT 1;")
+        row = cur.fetchone()
+        if row is None:
+            # SYSTEM sampling picks whole pages, so a table only a few pages long can come back
+            # empty; at that size a full random sort is cheap anyway
+            cur.execute(f"SELECT {self.column} FROM {self.table} ORDER BY RANDOM() LIMIT 1;")
+            row = cur.fetchone()
+        cur.close()
+        return row[0] if row else None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="user-sampler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                with get_connection() as conn:
+                    self.refresh(conn)
+            except Exception as e:
+                print(f"User sampler refresh failed: {e}")
+            # Retry quickly while cold so the fallback query is not used for long
+            time.sleep(self.refresh_interval if self._count else min(self.refresh_interval, 5))
+
+
+user_sampler = UserSampler()
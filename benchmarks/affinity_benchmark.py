@@ -0,0 +1,121 @@
+"""Product affinity: the self-join SQL vs. the in-memory co-occurrence engine.
+
+For each order count, seeds temporary products/order_items tables with
+1-5 random products per order, then times the original dashboard query,
+the engine's streaming build, a top-10 read, a per-product lookup and an
+incremental checkout update.
+
+    python benchmarks/affinity_benchmark.py [--orders 100000 1000000] [--products 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from affinity import AffinityEngine  # noqa: E402
+from db import DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT  # noqa: E402
+
+AFFINITY_SQL = """
+    WITH order_pairs AS (
+        SELECT oi1.order_id, oi1.product_id as product1_id, oi2.product_id as product2_id
+        FROM bench_order_items oi1
+        JOIN bench_order_items oi2 ON oi1.order_id = oi2.order_id
+        WHERE oi1.product_id < oi2.product_id
+    ),
+    pair_counts AS (
+        SELECT
+            p1.name as product1_name,
+            p2.name as product2_name,
+            COUNT(DISTINCT op.order_id) as times_bought_together,
+            ROUND(COUNT(DISTINCT op.order_id) * 100.0 / (
+                SELECT COUNT(DISTINCT order_id)
+                FROM order_pairs
+            ), 2) as affinity_percentage
+        FROM order_pairs op
+        JOIN bench_products p1 ON op.product1_id = p1.product_id
+        JOIN bench_products p2 ON op.product2_id = p2.product_id
+        GROUP BY p1.name, p2.name
+    )
+    SELECT product1_name, product2_name, times_bought_together, affinity_percentage
+    FROM pair_counts
+    ORDER BY times_bought_together DESC
+    LIMIT 10;
+"""
+
+
+def timed(fn, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def seed(conn, num_orders, num_products):
+    cur = conn.cursor()
+    cur.execute("DROP TABLE IF EXISTS bench_order_items, bench_products")
+    cur.execute("CREATE TEMP TABLE bench_products (product_id INT PRIMARY KEY, name TEXT)")
+    cur.execute("INSERT INTO bench_products SELECT i, 'Product ' || i FROM generate_series(1, %s) i", (num_products,))
+    cur.execute("CREATE TEMP TABLE bench_order_items (order_id INT, product_id INT)")
+    cur.execute("""
+        INSERT INTO bench_order_items
+        SELECT o, 1 + floor(random() * %s)::int
+        FROM generate_series(1, %s) o
+        -- Referencing o makes the item count random per order rather than once per query
+        CROSS JOIN LATERAL generate_series(1, 1 + floor(random() * 5)::int + o * 0) n
+    """, (num_products, num_orders))
+    items = cur.rowcount
+    cur.execute("CREATE INDEX ON bench_order_items (order_id)")
+    cur.execute("ANALYZE bench_order_items")
+    cur.execute("ANALYZE bench_products")
+    conn.commit()
+    cur.close()
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--products", type=int, default=500)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT)
+    results = []
+    for num_orders in args.orders:
+        items = seed(conn, num_orders, args.products)
+        print(f"🧪 {num_orders:,} orders / {items:,} order items")
+
+        cur = conn.cursor()
+        sql_ms, _ = timed(lambda: (cur.execute(AFFINITY_SQL), cur.fetchall()))
+        conn.rollback()
+        cur.close()
+
+        engine = AffinityEngine()
+        build_ms, _ = timed(lambda: engine.build(conn, order_items_table="bench_order_items",
+                                                 products_table="bench_products"))
+        top_ms, _ = timed(lambda: engine.top_pairs(10), repeat=20)
+        lookup_ms, _ = timed(lambda: engine.frequently_bought_with("1", 5), repeat=20)
+        # One checkout's basket followed by the read that merges it
+        update_ms, _ = timed(lambda: (engine.add_order(None, ["1", "2", "3"]), engine.top_pairs(10)), repeat=20)
+
+        results.append([
+            f"{num_orders:,}", f"{sql_ms:.1f}", f"{build_ms:.1f}", f"{top_ms:.3f}",
+            f"{lookup_ms:.3f}", f"{update_ms:.3f}", f"{engine.stats()['memory_bytes'] / 1024:.0f}",
+        ])
+
+    print(tabulate(results, headers=[
+        "Orders", "SQL self-join (ms)", "Engine build (ms)", "Top-10 read (ms)",
+        "Per-product lookup (ms)", "Checkout update + read (ms)", "Engine memory (KiB)",
+    ], tablefmt="grid"))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
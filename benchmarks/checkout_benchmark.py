@@ -0,0 +1,188 @@
+"""Checkout throughput: per-item round trips vs. the single set-based statement.
+
+For each client count, seeds fresh active carts, checks them out from that
+many concurrent connections with both implementations and reports
+checkouts/sec and latency. Everything the benchmark creates is deleted at
+the end. 100 clients needs max_connections above 100.
+
+    python benchmarks/checkout_benchmark.py [--clients 1 10 100] [--carts 2000] [--items 5]
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import psycopg2
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from db import DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT  # noqa: E402
+from orders import place_order  # noqa: E402
+
+
+def connect():
+    return psycopg2.connect(dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT)
+
+
+def legacy_checkout(conn, cart_id, user_id):
+    """The original route body: one statement per cart line"""
+    cur = conn.cursor()
+    order_id = str(uuid.uuid4())
+    cur.execute("SELECT user_id FROM users ORDER BY RANDOM() LIMIT 1;")
+    cur.fetchone()
+    cur.execute("SELECT COUNT(*) FROM cart_items WHERE cart_id = %s AND removed_at IS NULL", (cart_id,))
+    total_amount = cur.fetchone()[0] * 20.0
+    order_date = datetime.now()
+    cur.execute("""
+        INSERT INTO orders (order_id, user_id, order_date, status, total_amount)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (order_id, user_id, order_date, 'completed', total_amount))
+    cur.execute("SELECT product_id FROM cart_items WHERE cart_id = %s AND removed_at IS NULL", (cart_id,))
+    for (product_id,) in cur.fetchall():
+        cur.execute("""
+            INSERT INTO order_items (order_item_id, order_id, order_date, product_id, quantity, unit_price)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (str(uuid.uuid4()), order_id, order_date, product_id, 1, 20.0))
+    cur.execute("UPDATE carts SET status = 'converted' WHERE cart_id = %s", (cart_id,))
+    conn.commit()
+    cur.close()
+    return order_id, total_amount, None
+
+
+def seed_carts(conn, user_id, num_carts, items_per_cart):
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO carts (cart_id, user_id, created_at, status)
+        SELECT gen_random_uuid(), %s, now(), 'active'
+        FROM generate_series(1, %s)
+        RETURNING cart_id
+    """, (user_id, num_carts))
+    cart_ids = [row[0] for row in cur.fetchall()]
+    cur.execute("""
+        INSERT INTO cart_items (cart_item_id, cart_id, product_id, added_at)
+        SELECT gen_random_uuid(), c.cart_id, p.product_id, now()
+        FROM unnest(%s::uuid[]) AS c(cart_id)
+        CROSS JOIN LATERAL (
+            -- Referencing c.cart_id keeps the planner from reusing one sample for every cart
+            SELECT product_id FROM products
+            WHERE is_active = TRUE AND c.cart_id IS NOT NULL
+            ORDER BY random()
+            LIMIT %s
+        ) p
+    """, (cart_ids, items_per_cart))
+    conn.commit()
+    cur.close()
+    return cart_ids
+
+
+def run(checkout_fn, cart_ids, user_id, clients):
+    work = queue.Queue()
+    for cart_id in cart_ids:
+        work.put(cart_id)
+    latencies, order_ids, lock = [], [], threading.Lock()
+
+    def worker():
+        conn = connect()
+        local_latencies, local_orders = [], []
+        while True:
+            try:
+                cart_id = work.get_nowait()
+            except queue.Empty:
+                break
+            start = time.perf_counter()
+            order = checkout_fn(conn, cart_id, user_id)
+            local_latencies.append(time.perf_counter() - start)
+            if order:
+                local_orders.append(order[0])
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            order_ids.extend(local_orders)
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }, order_ids
+
+
+def cleanup(conn, cart_ids, order_ids, rolled_up=False):
+    """Delete the benchmark's carts and orders; `rolled_up` if product_sales_stats counted the orders"""
+    cur = conn.cursor()
+    if rolled_up:
+        # place_order added each line to the sales rollup; take the lines back out, and drop
+        # the rows of products that had no other sales
+        cur.execute("""
+            WITH sold AS (
+                SELECT product_id, SUM(quantity) AS units_sold, SUM(quantity * unit_price) AS revenue,
+                       COUNT(*) AS order_count
+                FROM order_items
+                WHERE order_id = ANY(%s::uuid[])
+                GROUP BY product_id
+            )
+            UPDATE product_sales_stats s
+            SET units_sold = s.units_sold - sold.units_sold,
+                revenue = s.revenue - sold.revenue,
+                order_count = s.order_count - sold.order_count
+            FROM sold
+            WHERE s.product_id = sold.product_id
+            RETURNING s.product_id, s.order_count
+        """, (order_ids,))
+        emptied = [product_id for product_id, order_count in cur.fetchall() if order_count == 0]
+        cur.execute("DELETE FROM product_sales_stats WHERE product_id = ANY(%s::uuid[])", (emptied,))
+    cur.execute("DELETE FROM order_items WHERE order_id = ANY(%s::uuid[])", (order_ids,))
+    cur.execute("DELETE FROM orders WHERE order_id = ANY(%s::uuid[])", (order_ids,))
+    cur.execute("DELETE FROM cart_items WHERE cart_id = ANY(%s::uuid[])", (cart_ids,))
+    cur.execute("DELETE FROM carts WHERE cart_id = ANY(%s::uuid[])", (cart_ids,))
+    conn.commit()
+    cur.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--carts", type=int, default=2000, help="carts checked out per run")
+    parser.add_argument("--items", type=int, default=5, help="distinct products per cart")
+    args = parser.parse_args()
+
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT user_id FROM users LIMIT 1")
+    user_id = cur.fetchone()[0]
+    cur.close()
+
+    implementations = [("per-item (legacy)", legacy_checkout), ("set-based", place_order)]
+    results = []
+    for clients in args.clients:
+        for name, checkout_fn in implementations:
+            cart_ids = seed_carts(conn, user_id, args.carts, args.items)
+            order_ids = []
+            try:
+                stats, order_ids = run(checkout_fn, cart_ids, user_id, clients)
+            finally:
+                cleanup(conn, cart_ids, order_ids, rolled_up=checkout_fn is place_order)
+            results.append([clients, name, f"{stats['throughput']:.1f}", f"{stats['p50_ms']:.2f}", f"{stats['p99_ms']:.2f}"])
+            print(f"  {clients:>3} clients, {name}: {stats['throughput']:.1f} checkouts/s")
+
+    print(tabulate(results,
+                   headers=["Clients", "Implementation", "Checkouts/s", "p50 (ms)", "p99 (ms)"],
+                   tablefmt="grid"))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
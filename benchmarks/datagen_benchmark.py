@@ -0,0 +1,93 @@
+"""Rows/sec of the data generator per table, generation and text rendering measured apart.
+
+For every chunk of every table, times building the column arrays
+(DatasetGenerator.chunk), rendering them as COPY text (copy_rows) and as an
+INSERT values list (sql_rows), each the best of --repeat runs. Everything runs
+in this one process, so the rates are per core; generate_data.py --workers
+spreads chunks over processes. No database is needed.
+
+    python benchmarks/datagen_benchmark.py [--scale 20] [--uuid-version 4 7] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from datagen import CHUNK_ROWS, TABLES, DatasetGenerator, copy_rows, sql_rows  # noqa: E402
+
+
+def best_of(repeat, fn, *args):
+    """(result, seconds) of the fastest of `repeat` calls"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return result, best
+
+
+def time_table(generator, table, repeat):
+    """Rows, COPY bytes and seconds spent generating, rendering COPY text and rendering SQL"""
+    rows = copy_bytes = 0
+    seconds = {"generate": 0.0, "copy": 0.0, "sql": 0.0}
+    for k in range(generator.chunk_count(table)):
+        chunk, generate = best_of(repeat, generator.chunk, table, k)
+        text, copy = best_of(repeat, copy_rows, table, chunk)
+        _, sql = best_of(repeat, sql_rows, table, chunk)
+        rows += len(chunk[TABLES[table][0][0]])
+        copy_bytes += len(text)
+        seconds["generate"] += generate
+        seconds["copy"] += copy
+        seconds["sql"] += sql
+    return rows, copy_bytes, seconds
+
+
+def rate(rows, seconds):
+    return f"{rows / seconds:,.0f}" if seconds else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--uuid-version", type=int, nargs="+", choices=(4, 7), default=[7])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per chunk and step; the fastest counts")
+    args = parser.parse_args()
+
+    results = []
+    for version in args.uuid_version:
+        # A fixed date, so every run renders the same rows
+        generator = DatasetGenerator(args.scale, args.seed, args.chunk_rows, datetime(2025, 1, 1), version)
+        generator.pools
+        print(f"🧪 Scale {args.scale:g}, v{version} keys...")
+        totals = {"rows": 0, "bytes": 0, "generate": 0.0, "copy": 0.0, "sql": 0.0}
+        for table in TABLES:
+            rows, copy_bytes, seconds = time_table(generator, table, args.repeat)
+            results.append([f"v{version}", table, f"{rows:,}", rate(rows, seconds["generate"]),
+                            rate(rows, seconds["copy"]), rate(rows, seconds["sql"]),
+                            rate(rows, seconds["generate"] + seconds["copy"]),
+                            f"{copy_bytes / seconds['copy'] / 1024 / 1024:,.0f}"])
+            totals["rows"] += rows
+            totals["bytes"] += copy_bytes
+            for step in ("generate", "copy", "sql"):
+                totals[step] += seconds[step]
+        results.append([f"v{version}", "all", f"{totals['rows']:,}", rate(totals["rows"], totals["generate"]),
+                        rate(totals["rows"], totals["copy"]), rate(totals["rows"], totals["sql"]),
+                        rate(totals["rows"], totals["generate"] + totals["copy"]),
+                        f"{totals['bytes'] / totals['copy'] / 1024 / 1024:,.0f}"])
+
+    print(tabulate(results, headers=["Keys", "Table", "Rows", "Generate rows/s", "COPY text rows/s",
+                                     "SQL text rows/s", "Generate + COPY rows/s", "COPY MiB/s"],
+                   tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    main()
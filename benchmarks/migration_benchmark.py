@@ -0,0 +1,255 @@
+"""Migration throughput: migrate_to_mongodb.py per collection and per stage.
+
+For each scale, seeds a generated dataset into the `bench_migration` schema
+(scale 1 is the size generate_data.py writes: 1,000 users, 5,000 orders, ...),
+then migrates it into the `ecommerce_mongodb_bench` database once per batch
+size. Each run happens in a fresh process so its peak RSS is its own. Times
+are split into reading from Postgres, building documents, writing to MongoDB
+and building indexes. Save a run, change the migrator, then compare:
+
+    python benchmarks/migration_benchmark.py --save before.json [--scales 1 10 100] [--batch-sizes 1000 5000]
+    python benchmarks/migration_benchmark.py --baseline before.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import psycopg2
+from pymongo import MongoClient
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import migrate_to_mongodb as migrator  # noqa: E402
+
+BENCH_SCHEMA = "bench_migration"
+BENCH_MONGO_DB = "ecommerce_mongodb_bench"
+STAGES = ("read", "transform", "write", "index")
+
+# Rows per table at scale 1; cart and order lines are 1-5 per cart/order
+BASE_ROWS = {"users": 1000, "products": 50, "orders": 5000, "reviews": 3000, "carts": 300}
+
+SEED_SQL = """
+    DROP SCHEMA IF EXISTS {s} CASCADE;
+    CREATE SCHEMA {s};
+    CREATE TABLE {s}.users (LIKE public.users INCLUDING DEFAULTS);
+    CREATE TABLE {s}.products (LIKE public.products INCLUDING DEFAULTS);
+    CREATE TABLE {s}.orders (LIKE public.orders INCLUDING DEFAULTS);
+    CREATE TABLE {s}.order_items (LIKE public.order_items INCLUDING DEFAULTS);
+    CREATE TABLE {s}.reviews (LIKE public.reviews INCLUDING DEFAULTS);
+    CREATE TABLE {s}.carts (LIKE public.carts INCLUDING DEFAULTS);
+    CREATE TABLE {s}.cart_items (LIKE public.cart_items INCLUDING DEFAULTS);
+
+    INSERT INTO {s}.users (user_id, name, email, signup_source)
+    SELECT gen_random_uuid(), 'User ' || i, 'user' || i || '@example.com',
+           (ARRAY['organic', 'ads', 'referral', 'social'])[1 + i %% 4]
+    FROM generate_series(1, %(users)s) i;
+
+    INSERT INTO {s}.products (product_id, name, category, price, created_at, is_active)
+    SELECT gen_random_uuid(), 'Product ' || i,
+           (ARRAY['Electronics', 'Clothing', 'Home', 'Sports', 'Books'])[1 + i %% 5],
+           round((5 + random() * 495)::numeric, 2), TIMESTAMP '2025-01-01' + i * INTERVAL '1 minute', TRUE
+    FROM generate_series(1, %(products)s) i;
+
+    INSERT INTO {s}.orders (order_id, user_id, order_date, status, total_amount)
+    SELECT gen_random_uuid(), u.ids[1 + floor(random() * array_length(u.ids, 1))::int],
+           TIMESTAMP '2025-01-01' + random() * INTERVAL '120 days',
+           (ARRAY['completed', 'pending', 'shipped'])[1 + floor(random() * 3)::int],
+           round((10 + random() * 490)::numeric, 2)
+    FROM generate_series(1, %(orders)s), (SELECT array_agg(user_id) AS ids FROM {s}.users) u;
+
+    INSERT INTO {s}.order_items (order_item_id, order_id, order_date, product_id, quantity, unit_price)
+    SELECT gen_random_uuid(), o.order_id, o.order_date, p.ids[1 + floor(random() * array_length(p.ids, 1))::int],
+           1 + floor(random() * 3)::int, round((5 + random() * 495)::numeric, 2)
+    FROM {s}.orders o
+    CROSS JOIN LATERAL generate_series(1, 1 + abs(hashtext(o.order_id::text)) %% 5)
+    CROSS JOIN (SELECT array_agg(product_id) AS ids FROM {s}.products) p;
+
+    INSERT INTO {s}.reviews (review_id, user_id, product_id, rating, comment, review_date)
+    SELECT gen_random_uuid(), u.ids[1 + floor(random() * array_length(u.ids, 1))::int],
+           p.ids[1 + floor(random() * array_length(p.ids, 1))::int], 1 + floor(random() * 5)::int,
+           'Benchmark review ' || i, TIMESTAMP '2025-01-01' + random() * INTERVAL '120 days'
+    FROM generate_series(1, %(reviews)s) i,
+         (SELECT array_agg(user_id) AS ids FROM {s}.users) u,
+         (SELECT array_agg(product_id) AS ids FROM {s}.products) p;
+
+    INSERT INTO {s}.carts (cart_id, user_id, created_at, status)
+    SELECT gen_random_uuid(), u.ids[1 + floor(random() * array_length(u.ids, 1))::int],
+           TIMESTAMP '2025-01-01' + random() * INTERVAL '120 days',
+           (ARRAY['active', 'converted', 'abandoned'])[1 + floor(random() * 3)::int]
+    FROM generate_series(1, %(carts)s), (SELECT array_agg(user_id) AS ids FROM {s}.users) u;
+
+    INSERT INTO {s}.cart_items (cart_item_id, cart_id, product_id, added_at)
+    SELECT gen_random_uuid(), c.cart_id, p.ids[1 + floor(random() * array_length(p.ids, 1))::int], c.created_at
+    FROM {s}.carts c
+    CROSS JOIN LATERAL generate_series(1, 1 + abs(hashtext(c.cart_id::text)) %% 5)
+    CROSS JOIN (SELECT array_agg(product_id) AS ids FROM {s}.products) p;
+
+    -- The indexes the migrator's key-ordered cursors walk in the real schema
+    ALTER TABLE {s}.users ADD PRIMARY KEY (user_id);
+    ALTER TABLE {s}.products ADD PRIMARY KEY (product_id);
+    ALTER TABLE {s}.orders ADD PRIMARY KEY (order_id, order_date);
+    ALTER TABLE {s}.reviews ADD PRIMARY KEY (review_id);
+    ALTER TABLE {s}.carts ADD PRIMARY KEY (cart_id);
+    CREATE INDEX ON {s}.orders (user_id);
+    CREATE INDEX ON {s}.order_items (order_id);
+    CREATE INDEX ON {s}.reviews (user_id);
+    CREATE INDEX ON {s}.reviews (product_id);
+    CREATE INDEX ON {s}.cart_items (cart_id);
+    ANALYZE {s}.users, {s}.products, {s}.orders, {s}.order_items, {s}.reviews, {s}.carts, {s}.cart_items;
+"""
+
+
+def connect():
+    return psycopg2.connect(dbname=migrator.PG_DB_NAME, user=migrator.PG_USER, password=migrator.PG_PASSWORD,
+                            host=migrator.PG_HOST, port=migrator.PG_PORT)
+
+
+def seed(scale):
+    """Generate the scale's dataset into BENCH_SCHEMA; returns the seconds taken"""
+    sizes = {table: max(1, int(rows * scale)) for table, rows in BASE_ROWS.items()}
+    start = time.perf_counter()
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        cur.execute(SEED_SQL.format(s=BENCH_SCHEMA), sizes)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    return time.perf_counter() - start
+
+
+def drop_seed():
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_migration(batch_size):
+    """One full migration of BENCH_SCHEMA; runs in its own process"""
+    pg_conn = connect()
+    pg_conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    cur = pg_conn.cursor()
+    cur.execute(f"SET search_path TO {BENCH_SCHEMA}")
+    cur.close()
+    pg_conn.commit()
+    client = MongoClient(migrator.MONGO_URI)
+    mongo_db = client[BENCH_MONGO_DB]
+    try:
+        collections, start = {}, time.perf_counter()
+        for migration in migrator.MIGRATIONS:
+            stages = {}
+            rows, seconds = migrator.migrate_table(pg_conn, mongo_db, migration, batch_size, stages=stages)
+            index_start = time.perf_counter()
+            migrator.create_indexes(mongo_db, [migration])
+            stages["index"] = time.perf_counter() - index_start
+            seconds += stages["index"]
+            collections[migration.collection] = {
+                "rows": rows,
+                "seconds": seconds,
+                "rows_per_sec": rows / seconds if seconds else 0,
+                "stages": stages,
+            }
+        total = time.perf_counter() - start
+        rows = sum(c["rows"] for c in collections.values())
+        return {
+            "batch_size": batch_size,
+            "collections": collections,
+            "seconds": total,
+            "rows_per_sec": rows / total if total else 0,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    finally:
+        client.drop_database(BENCH_MONGO_DB)
+        client.close()
+        pg_conn.close()
+
+
+def run_key(run):
+    return f"scale={run['scale']} batch={run['batch_size']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1000, migrator.DEFAULT_BATCH_SIZE])
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --save to compare against")
+    parser.add_argument("--keep", action="store_true", help=f"leave the {BENCH_SCHEMA} schema in place")
+    args = parser.parse_args()
+
+    if not migrator.check_mongodb_connection():
+        sys.exit(1)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {run_key(run): run for run in json.load(f)["runs"]}
+
+    # A fresh process per run, so each peak RSS covers one migration only
+    context = multiprocessing.get_context("spawn")
+    runs, rows = [], []
+    try:
+        for scale in args.scales:
+            print(f"🌱 Seeding scale {scale:g}...")
+            seed_seconds = seed(scale)
+            for batch_size in args.batch_sizes:
+                with context.Pool(1) as pool:
+                    run = pool.apply(run_migration, (batch_size,))
+                run.update(scale=scale, seed_seconds=seed_seconds)
+                runs.append(run)
+                print(f"  batch {batch_size}: {run['rows_per_sec']:,.0f} rows/sec, "
+                      f"peak RSS {run['peak_rss_mb']:.0f} MB")
+
+                before = baseline.get(run_key(run))
+                for name, stats in run["collections"].items():
+                    row = [f"{scale:g}", batch_size, name, stats["rows"],
+                           *(f"{stats['stages'][stage]:.2f}" for stage in STAGES), f"{stats['rows_per_sec']:,.0f}"]
+                    if args.baseline:
+                        old = before["collections"].get(name) if before else None
+                        row.append(f"{old['rows_per_sec']:,.0f}" if old else "")
+                        row.append(f"{stats['rows_per_sec'] / old['rows_per_sec']:.2f}x"
+                                   if old and old["rows_per_sec"] else "")
+                    rows.append(row)
+                row = [f"{scale:g}", batch_size, f"total ({run['peak_rss_mb']:.0f} MB peak)",
+                       sum(c["rows"] for c in run["collections"].values()),
+                       *(f"{sum(c['stages'][stage] for c in run['collections'].values()):.2f}" for stage in STAGES),
+                       f"{run['rows_per_sec']:,.0f}"]
+                if args.baseline:
+                    row.append(f"{before['rows_per_sec']:,.0f}" if before else "")
+                    row.append(f"{run['rows_per_sec'] / before['rows_per_sec']:.2f}x"
+                               if before and before["rows_per_sec"] else "")
+                rows.append(row)
+    finally:
+        if not args.keep:
+            drop_seed()
+
+    headers = ["Scale", "Batch", "Collection", "Rows", "Read (s)", "Transform (s)", "Write (s)", "Index (s)",
+               "Rows/sec"]
+    if args.baseline:
+        headers += ["Baseline rows/sec", "Speedup"]
+    print(tabulate(rows, headers=headers, tablefmt="grid"))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"runs": runs}, f, indent=2)
+        print(f"💾 Saved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
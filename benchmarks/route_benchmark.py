@@ -0,0 +1,107 @@
+"""Route latency: every GET page of the app, timed through Flask's test client.
+
+Requests go through the full app (pool, SQL, template rendering) without an
+HTTP server in front. The result cache is disabled unless --cache is given,
+so each request pays for its queries. Save a run, apply migrations (or any
+other change), then run again against the saved baseline:
+
+    python benchmarks/route_benchmark.py --save before.json
+    python migrate.py up
+    python benchmarks/route_benchmark.py --baseline before.json [--requests 50] [--routes /top-rated /abandoned]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+ROUTES = [
+    "/products",
+    "/products?sort=price_low",
+    "/products?sort=price_high",
+    "/top-rated",
+    "/top-selling",
+    "/repeat-customers",
+    "/abandoned",
+    "/product_affinity",
+    "/data-overview",
+    "/customer-behavior",
+    "/database-visualization",
+    "/database_comparison",
+]
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def time_route(client, route, num_requests, warmup):
+    for _ in range(warmup):
+        client.get(route)
+    samples, status = [], None
+    for _ in range(num_requests):
+        start = time.perf_counter()
+        response = client.get(route)
+        samples.append((time.perf_counter() - start) * 1000)
+        status = response.status_code
+    return {
+        "status": status,
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", nargs="+", default=ROUTES)
+    parser.add_argument("--requests", type=int, default=30, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed requests per route first")
+    parser.add_argument("--cache", action="store_true", help="leave the result cache on")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --save to compare against")
+    args = parser.parse_args()
+
+    if not args.cache:
+        os.environ["RESULT_CACHE_ENABLED"] = "0"
+    from app import app  # noqa: E402  (imported late so the cache setting takes effect)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    client = app.test_client()
+    results, rows = {}, []
+    for route in args.routes:
+        stats = time_route(client, route, args.requests, args.warmup)
+        results[route] = stats
+        row = [route, stats["status"], f"{stats['mean_ms']:.1f}", f"{stats['p50_ms']:.1f}",
+               f"{stats['p95_ms']:.1f}", f"{stats['p99_ms']:.1f}"]
+        if args.baseline:
+            before = baseline.get(route)
+            row.append(f"{before['p50_ms']:.1f}" if before else "")
+            row.append(f"{before['p50_ms'] / stats['p50_ms']:.1f}x" if before else "")
+        rows.append(row)
+        print(f"  {route}: p50 {stats['p50_ms']:.1f} ms")
+
+    headers = ["Route", "Status", "Mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)"]
+    if args.baseline:
+        headers += ["Baseline p50 (ms)", "Speedup"]
+    print(tabulate(rows, headers=headers, tablefmt="grid"))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compare ORDER BY RANDOM() with the in-process user sampler.
+
+Seeds a temporary table with NUM_USERS random UUIDs so the real `users`
+table is left alone, then times each way of picking a random user.
+
+    python benchmarks/user_sampler_benchmark.py [--users 1000000] [--draws 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from db import DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT  # noqa: E402
+from user_sampler import UserSampler  # noqa: E402
+
+
+def time_draws(fn, draws):
+    times = []
+    for _ in range(draws):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "avg_ms": sum(times) / len(times) * 1000,
+        "p50_ms": times[len(times) // 2] * 1000,
+        "p99_ms": times[min(len(times) - 1, int(len(times) * 0.99))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--draws", type=int, default=200)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT)
+    cur = conn.cursor()
+
+    print(f"🧪 Seeding {args.users:,} users into a temporary table...")
+    cur.execute("CREATE TEMP TABLE bench_users (user_id UUID PRIMARY KEY)")
+    cur.execute("INSERT INTO bench_users SELECT gen_random_uuid() FROM generate_series(1, %s)", (args.users,))
+    cur.execute("ANALYZE bench_users")
+    conn.commit()
+
+    sampler = UserSampler(table="bench_users", background=False)
+
+    def order_by_random():
+        cur.execute("SELECT user_id FROM bench_users ORDER BY RANDOM() LIMIT 1;")
+        cur.fetchone()
+
+    results = []
+    results.append(["ORDER BY RANDOM() LIMIT 1", *time_draws(order_by_random, args.draws).values()])
+    results.append(["TABLESAMPLE fallback (cold cache)", *time_draws(lambda: sampler.sample_from_table(conn), args.draws).values()])
+
+    start = time.perf_counter()
+    loaded = sampler.refresh(conn)
+    load_time = time.perf_counter() - start
+
+    results.append(["UserSampler.sample (warm)", *time_draws(lambda: sampler.sample(conn), args.draws).values()])
+
+    print(tabulate(
+        [[name, f"{avg:.4f}", f"{p50:.4f}", f"{p99:.4f}"] for name, avg, p50, p99 in results],
+        headers=["Method", "Avg (ms)", "p50 (ms)", "p99 (ms)"],
+        tablefmt="grid",
+    ))
+    print(f"\nSampler load: {loaded:,} ids in {load_time:.2f}s ({sampler.memory_bytes / 1024 / 1024:.1f} MiB)")
+
+    cur.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Insert throughput and index size of random (v4) vs. time-ordered (v7) primary keys.
+
+Grows one table per key kind to --rows rows, --batch rows per INSERT and
+transaction, and reports rows/sec overall and over the last tenth (once the
+index has outgrown the cache, random keys slow down most), the size of the
+primary key index and the table, WAL written and, when pgstattuple is
+available, how full the index's leaf pages are. Needs uuid_generate_v7()
+from database/migrations (python migrate.py up). The tables are dropped at the
+end unless --keep is given.
+
+    python benchmarks/uuid_benchmark.py [--rows 10000000] [--batch 100000] [--keep]
+"""
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from db import DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT  # noqa: E402
+
+KEY_FUNCTIONS = {"v4 (gen_random_uuid)": "gen_random_uuid()", "v7 (uuid_generate_v7)": "uuid_generate_v7()"}
+
+
+def grow_table(conn, table, key_function, rows, batch):
+    """Insert `rows` rows in batches; returns (seconds per batch, WAL bytes written)"""
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {table}")
+    cur.execute(f"CREATE TABLE {table} (id UUID PRIMARY KEY, created_at TIMESTAMP NOT NULL, payload INT NOT NULL)")
+    conn.commit()
+    cur.execute("SELECT pg_current_wal_lsn()")
+    wal_start = cur.fetchone()[0]
+    batches = []
+    for done in range(0, rows, batch):
+        size = min(batch, rows - done)
+        start = time.perf_counter()
+        cur.execute(f"""
+            INSERT INTO {table} (id, created_at, payload)
+            SELECT {key_function}, clock_timestamp(), g FROM generate_series(1, %s) g
+        """, (size,))
+        conn.commit()
+        batches.append((size, time.perf_counter() - start))
+    cur.execute("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)", (wal_start,))
+    wal = int(cur.fetchone()[0])
+    cur.close()
+    return batches, wal
+
+
+def index_stats(conn, table, pgstattuple):
+    """(index bytes, table bytes, average leaf density or None)"""
+    cur = conn.cursor()
+    cur.execute("SELECT pg_relation_size(%s), pg_relation_size(%s)", (f"{table}_pkey", table))
+    index_bytes, table_bytes = cur.fetchone()
+    density = None
+    if pgstattuple:
+        cur.execute("SELECT avg_leaf_density FROM pgstatindex(%s)", (f"{table}_pkey",))
+        density = cur.fetchone()[0]
+    cur.close()
+    return index_bytes, table_bytes, density
+
+
+def has_pgstattuple(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pgstattuple")
+        conn.commit()
+        return True
+    except psycopg2.Error:
+        conn.rollback()
+        return False
+    finally:
+        cur.close()
+
+
+def mib(size):
+    return f"{size / 1024 / 1024:,.1f} MiB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=100_000, help="rows per INSERT/transaction")
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark tables")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT)
+    pgstattuple = has_pgstattuple(conn)
+    results = []
+    tables = []
+    try:
+        for label, key_function in KEY_FUNCTIONS.items():
+            table = f"bench_uuid_{label[:2]}"
+            tables.append(table)
+            print(f"🧪 Inserting {args.rows:,} rows keyed by {label}...")
+            batches, wal = grow_table(conn, table, key_function, args.rows, args.batch)
+            total_rows, total_seconds = sum(n for n, _ in batches), sum(s for _, s in batches)
+            tail = batches[-max(1, len(batches) // 10):]
+            tail_rate = sum(n for n, _ in tail) / sum(s for _, s in tail)
+            index_bytes, table_bytes, density = index_stats(conn, table, pgstattuple)
+            results.append([label, f"{total_rows / total_seconds:,.0f}", f"{tail_rate:,.0f}", mib(index_bytes),
+                            mib(table_bytes), mib(wal), f"{density:.1f}%" if density is not None else "-"])
+    finally:
+        if not args.keep:
+            conn.rollback()
+            cur = conn.cursor()
+            for table in tables:
+                cur.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.commit()
+            cur.close()
+        conn.close()
+
+    print(tabulate(results, headers=["Keys", "Rows/sec", "Rows/sec (last 10%)", "PK index", "Table", "WAL",
+                                     "Leaf density"], tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    main()
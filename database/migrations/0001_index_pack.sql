@@ -0,0 +1,36 @@
+-- migrate: no-transaction
+-- Secondary indexes for the join and filter columns used by app/app.py and queries.sql.
+-- Built CONCURRENTLY so a live store keeps taking orders while they build.
+
+-- Recent orders on /data-overview (ORDER BY order_date DESC LIMIT 10), monthly repeat
+-- customers and the peak-time analysis
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_order_date ON orders (order_date);
+
+-- Orders per customer: customer segments, repeat customers, cart-to-purchase time
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_user_id ON orders (user_id, order_date);
+
+-- Order lines by order (affinity pairs, checkout, rollup backfill) and by product
+-- (top selling, category analysis)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_items_product_id ON order_items (product_id);
+
+-- Reviews per product (top rated, rating rollup check)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reviews_product_id ON reviews (product_id);
+
+-- Cart lines by cart (/cart, checkout, abandoned products) and by product
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cart_items_cart_id ON cart_items (cart_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cart_items_product_id ON cart_items (product_id);
+
+-- Abandoned/converted carts for the abandonment dashboards and rate
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_carts_status ON carts (status);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_carts_user_id ON carts (user_id);
+
+-- Remaining foreign keys, so deletes and joins from users do not scan the child tables
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reviews_user_id ON reviews (user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_user_id ON sessions (user_id);
+
+ANALYZE orders;
+ANALYZE order_items;
+ANALYZE reviews;
+ANALYZE carts;
+ANALYZE cart_items;
@@ -0,0 +1,9 @@
+-- migrate: no-transaction
+-- The incremental sync reads each table in (updated_at, primary key) order from its
+-- checkpoint, so a delta is an index range scan rather than a full scan.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_updated_at ON users (updated_at, user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_updated_at ON products (updated_at, product_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_updated_at ON orders (updated_at, order_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reviews_updated_at ON reviews (updated_at, review_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_carts_updated_at ON carts (updated_at, cart_id);
@@ -0,0 +1,26 @@
+-- MongoDB documents embed rows of other tables: users carry order and review stats, products
+-- a review summary, carts their items. A change to such a row bumps the updated_at of the row
+-- it is embedded in, so the incremental sync rebuilds that document too.
+
+-- Trigger arguments: parent table, and the key column shared by the child and the parent
+CREATE OR REPLACE FUNCTION touch_parent_updated_at() RETURNS TRIGGER AS $$
+BEGIN
+    EXECUTE format('UPDATE %I SET updated_at = clock_timestamp() WHERE %I = ($1).%I',
+                   TG_ARGV[0], TG_ARGV[1], TG_ARGV[1])
+    USING NEW;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS orders_touch_user ON orders;
+CREATE TRIGGER orders_touch_user AFTER INSERT OR UPDATE OF user_id, total_amount ON orders
+    FOR EACH ROW EXECUTE FUNCTION touch_parent_updated_at('users', 'user_id');
+DROP TRIGGER IF EXISTS reviews_touch_user ON reviews;
+CREATE TRIGGER reviews_touch_user AFTER INSERT OR UPDATE OF user_id, rating ON reviews
+    FOR EACH ROW EXECUTE FUNCTION touch_parent_updated_at('users', 'user_id');
+DROP TRIGGER IF EXISTS reviews_touch_product ON reviews;
+CREATE TRIGGER reviews_touch_product AFTER INSERT OR UPDATE ON reviews
+    FOR EACH ROW EXECUTE FUNCTION touch_parent_updated_at('products', 'product_id');
+DROP TRIGGER IF EXISTS cart_items_touch_cart ON cart_items;
+CREATE TRIGGER cart_items_touch_cart AFTER INSERT OR UPDATE ON cart_items
+    FOR EACH ROW EXECUTE FUNCTION touch_parent_updated_at('carts', 'cart_id');
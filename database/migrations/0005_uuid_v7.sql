@@ -0,0 +1,15 @@
+-- Time-ordered keys for rows inserted in SQL (app/ids.py picks this or gen_random_uuid()).
+-- A version-7 UUID starts with the Unix time in milliseconds, so new keys go to the
+-- right-hand edge of a primary key index instead of a random leaf page. This takes a
+-- random v4 UUID, overwrites its first 6 bytes with the timestamp and sets the version
+-- bits from 0100 to 0111.
+
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS UUID AS $$
+    SELECT encode(
+        set_bit(set_bit(
+            overlay(uuid_send(gen_random_uuid())
+                    PLACING substring(int8send((extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                    FROM 1 FOR 6),
+            52, 1), 53, 1),
+        'hex')::uuid;
+$$ LANGUAGE sql VOLATILE;
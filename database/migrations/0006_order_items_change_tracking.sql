@@ -0,0 +1,28 @@
+-- MongoDB order documents embed their order_items, so a line item that is added, corrected or
+-- removed bumps its order's updated_at and the incremental sync rebuilds the order. orders is
+-- partitioned by order_date, so the order is looked up by (order_id, order_date) to touch one
+-- partition: touch_parent_updated_at now takes any number of key columns.
+
+-- Trigger arguments: parent table, then the key columns shared by the child and the parent
+CREATE OR REPLACE FUNCTION touch_parent_updated_at() RETURNS TRIGGER AS $$
+DECLARE
+    child RECORD;
+    condition TEXT := 'TRUE';
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        child := OLD;
+    ELSE
+        child := NEW;
+    END IF;
+    FOR i IN 1 .. TG_NARGS - 1 LOOP
+        condition := condition || format(' AND %I = ($1).%I', TG_ARGV[i], TG_ARGV[i]);
+    END LOOP;
+    EXECUTE format('UPDATE %I SET updated_at = clock_timestamp() WHERE %s', TG_ARGV[0], condition)
+    USING child;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS order_items_touch_order ON order_items;
+CREATE TRIGGER order_items_touch_order AFTER INSERT OR UPDATE OR DELETE ON order_items
+    FOR EACH ROW EXECUTE FUNCTION touch_parent_updated_at('orders', 'order_id', 'order_date');
@@ -1,3 +1,10 @@
+DROP MATERIALIZED VIEW IF EXISTS mv_customer_behavior;
+DROP MATERIALIZED VIEW IF EXISTS mv_product_affinity;
+DROP MATERIALIZED VIEW IF EXISTS mv_repeat_customers;
+DROP TABLE IF EXISTS schema_migrations CASCADE;
+DROP TABLE IF EXISTS matview_refreshes CASCADE;
+DROP TABLE IF EXISTS product_sales_stats CASCADE;
+DROP TABLE IF EXISTS product_rating_stats CASCADE;
 DROP TABLE IF EXISTS sessions CASCADE;
 DROP TABLE IF EXISTS cart_items CASCADE;
 DROP TABLE IF EXISTS carts CASCADE;
@@ -6,6 +13,32 @@ DROP TABLE IF EXISTS order_items CASCADE;
 DROP TABLE IF EXISTS orders CASCADE;
 DROP TABLE IF EXISTS products CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
+DROP FUNCTION IF EXISTS create_monthly_partitions(TEXT, DATE, DATE);
+DROP FUNCTION IF EXISTS touch_updated_at();
+DROP FUNCTION IF EXISTS touch_parent_updated_at();
+
+-- Creates the missing monthly range partitions <parent>_YYYY_MM covering from_date..to_date.
+-- Called for the months ahead by the app (app/partition_maintainer.py) and `python partitions.py
+-- ensure`, and by the data loaders for the months they load. Returns the number created.
+CREATE FUNCTION create_monthly_partitions(parent TEXT, from_date DATE, to_date DATE)
+RETURNS INT AS $$
+DECLARE
+    month DATE := DATE_TRUNC('month', from_date);
+    partition_name TEXT;
+    created INT := 0;
+BEGIN
+    WHILE month <= to_date LOOP
+        partition_name := format('%s_%s', parent, TO_CHAR(month, 'YYYY_MM'));
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, parent, month, (month + INTERVAL '1 month')::date);
+            created := created + 1;
+        END IF;
+        month := month + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
 
 
 -- 1. Users
@@ -22,27 +55,39 @@ CREATE TABLE products (
     name TEXT NOT NULL,
     category TEXT,
     price DECIMAL(10,2) NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     is_active BOOLEAN DEFAULT TRUE
 );
+-- Keyset pagination for the catalog's sort orders (product_id breaks ties; DESC sorts scan backwards)
+CREATE INDEX idx_products_active_created ON products (created_at, product_id) WHERE is_active = TRUE;
+CREATE INDEX idx_products_active_price ON products (price, product_id) WHERE is_active = TRUE;
 
 -- 3. Orders
+-- Range partitioned by month on order_date. The partition key has to be part of every unique
+-- constraint, so the primary key is (order_id, order_date); order ids are UUIDs (app/ids.py).
 CREATE TABLE orders (
-    order_id UUID PRIMARY KEY,
+    order_id UUID NOT NULL,
     user_id UUID REFERENCES users(user_id),
-    order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    order_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     status TEXT,
-    total_amount DECIMAL(10,2)
-);
+    total_amount DECIMAL(10,2),
+    PRIMARY KEY (order_id, order_date)
+) PARTITION BY RANGE (order_date);
 
 -- 4. Order Items
+-- Carries its order's order_date so it is partitioned on the same months as orders, the
+-- foreign key can point at orders' (order_id, order_date) key, and joins on both columns
+-- can be pruned and done partition by partition.
 CREATE TABLE order_items (
-    order_item_id UUID PRIMARY KEY,
-    order_id UUID REFERENCES orders(order_id),
+    order_item_id UUID NOT NULL,
+    order_id UUID NOT NULL,
+    order_date TIMESTAMP NOT NULL,
     product_id UUID REFERENCES products(product_id),
     quantity INT NOT NULL,
-    unit_price DECIMAL(10,2) NOT NULL
-);
+    unit_price DECIMAL(10,2) NOT NULL,
+    PRIMARY KEY (order_item_id, order_date),
+    FOREIGN KEY (order_id, order_date) REFERENCES orders(order_id, order_date)
+) PARTITION BY RANGE (order_date);
 
 -- 5. Reviews
 CREATE TABLE reviews (
@@ -72,11 +117,82 @@ CREATE TABLE cart_items (
 );
 
 -- 8. Sessions
+-- Range partitioned by month on session_start
 CREATE TABLE sessions (
-    session_id UUID PRIMARY KEY,
+    session_id UUID NOT NULL,
     user_id UUID REFERENCES users(user_id),
     traffic_source TEXT,
-    session_start TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    session_start TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     session_end TIMESTAMP,
-    made_purchase BOOLEAN DEFAULT FALSE
+    made_purchase BOOLEAN DEFAULT FALSE,
+    PRIMARY KEY (session_id, session_start)
+) PARTITION BY RANGE (session_start);
+
+-- Partitions for this month and the next three; loaders add the months of history they load
+SELECT create_monthly_partitions('orders', CURRENT_DATE, (CURRENT_DATE + INTERVAL '3 months')::date);
+SELECT create_monthly_partitions('order_items', CURRENT_DATE, (CURRENT_DATE + INTERVAL '3 months')::date);
+SELECT create_monthly_partitions('sessions', CURRENT_DATE, (CURRENT_DATE + INTERVAL '3 months')::date);
+
+-- 9. Product rating rollup
+-- Maintained by the app in the same transaction as each review; rebuild with `python rollups.py backfill`
+CREATE TABLE product_rating_stats (
+    product_id UUID PRIMARY KEY REFERENCES products(product_id),
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    rating_count BIGINT NOT NULL DEFAULT 0,
+    avg_rating DECIMAL(4,2) GENERATED ALWAYS AS (ROUND(rating_sum::numeric / NULLIF(rating_count, 0), 2)) STORED
+);
+CREATE INDEX idx_product_rating_stats_top ON product_rating_stats (avg_rating DESC NULLS LAST, rating_count DESC);
+
+-- 10. Product sales rollup (completed orders only)
+-- Maintained by checkout in the same statement that creates the order
+CREATE TABLE product_sales_stats (
+    product_id UUID PRIMARY KEY REFERENCES products(product_id),
+    units_sold BIGINT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    order_count BIGINT NOT NULL DEFAULT 0   -- order lines, matching COUNT(oi.order_id)
+);
+CREATE INDEX idx_product_sales_stats_units ON product_sales_stats (units_sold DESC);
+
+-- 11. Materialized analytics views
+-- Refreshed CONCURRENTLY by the app's background refresher (app/matviews.py); each needs a
+-- unique index for that. The dashboards read only these views.
+CREATE MATERIALIZED VIEW mv_repeat_customers AS
+WITH monthly_orders AS (
+    SELECT user_id, DATE_TRUNC('month', order_date) AS month, COUNT(order_id) AS orders_count
+    FROM orders
+    GROUP BY user_id, month
+)
+SELECT month, TO_CHAR(month, 'Month YYYY') as month_text, COUNT(user_id) as repeat_customers
+FROM monthly_orders
+WHERE orders_count > 1
+GROUP BY month;
+CREATE UNIQUE INDEX idx_mv_repeat_customers_month ON mv_repeat_customers (month);
+
+CREATE MATERIALIZED VIEW mv_product_affinity AS
+WITH order_pairs AS (
+    SELECT oi1.order_id, oi1.product_id as product1_id, oi2.product_id as product2_id
+    FROM order_items oi1
+    JOIN order_items oi2 ON oi1.order_id = oi2.order_id AND oi1.order_date = oi2.order_date
+    WHERE oi1.product_id < oi2.product_id
+)
+SELECT 
+    p1.name as product1_name,
+    p2.name as product2_name,
+    COUNT(DISTINCT op.order_id) as times_bought_together,
+    ROUND(COUNT(DISTINCT op.order_id) * 100.0 / (
+        SELECT COUNT(DISTINCT order_id) 
+        FROM order_pairs
+    ), 2) as affinity_percentage
+FROM order_pairs op
+JOIN products p1 ON op.product1_id = p1.product_id
+JOIN products p2 ON op.product2_id = p2.product_id
+GROUP BY p1.name, p2.name;
+CREATE UNIQUE INDEX idx_mv_product_affinity_pair ON mv_product_affinity (product1_name, product2_name);
+CREATE INDEX idx_mv_product_affinity_top ON mv_product_affinity (times_bought_together DESC);
+
+-- When each materialized view was last refreshed and how long the refresh took
+CREATE TABLE matview_refreshes (
+    view_name TEXT PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL,
+    duration_ms DOUBLE PRECISION NOT NULL
 );
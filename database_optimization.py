@@ -1,9 +1,18 @@
+import argparse
+import json
+import re
+import subprocess
+import sys
 import psycopg2
 import time
+from psycopg2.extensions import quote_ident
+from datetime import datetime
 from tabulate import tabulate
 import matplotlib.pyplot as plt
 import numpy as np
 
+from query_catalog import QUERIES, QUERIES_BY_NAME, sample_context
+
 # Database connection settings
 DB_CONFIG = {
     "dbname": "postgres",
@@ -13,10 +22,18 @@ DB_CONFIG = {
     "port": "5432"
 }
 
+# Benchmark defaults: samples per query and mode, untimed runs before them, bootstrap resamples
+BENCH_ITERATIONS = 50
+BENCH_WARMUP = 5
+BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE = 0.95
+# A p50 change must be significant and at least this large to be flagged by `compare`
+REGRESSION_THRESHOLD = 0.05
+
 def connect_db():
     return psycopg2.connect(**DB_CONFIG)
 
-def analyze_query_performance(conn, query, params=None, iterations=10):
+def analyze_query_performance(conn, query, params=None, iterations=10, warmup=2):
     """Analyze query performance with EXPLAIN ANALYZE"""
     cur = conn.cursor()
     
@@ -25,20 +42,610 @@ def analyze_query_performance(conn, query, params=None, iterations=10):
     plan = cur.fetchall()
     
     # Measure execution time
-    times = []
-    for _ in range(iterations):
-        start = time.time()
-        cur.execute(query, params or ())
-        cur.fetchall()
-        times.append(time.time() - start)
+    samples = time_statement(conn, query, params, iterations, warmup)
+    times = [ns / 1e9 for ns in samples]
     
     return {
         "plan": plan,
         "avg_time": sum(times) / len(times),
         "min_time": min(times),
-        "max_time": max(times)
+        "max_time": max(times),
+        "p50_time": float(np.percentile(times, 50)),
+        "p95_time": float(np.percentile(times, 95))
     }
 
+# === Query benchmark suite ===
+
+def time_statement(conn, sql, params=None, iterations=BENCH_ITERATIONS, warmup=BENCH_WARMUP):
+    """Nanoseconds to execute and fetch `sql`, once per iteration after `warmup` untimed runs.
+
+    Every run ends in a rollback, so writes leave nothing behind and reads do
+    not hold a snapshot open between runs.
+    """
+    cur = conn.cursor()
+    samples = []
+    for i in range(warmup + iterations):
+        start = time.perf_counter_ns()
+        cur.execute(sql, params)
+        if cur.description is not None:
+            cur.fetchall()
+        elapsed = time.perf_counter_ns() - start
+        conn.rollback()
+        if i >= warmup:
+            samples.append(elapsed)
+    cur.close()
+    return samples
+
+def time_statement_cold(sql, params_for, iterations=BENCH_ITERATIONS, drop_caches=None):
+    """Nanoseconds of the first run of `sql` on a fresh connection, once per iteration.
+
+    A new backend starts with empty catalog and plan caches. Emptying the
+    buffer and OS caches as well needs a server-side command, e.g. one that
+    restarts Postgres and drops the page cache, passed as `drop_caches`; it
+    runs before each connection and is not timed.
+    """
+    samples = []
+    for _ in range(iterations):
+        if drop_caches:
+            subprocess.run(drop_caches, shell=True, check=True)
+        conn = connect_db()
+        try:
+            samples.extend(time_statement(conn, sql, params_for(), iterations=1, warmup=0))
+        finally:
+            conn.close()
+    return samples
+
+def _bootstrap(samples, statistic, resamples=BOOTSTRAP_RESAMPLES, seed=0):
+    """`statistic` of `resamples` resamples (with replacement) of `samples`"""
+    rng = np.random.default_rng(seed)
+    draws = rng.choice(np.asarray(samples, dtype=float), size=(resamples, len(samples)))
+    return statistic(draws, axis=1)
+
+def _interval(values, confidence=CONFIDENCE):
+    tail = (1 - confidence) / 2 * 100
+    return [float(np.percentile(values, tail)), float(np.percentile(values, 100 - tail))]
+
+def summarize(samples_ns, confidence=CONFIDENCE):
+    """Mean and p50/p95/p99 in ms, each with a bootstrap confidence interval"""
+    ms = np.asarray(samples_ns, dtype=float) / 1e6
+    summary = {"n": len(ms), "mean_ms": float(ms.mean()),
+               "mean_ci": _interval(_bootstrap(ms, np.mean), confidence)}
+    for p in (50, 95, 99):
+        summary[f"p{p}_ms"] = float(np.percentile(ms, p))
+        summary[f"p{p}_ci"] = _interval(_bootstrap(ms, lambda a, axis: np.percentile(a, p, axis=axis)), confidence)
+    return summary
+
+def run_benchmarks(conn, queries, modes=("warm",), iterations=BENCH_ITERATIONS, warmup=BENCH_WARMUP,
+                   drop_caches=None):
+    """Time each catalog query in each cache mode; returns the JSON-ready results"""
+    ctx = sample_context(conn)
+    conn.rollback()
+    cur = conn.cursor()
+    cur.execute("SHOW server_version")
+    server_version = cur.fetchone()[0]
+    cur.close()
+    results = {
+        "meta": {"started_at": datetime.now().isoformat(timespec="seconds"), "server_version": server_version,
+                 "iterations": iterations, "warmup": warmup, "modes": list(modes), "confidence": CONFIDENCE},
+        "queries": {},
+    }
+    for query in queries:
+        entry = results["queries"][query.name] = {"route": query.route, "writes": query.writes}
+        for mode in modes:
+            try:
+                if mode == "warm":
+                    samples = time_statement(conn, query.sql, query.params(ctx), iterations, warmup)
+                else:
+                    samples = time_statement_cold(query.sql, lambda: query.params(ctx), iterations, drop_caches)
+            except psycopg2.Error as e:
+                conn.rollback()
+                print(f"  {query.name} ({mode}): failed: {e}")
+                entry[mode] = {"error": str(e)}
+                continue
+            entry[mode] = {**summarize(samples), "samples_ns": samples}
+            print(f"  {query.name} ({mode}): p50 {entry[mode]['p50_ms']:.3f} ms, p99 {entry[mode]['p99_ms']:.3f} ms")
+    return results
+
+def compare_runs(baseline, current, threshold=REGRESSION_THRESHOLD, confidence=CONFIDENCE):
+    """Per query and mode: p50 before/after, a bootstrap interval for the p50 change, and a verdict.
+
+    A change counts only when the interval for (current - baseline) p50 excludes
+    zero and the p50 moved by more than `threshold`; returns (rows, regressions).
+    """
+    rows, regressions = [], 0
+    for name, entry in current["queries"].items():
+        before_entry = baseline["queries"].get(name, {})
+        for mode in current["meta"]["modes"]:
+            before, after = before_entry.get(mode), entry.get(mode)
+            if not before or not after or "error" in before or "error" in after:
+                continue
+            before_ms = np.asarray(before["samples_ns"], dtype=float) / 1e6
+            after_ms = np.asarray(after["samples_ns"], dtype=float) / 1e6
+            low, high = _interval(_bootstrap(after_ms, np.median, seed=1) - _bootstrap(before_ms, np.median, seed=2),
+                                  confidence)
+            ratio = after["p50_ms"] / before["p50_ms"] if before["p50_ms"] else float("inf")
+            if low > 0 and ratio > 1 + threshold:
+                verdict = "REGRESSION"
+                regressions += 1
+            elif high < 0 and ratio < 1 - threshold:
+                verdict = "improved"
+            else:
+                verdict = "-"
+            rows.append([name, mode, f"{before['p50_ms']:.3f}", f"{after['p50_ms']:.3f}", f"{ratio:.2f}x",
+                         f"[{low:+.3f}, {high:+.3f}]", verdict])
+    return rows, regressions
+
+# === Plan baselines ===
+
+# Plan checks: a relation newly read by Seq Scan, a row estimate off by more than
+# ESTIMATE_ERROR_LIMIT times that also grew ESTIMATE_ERROR_GROWTH-fold, and buffer
+# accesses up by more than BUFFER_GROWTH (and at least BUFFER_GROWTH_MIN_BLOCKS blocks)
+ESTIMATE_ERROR_LIMIT = 100
+ESTIMATE_ERROR_GROWTH = 10
+BUFFER_GROWTH = 0.5
+BUFFER_GROWTH_MIN_BLOCKS = 100
+
+# Monthly partitions (orders_2025_03, orders_2025_03_pkey) count as their parent
+PARTITION_SUFFIX = re.compile(r"_\d{4}_\d{2}(?=_|$)")
+APPEND_NODES = ("Append", "Merge Append")
+
+def capture_plan(conn, sql, params=None):
+    """EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) of one statement, rolled back afterwards"""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+        return cur.fetchone()[0][0]
+    finally:
+        cur.close()
+        conn.rollback()
+
+def _node_shape(node):
+    """Node type, relation and index of a plan subtree, with partitions folded into their parent"""
+    label = node["Node Type"]
+    if node.get("Join Type"):
+        label += f" ({node['Join Type']})"
+    if node.get("Relation Name"):
+        label += f" on {PARTITION_SUFFIX.sub('', node['Relation Name'])}"
+    if node.get("Index Name"):
+        label += f" using {PARTITION_SUFFIX.sub('', node['Index Name'])}"
+    children = [_node_shape(child) for child in node.get("Plans", [])]
+    if node["Node Type"] in APPEND_NODES:
+        # One line per distinct partition subtree, so adding a month is not a plan change
+        children = list(dict.fromkeys(children))
+    return (label, tuple(children))
+
+def _shape_lines(shape, depth=0):
+    label, children = shape
+    lines = ["  " * depth + label]
+    for child in children:
+        lines += _shape_lines(child, depth + 1)
+    return lines
+
+def normalize_plan(plan):
+    """What plan regressions are judged on: shape, join order, scans, estimate errors and buffers"""
+    root = plan["Plan"]
+    join_order, seq_scans, indexes = [], set(), set()
+    worst = {"q_error": 1.0, "node": None}
+
+    def walk(node):
+        relation = PARTITION_SUFFIX.sub("", node["Relation Name"]) if node.get("Relation Name") else None
+        if relation and (not join_order or join_order[-1] != relation):
+            join_order.append(relation)
+        if node["Node Type"] == "Seq Scan" and relation:
+            seq_scans.add(relation)
+        if node.get("Index Name"):
+            indexes.add(PARTITION_SUFFIX.sub("", node["Index Name"]))
+        if node.get("Actual Loops"):
+            # Both are per loop; clamp at one row so empty results do not divide by zero
+            estimate, actual = max(node["Plan Rows"], 1), max(node["Actual Rows"], 1)
+            q_error = max(estimate / actual, actual / estimate)
+            if q_error > worst["q_error"]:
+                worst.update(q_error=q_error, node=f"{node['Node Type']}{' on ' + relation if relation else ''}: "
+                                                   f"estimated {node['Plan Rows']:,}, actual {node['Actual Rows']:,}")
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(root)
+    return {
+        "shape": _shape_lines(_node_shape(root)),
+        "join_order": join_order,
+        "seq_scans": sorted(seq_scans),
+        "indexes": sorted(indexes),
+        "max_q_error": worst["q_error"],
+        "worst_estimate": worst["node"],
+        # Buffer counts of a node include its children's, so the root's are the statement's
+        "shared_hit": root.get("Shared Hit Blocks", 0),
+        "shared_read": root.get("Shared Read Blocks", 0),
+        "execution_ms": plan.get("Execution Time"),
+        "planning_ms": plan.get("Planning Time"),
+    }
+
+def capture_plans(conn, queries):
+    """Normalized and raw plans of `queries`, with the table sizes they were taken at"""
+    ctx = sample_context(conn)
+    conn.rollback()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT relname, n_live_tup FROM pg_stat_user_tables
+        WHERE relname = ANY(%s) ORDER BY relname
+    """, (["users", "products", "orders", "order_items", "reviews", "carts", "cart_items", "sessions"],))
+    table_rows = dict(cur.fetchall())
+    cur.close()
+    conn.rollback()
+    plans = {}
+    for query in queries:
+        plan = capture_plan(conn, query.sql, query.params(ctx))
+        plans[query.name] = {"summary": normalize_plan(plan), "plan": plan}
+        print(f"  {query.name}: {plans[query.name]['summary']['execution_ms']:.2f} ms")
+    return {"meta": {"captured_at": datetime.now().isoformat(timespec="seconds"), "table_rows": table_rows},
+            "plans": plans}
+
+def diff_plan(before, after):
+    """Findings for one query's normalized plans; each is (severity, message)"""
+    findings = []
+    if before["shape"] != after["shape"]:
+        changed = next((i for i, (a, b) in enumerate(zip(before["shape"], after["shape"])) if a != b),
+                       min(len(before["shape"]), len(after["shape"])))
+        was = before["shape"][changed].strip() if changed < len(before["shape"]) else "(nothing)"
+        now = after["shape"][changed].strip() if changed < len(after["shape"]) else "(nothing)"
+        findings.append(("warning", f"plan changed at node {changed + 1}: {was} -> {now}"))
+    if before["join_order"] != after["join_order"]:
+        findings.append(("warning", f"join order {' > '.join(before['join_order'])} -> {' > '.join(after['join_order'])}"))
+    for relation in sorted(set(after["seq_scans"]) - set(before["seq_scans"])):
+        findings.append(("regression", f"new Seq Scan on {relation}"))
+    if after["max_q_error"] > ESTIMATE_ERROR_LIMIT and after["max_q_error"] > before["max_q_error"] * ESTIMATE_ERROR_GROWTH:
+        findings.append(("regression", f"row estimate off {after['max_q_error']:,.0f}x "
+                                       f"(was {before['max_q_error']:,.0f}x): {after['worst_estimate']}"))
+    buffers_before = before["shared_hit"] + before["shared_read"]
+    buffers_after = after["shared_hit"] + after["shared_read"]
+    if buffers_after > buffers_before * (1 + BUFFER_GROWTH) and buffers_after - buffers_before >= BUFFER_GROWTH_MIN_BLOCKS:
+        findings.append(("regression", f"buffers {buffers_before:,} -> {buffers_after:,} "
+                                       f"(reads {before['shared_read']:,} -> {after['shared_read']:,})"))
+    return findings
+
+def diff_plans(baseline, current):
+    """(rows for a table, number of regressions) comparing two capture_plans() results"""
+    rows, regressions = [], 0
+    for name, entry in current["plans"].items():
+        before = baseline["plans"].get(name)
+        after = entry["summary"]
+        if before is None:
+            rows.append([name, "", f"{after['execution_ms']:.2f}", "new query, no baseline"])
+            continue
+        findings = diff_plan(before["summary"], after)
+        regressions += sum(1 for severity, _ in findings if severity == "regression")
+        rows.append([name, f"{before['summary']['execution_ms']:.2f}", f"{after['execution_ms']:.2f}",
+                     "\n".join(f"{severity.upper()}: {message}" for severity, message in findings) or "-"])
+    return rows, regressions
+
+# === What-if index advisor ===
+
+# Statements taken from pg_stat_statements, candidates built, and columns per candidate, at most
+ADVISOR_STATEMENTS = 50
+ADVISOR_CANDIDATES = 40
+ADVISOR_MAX_COLUMNS = 3
+# The planner does not cost index maintenance, so every row a statement writes to a table is
+# charged this many cost units per candidate index on it (about one random page write)
+INDEX_WRITE_COST = 4.0
+# How long a candidate build waits for its table's lock before the candidate is skipped
+ADVISOR_LOCK_TIMEOUT = "2s"
+QUOTED_LITERAL = re.compile(r"'(?:[^']|'')*'")
+COLUMN_REFERENCE = re.compile(r"\b(?:([a-z_][a-z0-9_]*)\.)?([a-z_][a-z0-9_]*)\b")
+SORT_KEY = re.compile(r"^(?:([a-z_][a-z0-9_]*)\.)?([a-z_][a-z0-9_]*)((?: DESC)?(?: NULLS (?:FIRST|LAST))?)$")
+JOIN_CONDITIONS = ("Hash Cond", "Merge Cond", "Join Filter")
+ADVICE_HEADERS = ["#", "Index", "Statements helped (cost before -> after)", "Benefit", "Size", "Rows written",
+                  "Write cost", "Net benefit"]
+
+def catalog_workload(conn):
+    """Every statement in the query catalog, once, with sample parameters"""
+    ctx = sample_context(conn)
+    conn.rollback()
+    return [{"name": query.name, "sql": query.sql, "params": query.params(ctx), "calls": 1, "rows_per_call": 1,
+             "generic": False} for query in QUERIES]
+
+def statement_workload(conn, limit=ADVISOR_STATEMENTS):
+    """The statements with the most total time in pg_stat_statements, or None if it is not installed.
+
+    Statements with $n parameters are explained with GENERIC_PLAN, which needs Postgres 16;
+    older servers leave them out.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(r"""
+            SELECT query, calls, rows
+            FROM pg_stat_statements
+            WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+              AND query ~* '^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\M'
+              AND query !~* '\m(pg_catalog|pg_stat\w*|information_schema)\M'
+            ORDER BY total_exec_time DESC
+            LIMIT %s
+        """, (limit,))
+        statements = cur.fetchall()
+        cur.execute("SHOW server_version_num")
+        generic_plans = int(cur.fetchone()[0]) >= 160000
+    except psycopg2.Error:
+        return None
+    finally:
+        cur.close()
+        conn.rollback()
+    workload, skipped = [], 0
+    for query, calls, rows in statements:
+        parameterized = re.search(r"\$\d", query) is not None
+        if parameterized and not generic_plans:
+            skipped += 1
+            continue
+        workload.append({"name": " ".join(query.split())[:60], "sql": query, "params": None, "calls": calls,
+                         "rows_per_call": rows / calls if calls else 0, "generic": parameterized})
+    if skipped:
+        print(f"  skipped {skipped} parameterized statement(s): explaining them needs Postgres 16")
+    return workload
+
+def collect_workload(conn, source="auto"):
+    """(source used, workload); None for the workload if `source` is "statements" and it is unavailable"""
+    if source in ("auto", "statements"):
+        workload = statement_workload(conn)
+        if workload or source == "statements":
+            return "pg_stat_statements", workload
+    return "query catalog", catalog_workload(conn)
+
+def _schema(conn):
+    """Columns of each table, the table each partition belongs to, and the key columns of plain indexes"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT c.relname, array_agg(a.attname::text)
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+        WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p', 'm') AND NOT c.relispartition
+        GROUP BY c.relname
+    """)
+    columns = {table: set(names) for table, names in cur.fetchall()}
+    cur.execute("""
+        SELECT c.relname, pg_partition_root(c.oid)::regclass::text
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relispartition AND c.relkind IN ('r', 'p')
+    """)
+    parents = dict(cur.fetchall())
+    cur.execute("""
+        SELECT c.relname,
+               array(SELECT a.attname::text
+                     FROM unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, position)
+                     JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                     WHERE k.position <= i.indnkeyatts
+                     ORDER BY k.position)
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND NOT c.relispartition
+          AND i.indpred IS NULL AND NOT 0 = ANY(i.indkey::int2[])
+    """)
+    existing = {}
+    for table, index_columns in cur.fetchall():
+        existing.setdefault(table, []).append(index_columns)
+    cur.close()
+    conn.rollback()
+    return columns, parents, existing
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+def _plan_tables(plan, parents):
+    """(tables read, tables written) by a plan, with partitions folded into their table"""
+    read, written = set(), set()
+    for node in _plan_nodes(plan["Plan"]):
+        if node.get("Relation Name"):
+            table = parents.get(node["Relation Name"], node["Relation Name"])
+            (written if node["Node Type"] == "ModifyTable" else read).add(table)
+    return read, written
+
+def _conjuncts(expression):
+    """The AND-ed terms of a plan condition, with string literals blanked out"""
+    expression = QUOTED_LITERAL.sub("''", expression)
+    if expression.startswith("(") and expression.endswith(")"):
+        expression = expression[1:-1]
+    terms, depth, start = [], 0, 0
+    for position, char in enumerate(expression):
+        depth += (char == "(") - (char == ")")
+        if depth == 0 and expression.startswith(" AND ", position):
+            terms.append(expression[start:position])
+            start = position + len(" AND ")
+    terms.append(expression[start:])
+    return terms
+
+def _columns_in(term, aliases, columns):
+    """Columns of `columns` a term refers to, unqualified or qualified with one of `aliases`"""
+    found = []
+    for qualifier, name in COLUMN_REFERENCE.findall(term):
+        if (not qualifier or qualifier in aliases) and name in columns and name not in found:
+            found.append(name)
+    return found
+
+def index_candidates(plans, schema):
+    """{(table, column specs): calls of the statements suggesting it} from the workload's plans.
+
+    Scans that filter rows suggest their filter columns, alone and as one composite
+    (equality columns first, then a range column); join conditions suggest the join
+    keys; sorts and groupings over a single table suggest their keys, after that
+    table's equality filter columns. Candidates an existing index already leads with
+    are dropped.
+    """
+    columns, parents, existing = schema
+    candidates = {}
+
+    def add(table, specs):
+        specs = tuple(specs[:ADVISOR_MAX_COLUMNS])
+        names = [spec.split()[0] for spec in specs]
+        if len(set(names)) != len(names):
+            return
+        plain = all(spec == name for spec, name in zip(specs, names))
+        if plain and any(index[:len(names)] == names for index in existing.get(table, [])):
+            return
+        suggested.add((table, specs))
+
+    for plan, calls in plans:
+        suggested = set()
+        nodes = list(_plan_nodes(plan["Plan"]))
+        aliases = {}
+        for node in nodes:
+            if node.get("Relation Name") and node.get("Alias"):
+                table = parents.get(node["Relation Name"], node["Relation Name"])
+                aliases[node["Alias"]] = table
+        # Partition scans are aliased o_1, o_2...; conditions above the Append use plain o
+        for alias, table in list(aliases.items()):
+            aliases.setdefault(re.sub(r"_\d+$", "", alias), table)
+        tables = set(aliases.values())
+        only = next(iter(tables)) if len(tables) == 1 else None
+
+        equalities = {}
+        for node in nodes:
+            table = aliases.get(node.get("Alias")) if node.get("Relation Name") else None
+            if table not in columns or node["Node Type"] == "ModifyTable":
+                continue
+            names = {node["Alias"], re.sub(r"_\d+$", "", node["Alias"])}
+            equal, ranged = [], []
+            for key in ("Filter", "Index Cond", "Recheck Cond"):
+                for term in _conjuncts(node.get(key, "")):
+                    if " OR " in term:
+                        continue
+                    found = _columns_in(term, names, columns[table])
+                    if re.search(r" = | IS NULL", term):
+                        equal += [name for name in found if name not in equal]
+                    elif re.search(r" (<|>|<=|>=) ", term):
+                        ranged += [name for name in found if name not in ranged and name not in equal]
+            for name in equal + ranged:
+                add(table, [name])
+            if len(equal + ranged[:1]) > 1:
+                add(table, equal + ranged[:1])
+            equalities.setdefault(table, [])
+            equalities[table] += [name for name in equal if name not in equalities[table]]
+
+        for node in nodes:
+            for key in JOIN_CONDITIONS:
+                for qualifier, name in COLUMN_REFERENCE.findall(QUOTED_LITERAL.sub("''", node.get(key, ""))):
+                    table = aliases.get(qualifier)
+                    if table in columns and name in columns[table]:
+                        add(table, [name])
+            for key in ("Sort Key", "Group Key"):
+                keys = [SORT_KEY.match(sort_key) for sort_key in node.get(key, [])]
+                if not keys or not all(keys):
+                    continue
+                sorted_tables = {aliases.get(match.group(1)) if match.group(1) else only for match in keys}
+                table = sorted_tables.pop() if len(sorted_tables) == 1 else None
+                if table not in columns or any(match.group(2) not in columns[table] for match in keys):
+                    continue
+                specs = [match.group(2) + match.group(3) for match in keys]
+                add(table, specs)
+                filters = [name for name in equalities.get(table, []) if name not in [s.split()[0] for s in specs]]
+                if filters:
+                    add(table, filters + specs)
+        # Once per statement, however many partitions suggested it
+        for candidate in suggested:
+            candidates[candidate] = candidates.get(candidate, 0) + calls
+    return candidates
+
+def _explain(cur, entry):
+    """(total cost, plan) of one workload statement without running it, or (None, None) on an error"""
+    options = "GENERIC_PLAN, FORMAT JSON" if entry["generic"] else "FORMAT JSON"
+    cur.execute("SAVEPOINT advisor_explain")
+    try:
+        cur.execute(f"EXPLAIN ({options}) {entry['sql']}", entry["params"])
+        plan = cur.fetchone()[0][0]
+    except psycopg2.Error:
+        cur.execute("ROLLBACK TO SAVEPOINT advisor_explain")
+        return None, None
+    cur.execute("RELEASE SAVEPOINT advisor_explain")
+    return plan["Plan"]["Total Cost"], plan
+
+def evaluate_candidate(conn, table, specs, workload):
+    """Build one candidate index, re-plan the statements reading `table`, and roll it all back.
+
+    Unlike a hypothetical index, the planner sees the index's real size and height; the
+    price is a real build, holding a lock that blocks writes to the table while it runs.
+    """
+    cur = conn.cursor()
+    columns = ", ".join(quote_ident(spec.split()[0], cur) + spec[len(spec.split()[0]):] for spec in specs)
+    result = {"table": table, "definition": f"{quote_ident(table, cur)} ({columns})", "helped": [], "benefit": 0.0}
+    try:
+        cur.execute(f"SET LOCAL lock_timeout = '{ADVISOR_LOCK_TIMEOUT}'")
+        start = time.perf_counter()
+        cur.execute(f"CREATE INDEX advisor_candidate ON {result['definition']}")
+        result["build_seconds"] = time.perf_counter() - start
+        # A partitioned index ('I') is empty itself; its partitions' indexes hold the entries.
+        # pg_partition_tree has no rows for an index outside a partition tree.
+        cur.execute("""
+            SELECT CASE WHEN c.relkind = 'I'
+                        THEN (SELECT COALESCE(SUM(pg_relation_size(relid)), 0)
+                              FROM pg_partition_tree(c.oid))
+                        ELSE pg_relation_size(c.oid) END
+            FROM pg_class c
+            WHERE c.oid = 'advisor_candidate'::regclass
+        """)
+        result["size"] = cur.fetchone()[0]
+        for entry in workload:
+            if table not in entry["reads"]:
+                continue
+            cost, _ = _explain(cur, entry)
+            if cost is not None and cost < entry["cost"]:
+                result["benefit"] += entry["calls"] * (entry["cost"] - cost)
+                result["helped"].append((entry["name"], entry["cost"], cost))
+    except psycopg2.Error as e:
+        result["error"] = str(e).strip()
+    finally:
+        cur.close()
+        conn.rollback()
+    result["rows_written"] = sum(entry["calls"] * entry["rows_per_call"] for entry in workload
+                                 if table in entry["writes"])
+    result["write_cost"] = result["rows_written"] * INDEX_WRITE_COST
+    result["net"] = result["benefit"] - result["write_cost"]
+    return result
+
+def advise_indexes(conn, workload, max_candidates=ADVISOR_CANDIDATES):
+    """Candidate indexes for `workload`, best net benefit first.
+
+    Benefit is the planner cost the workload saves with the index, each statement
+    weighted by its calls; the write cost charges INDEX_WRITE_COST per row the
+    workload writes to the table. Both are planner cost units.
+    """
+    schema = _schema(conn)
+    cur = conn.cursor()
+    explained, plans = [], []
+    for entry in workload:
+        cost, plan = _explain(cur, entry)
+        if plan is None:
+            print(f"  could not explain {entry['name']}, leaving it out")
+            continue
+        reads, writes = _plan_tables(plan, schema[1])
+        explained.append({**entry, "cost": cost, "reads": reads, "writes": writes})
+        plans.append((plan, entry["calls"]))
+    cur.close()
+    conn.rollback()
+
+    candidates = sorted(index_candidates(plans, schema).items(), key=lambda item: (-item[1], item[0]))
+    print(f"🧱 Building {min(len(candidates), max_candidates)} of {len(candidates)} candidate index(es)...")
+    results = []
+    for (table, specs), _ in candidates[:max_candidates]:
+        result = evaluate_candidate(conn, table, specs, explained)
+        if "error" in result:
+            print(f"  skipped {result['definition']}: {result['error']}")
+            continue
+        results.append(result)
+    return sorted(results, key=lambda result: result["net"], reverse=True)
+
+def advice_rows(results):
+    rows = []
+    for rank, result in enumerate(results, 1):
+        helped = sorted(result["helped"], key=lambda item: item[2] - item[1])
+        lines = [f"{name}: {before:,.0f} -> {after:,.0f}" for name, before, after in helped[:5]]
+        if len(helped) > 5:
+            lines.append(f"... and {len(helped) - 5} more")
+        rows.append([rank, f"CREATE INDEX ON {result['definition']}", "\n".join(lines), f"{result['benefit']:,.0f}",
+                     f"{result['size'] / 1024 / 1024:,.1f} MiB", f"{result['rows_written']:,.0f}",
+                     f"{result['write_cost']:,.0f}", f"{result['net']:,.0f}"])
+    return rows
+
 def analyze_index_usage(conn):
     """Analyze index usage statistics"""
     cur = conn.cursor()
@@ -55,21 +662,13 @@ def analyze_index_usage(conn):
     """)
     return cur.fetchall()
 
-def suggest_indexes(conn):
-    """Suggest potential indexes based on query patterns"""
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT 
-            schemaname, 
-            tablename, 
-            attname, 
-            n_distinct, 
-            correlation
-        FROM pg_stats
-        WHERE schemaname NOT IN ('pg_catalog', 'information_schema')
-        ORDER BY n_distinct DESC;
-    """)
-    return cur.fetchall()
+def suggest_indexes(conn, top=10):
+    """The missing indexes worth most to the app's workload (see advise_indexes), best first.
+
+    Builds every candidate on the live tables, blocking writes to each while it builds.
+    """
+    _, workload = collect_workload(conn)
+    return [result for result in advise_indexes(conn, workload) if result["net"] > 0][:top]
 
 def analyze_table_statistics(conn):
     """Analyze table statistics"""
@@ -102,7 +701,7 @@ def analyze_long_running_queries(conn):
     """)
     return cur.fetchall()
 
-def generate_performance_report():
+def generate_performance_report(advise=False):
     conn = connect_db()
     
     print("\n=== Database Performance Analysis Report ===\n")
@@ -151,13 +750,15 @@ def generate_performance_report():
         query_results.append([
             q["name"],
             f"{result['avg_time']:.4f}s",
-            f"{result['min_time']:.4f}s",
+            f"{result['p50_time']:.4f}s",
+            f"{result['p95_time']:.4f}s",
             f"{result['max_time']:.4f}s"
         ])
     
     print(tabulate(query_results, 
-                  headers=["Query", "Avg Time", "Min Time", "Max Time"],
+                  headers=["Query", "Avg Time", "p50", "p95", "Max Time"],
                   tablefmt="grid"))
+    print("(`python database_optimization.py bench` times every statement the app issues)")
     
     # 2. Index Analysis
     print("\n2. Index Usage Analysis:")
@@ -168,10 +769,14 @@ def generate_performance_report():
     
     # 3. Suggested Indexes
     print("\n3. Suggested Indexes:")
-    suggested_indexes = suggest_indexes(conn)
-    print(tabulate(suggested_indexes,
-                  headers=["Schema", "Table", "Column", "Distinct Values", "Correlation"],
-                  tablefmt="grid"))
+    suggested_indexes = suggest_indexes(conn) if advise else []
+    if suggested_indexes:
+        print(tabulate(advice_rows(suggested_indexes), headers=ADVICE_HEADERS, tablefmt="grid"))
+    elif advise:
+        print("No candidate index pays for its writes.")
+    else:
+        print("Skipped: the advisor builds candidate indexes, blocking writes while each builds.")
+        print("Run `python database_optimization.py advise` (or `report --advise`) when that is acceptable.")
     
     # 4. Table Statistics
     print("\n4. Table Statistics:")
@@ -193,9 +798,13 @@ def generate_performance_report():
     # Generate Recommendations
     print("\n=== Performance Recommendations ===")
     print("\n1. Index Optimization:")
-    print("- Consider adding indexes on frequently joined columns")
-    print("- Review and potentially remove unused indexes")
-    print("- Create composite indexes for common query patterns")
+    for result in suggested_indexes[:3]:
+        print(f"- Add CREATE INDEX ON {result['definition']} (net benefit {result['net']:,.0f})")
+    unused = [f"{table}.{index}" for _, table, index, scans, _, _ in index_usage if scans == 0]
+    if unused:
+        print(f"- Review unused indexes: {', '.join(unused)}")
+    if advise and not suggested_indexes and not unused:
+        print("- No index changes suggested")
     
     print("\n2. Query Optimization:")
     print("- Optimize complex joins in the top-selling products query")
@@ -209,5 +818,126 @@ def generate_performance_report():
     
     conn.close()
 
+def main():
+    parser = argparse.ArgumentParser(description="PostgreSQL performance report, benchmarks, plan checks and index advice")
+    subparsers = parser.add_subparsers(dest="command")
+    report = subparsers.add_parser("report", help="the performance report (default); reads statistics only")
+    report.add_argument("--advise", action="store_true",
+                        help="also run the index advisor, which blocks writes to tables while it builds candidates")
+    bench = subparsers.add_parser("bench", help="time every statement the app issues")
+    bench.add_argument("--queries", nargs="+", choices=sorted(QUERIES_BY_NAME), help="only these statements")
+    bench.add_argument("--iterations", type=int, default=BENCH_ITERATIONS, help="timed runs per statement and mode")
+    bench.add_argument("--warmup", type=int, default=BENCH_WARMUP, help="untimed runs first (warm mode)")
+    bench.add_argument("--modes", nargs="+", choices=("warm", "cold"), default=["warm"],
+                       help="warm: one connection after warmup; cold: first run on a new connection")
+    bench.add_argument("--drop-caches", metavar="COMMAND",
+                       help="shell command run before every cold run, e.g. to restart Postgres and drop the OS cache")
+    bench.add_argument("--save", help="write the results (with raw samples) to this JSON file")
+    compare = subparsers.add_parser("compare", help="flag significant p50 changes between two saved runs")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                         help="smallest relative p50 change worth flagging")
+    plans = subparsers.add_parser("plans", help="capture dashboard query plans, or diff them against a baseline")
+    plan_commands = plans.add_subparsers(dest="plans_command", required=True)
+    capture = plan_commands.add_parser("capture", help="store the current plans as a baseline")
+    capture.add_argument("--save", required=True, help="JSON file to write")
+    plan_diff = plan_commands.add_parser("diff", help="compare plans against a stored baseline")
+    plan_diff.add_argument("baseline")
+    plan_diff.add_argument("--current", help="JSON from an earlier capture instead of capturing now")
+    plan_diff.add_argument("--save", help="also store the plans captured now")
+    for command in (capture, plan_diff):
+        command.add_argument("--queries", nargs="+", choices=sorted(QUERIES_BY_NAME),
+                             help="statements to explain (default: the dashboard queries)")
+    advise = subparsers.add_parser("advise", help="rank missing indexes by the planner cost they save the workload; "
+                                                  "builds each candidate, blocking writes to its table meanwhile")
+    advise.add_argument("--source", choices=("auto", "statements", "catalog"), default="auto",
+                        help="statements: pg_stat_statements; catalog: every app statement once; "
+                             "auto: pg_stat_statements if it has any, else the catalog")
+    advise.add_argument("--top", type=int, default=10, help="list at most this many indexes")
+    advise.add_argument("--candidates", type=int, default=ADVISOR_CANDIDATES,
+                        help="build at most this many candidates, most suggested first")
+    advise.add_argument("--min-benefit", type=float, default=0.0,
+                        help="smallest net benefit (planner cost units) worth listing")
+    args = parser.parse_args()
+
+    if args.command == "advise":
+        conn = connect_db()
+        try:
+            source, workload = collect_workload(conn, args.source)
+            if workload is None:
+                print("❌ pg_stat_statements is not installed in this database")
+                sys.exit(1)
+            print(f"🔍 Explaining {len(workload)} statement(s) from the {source}...")
+            results = advise_indexes(conn, workload, args.candidates)
+        finally:
+            conn.close()
+        results = [result for result in results if result["net"] > args.min_benefit][:args.top]
+        print(tabulate(advice_rows(results), headers=ADVICE_HEADERS, tablefmt="grid"))
+        print(f"\nBenefit and write cost are planner cost units; each row written costs {INDEX_WRITE_COST:g} per index")
+    elif args.command == "plans":
+        queries = ([QUERIES_BY_NAME[name] for name in args.queries] if args.queries
+                   else [query for query in QUERIES if query.dashboard and not query.writes])
+        current = None
+        if args.plans_command == "diff" and args.current:
+            with open(args.current) as f:
+                current = json.load(f)
+        if current is None:
+            conn = connect_db()
+            try:
+                print(f"🔍 Explaining {len(queries)} statement(s)...")
+                current = capture_plans(conn, queries)
+            finally:
+                conn.close()
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump(current, f, indent=2, default=str)
+            print(f"💾 Saved plans to {args.save}")
+        if args.plans_command == "diff":
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            print(f"Baseline from {baseline['meta']['captured_at']}, table rows {baseline['meta']['table_rows']}")
+            print(f"Current from {current['meta']['captured_at']}, table rows {current['meta']['table_rows']}")
+            rows, regressions = diff_plans(baseline, current)
+            print(tabulate(rows, headers=["Query", "Baseline (ms)", "Now (ms)", "Findings"], tablefmt="grid"))
+            print(f"\n{regressions} plan regression(s)")
+            sys.exit(1 if regressions else 0)
+    elif args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        rows, regressions = compare_runs(baseline, current, args.threshold)
+        print(tabulate(rows, headers=["Query", "Mode", "Baseline p50 (ms)", "p50 (ms)", "Ratio",
+                                      f"{CONFIDENCE:.0%} CI of change (ms)", "Verdict"], tablefmt="grid"))
+        print(f"\n{regressions} significant regression(s)")
+        sys.exit(1 if regressions else 0)
+    elif args.command == "bench":
+        queries = [QUERIES_BY_NAME[name] for name in args.queries] if args.queries else QUERIES
+        conn = connect_db()
+        try:
+            print(f"⏱️  Timing {len(queries)} statement(s), {args.iterations} runs each...")
+            results = run_benchmarks(conn, queries, args.modes, args.iterations, args.warmup, args.drop_caches)
+        finally:
+            conn.close()
+        rows = []
+        for name, entry in results["queries"].items():
+            for mode in args.modes:
+                stats = entry[mode]
+                if "error" in stats:
+                    rows.append([name, mode, "error", "", "", ""])
+                    continue
+                low, high = stats["p50_ci"]
+                rows.append([name, mode, f"{stats['p50_ms']:.3f}", f"[{low:.3f}, {high:.3f}]",
+                             f"{stats['p95_ms']:.3f}", f"{stats['p99_ms']:.3f}"])
+        print(tabulate(rows, headers=["Query", "Mode", "p50 (ms)", f"p50 {CONFIDENCE:.0%} CI", "p95 (ms)", "p99 (ms)"],
+                       tablefmt="grid"))
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"💾 Saved results to {args.save}")
+    else:
+        generate_performance_report(getattr(args, "advise", False))
+
 if __name__ == "__main__":
-    generate_performance_report() 
\ No newline at end of file
+    main() 
\ No newline at end of file
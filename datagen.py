@@ -0,0 +1,578 @@
+"""Vectorized generation of the store's dataset at any scale.
+
+Every table is produced in chunks of column arrays. Each chunk draws from its
+own random stream (seeded from the dataset seed, the table and the chunk
+number), and every primary key is a hash of the seed, the table and the row's
+position, so a chunk can be built on its own: a foreign key to user i is just
+the key of row i, and a child table regenerates the parent chunk it belongs to.
+Chunks can therefore be spread over processes and still give the same bytes.
+Names, emails and review comments come from pools built once with Faker.
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+from faker import Faker
+
+# Rows per table at scale 1: the sizes generate_data.py has always written
+BASE_ROWS = {"users": 1000, "products": 50, "orders": 5000, "reviews": 3000, "carts": 300, "sessions": 500}
+# Rows per chunk of a top-level table; small enough that a chunk's buffers stay in cache.
+# The same seed and chunk size always produce the same data.
+CHUNK_ROWS = 50_000
+# Where the generated history ends unless told otherwise. A fixed date rather than the
+# clock, so the same seed gives the same bytes on every run.
+AS_OF = datetime(2026, 1, 1)
+
+# Columns per table in load order (parents first), with how each is rendered:
+# uuid/text/timestamp are quoted, money is integer cents, NULLs come as masked arrays
+TABLES = {
+    "users": [("user_id", "uuid"), ("name", "text"), ("email", "text"), ("signup_source", "text")],
+    "products": [("product_id", "uuid"), ("name", "text"), ("category", "text"), ("price", "money"),
+                 ("created_at", "timestamp"), ("is_active", "bool")],
+    "orders": [("order_id", "uuid"), ("user_id", "uuid"), ("order_date", "timestamp"), ("status", "text"),
+               ("total_amount", "money")],
+    "order_items": [("order_item_id", "uuid"), ("order_id", "uuid"), ("order_date", "timestamp"),
+                    ("product_id", "uuid"), ("quantity", "int"), ("unit_price", "money")],
+    "reviews": [("review_id", "uuid"), ("user_id", "uuid"), ("product_id", "uuid"), ("rating", "int"),
+                ("comment", "text"), ("review_date", "timestamp")],
+    "carts": [("cart_id", "uuid"), ("user_id", "uuid"), ("created_at", "timestamp"), ("status", "text")],
+    "cart_items": [("cart_item_id", "uuid"), ("cart_id", "uuid"), ("product_id", "uuid"),
+                   ("added_at", "timestamp"), ("removed_at", "timestamp")],
+    "sessions": [("session_id", "uuid"), ("user_id", "uuid"), ("traffic_source", "text"),
+                 ("session_start", "timestamp"), ("session_end", "timestamp"), ("made_purchase", "bool")],
+}
+
+# How far back each table's dates go, in days
+HISTORY_DAYS = {"products": 182, "orders": 91, "reviews": 182, "carts": 91, "sessions": 61}
+
+SIGNUP_SOURCES = ["organic", "ad", "referral"]
+ORDER_STATUSES = ["pending", "completed"]
+CART_STATUSES = ["active", "abandoned", "converted"]
+TRAFFIC_SOURCES = ["Google Ads", "Organic", "Email Campaign", "Direct"]
+EMAIL_DOMAINS = ["example.com", "example.net", "example.org"]
+
+# (category, product type, price range in dollars)
+PRODUCT_TYPES = [
+    ("Smartphones", "iPhone", (699, 1299)), ("Smartphones", "Samsung Galaxy", (599, 1199)),
+    ("Smartphones", "Google Pixel", (499, 899)), ("Smartphones", "OnePlus", (399, 799)),
+    ("Accessories", "Screen Protector", (9, 49)), ("Accessories", "Stylus", (29, 129)),
+    ("Accessories", "Smart Watch", (199, 499)), ("Accessories", "Fitness Tracker", (79, 299)),
+    ("Audio", "Wireless Earbuds", (49, 299)), ("Audio", "Headphones", (99, 399)),
+    ("Audio", "Bluetooth Speaker", (79, 349)), ("Audio", "Soundbar", (199, 999)),
+    ("Charging", "Wireless Charger", (19, 99)), ("Charging", "Power Bank", (29, 149)),
+    ("Charging", "USB-C Cable", (9, 39)), ("Charging", "Car Charger", (19, 59)),
+    ("Cases", "Phone Case", (19, 79)), ("Cases", "Tablet Case", (29, 99)),
+    ("Cases", "Laptop Sleeve", (39, 129)), ("Cases", "Smart Watch Band", (19, 99)),
+]
+VARIATIONS = ["Pro", "Max", "Lite", "Air", "Plus", "Ultra"]
+
+POOL_SIZE = 512
+_TABLE_TAGS = {table: i for i, table in enumerate(TABLES)}
+# Item tables are generated with their parent's chunks
+PARENTS = {"order_items": "orders", "cart_items": "carts"}
+# An item's key position is its parent's position * ITEM_KEY_STRIDE + its line number
+ITEM_KEY_STRIDE = 8
+# Tables up to this many rows have their keys formatted once for foreign keys to look up
+KEY_TABLE_ROWS = 100_000
+
+# Four hex digits for every 16-bit value, as one uint32 of ASCII
+_HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+_WORDS = np.arange(1 << 16)
+_HEX_WORDS = np.stack([_HEX[(_WORDS >> shift) & 0xF] for shift in (12, 8, 4, 0)], axis=1).view(np.uint32).ravel()
+_ZERO = ord("0")
+
+# np.strings (NumPy 2) runs these without the per-element overhead np.char still has
+_add = getattr(np, "strings", np.char).add
+_replace = getattr(np, "strings", np.char).replace
+
+
+def format_uuids(raw):
+    """Canonical text (S36) of UUIDs given as an (n, 16) uint8 array"""
+    hex_digits = _HEX_WORDS[raw.view(">u2")].view(np.uint8).reshape(len(raw), 32)
+    out = np.full((len(raw), 36), ord("-"), dtype=np.uint8)
+    out[:, 0:8] = hex_digits[:, 0:8]
+    out[:, 9:13] = hex_digits[:, 8:12]
+    out[:, 14:18] = hex_digits[:, 12:16]
+    out[:, 19:23] = hex_digits[:, 16:20]
+    out[:, 24:36] = hex_digits[:, 20:32]
+    return out.view("S36").ravel()
+
+
+def _mix64(x):
+    """splitmix64 over a uint64 array (wrapping arithmetic)"""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def key_uuids(seed, table, positions, times_ms=None):
+    """UUIDs (S36) of rows of `table`, a pure function of the seed and each position.
+
+    The 128 bits are two splitmix64 outputs, so they look as random as uuid4()
+    while any process can work out the key of any row. Given Unix milliseconds
+    per row, the first 48 bits are those instead and the keys are version 7.
+    """
+    salt = _mix64(np.array([seed % (1 << 64)], dtype=np.uint64))
+    counters = np.asarray(positions, dtype=np.uint64)[:, None] * np.uint64(2) + np.arange(2, dtype=np.uint64)
+    counters |= np.uint64(_TABLE_TAGS[table] << 56)
+    raw = _mix64(counters ^ salt).astype(">u8").view(np.uint8).reshape(len(counters), 16)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | (0x40 if times_ms is None else 0x70)
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    if times_ms is not None:
+        raw[:, :6] = np.asarray(times_ms, dtype=">u8").view(np.uint8).reshape(-1, 8)[:, 2:]
+    return format_uuids(raw)
+
+
+def _put_digits(out, column, values, width):
+    for i in range(width - 1, -1, -1):
+        out[:, column + i] = _ZERO + values % 10
+        values = values // 10
+
+
+def _format_dates(days):
+    """'YYYY-MM-DD ' bytes, as an (n, 11) matrix, of datetime64[D] values"""
+    years, months = days.astype("M8[Y]"), days.astype("M8[M]")
+    out = np.empty((len(days), 11), dtype=np.uint8)
+    out[:, [4, 7]], out[:, 10] = ord("-"), ord(" ")
+    _put_digits(out, 0, years.astype(np.int64) + 1970, 4)
+    _put_digits(out, 5, (months - years).astype(np.int64) + 1, 2)
+    _put_digits(out, 8, (days - months).astype(np.int64) + 1, 2)
+    return out
+
+
+@lru_cache(maxsize=None)
+def _clock_text():
+    """'HH:MM:SS' bytes of every second of a day, as an (86400, 8) matrix"""
+    seconds = np.arange(86400)
+    out = np.empty((86400, 8), dtype=np.uint8)
+    out[:, [2, 5]] = ord(":")
+    _put_digits(out, 0, seconds // 3600, 2)
+    _put_digits(out, 3, seconds // 60 % 60, 2)
+    _put_digits(out, 6, seconds % 60, 2)
+    return out
+
+
+def format_timestamps(values):
+    """'YYYY-MM-DD HH:MM:SS' text (S19) of datetime64[s] values"""
+    days = values.astype("M8[D]")
+    seconds = (values - days).astype(np.int64)
+    out = np.empty((len(values), 19), dtype=np.uint8)
+    day_numbers = days.astype(np.int64)
+    first = day_numbers.min() if len(values) else 0
+    span = day_numbers.max() - first + 1 if len(values) else 0
+    # A chunk's dates fall on few days: format each day once and look the rows up
+    if span <= len(values):
+        out[:, :11] = _format_dates(np.arange(first, first + span).astype("M8[D]"))[day_numbers - first]
+    else:
+        out[:, :11] = _format_dates(days)
+    out[:, 11:] = _clock_text()[seconds]
+    return out.view("S19").ravel()
+
+
+# Numbers below 10 ** SMALL_INT_DIGITS are formatted by looking their text up
+SMALL_INT_DIGITS = 4
+
+
+@lru_cache(maxsize=None)
+def _small_int_text(width):
+    """Decimal text (S<width>) of every number below 10 ** width"""
+    return _format_ints(np.arange(10 ** width), width)
+
+
+@lru_cache(maxsize=None)
+def _two_digit_text():
+    """'00' to '99' (S2)"""
+    out = np.empty((100, 2), dtype=np.uint8)
+    _put_digits(out, 0, np.arange(100), 2)
+    return out.view("S2").ravel()
+
+
+def format_ints(values):
+    """Decimal text of non-negative integers, without NumPy's per-element conversion"""
+    values = np.asarray(values, dtype=np.int64)
+    width = max(1, len(str(int(values.max())))) if len(values) else 1
+    if width <= SMALL_INT_DIGITS:
+        return _small_int_text(width)[values]
+    return _format_ints(values, width)
+
+
+def _format_ints(values, width):
+    digits = np.empty((len(values), width), dtype=np.uint8)
+    _put_digits(digits, 0, values, width)
+    # Shift each number left over its leading zeros; S arrays drop the trailing NULs
+    out = np.zeros((len(values), width), dtype=np.uint8)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for w in range(2, width + 1):
+        lengths[values >= 10 ** (w - 1)] = w
+    for w in range(1, width + 1):
+        rows = lengths == w
+        out[rows, :w] = digits[rows, width - w:]
+    return out.view(f"S{width}").ravel()
+
+
+def _join(*parts):
+    """Element-wise concatenation of byte-string arrays and scalars"""
+    out = parts[0]
+    for part in parts[1:]:
+        out = _add(out, part)
+    return out
+
+
+class DatasetGenerator:
+    """The dataset for one scale factor and seed.
+
+    chunks(table) yields dicts of column name -> array, in TABLES order.
+    Referential guarantees match generate_data.py's: every user places at
+    least one order and every product has at least two reviews.
+    """
+
+    def __init__(self, scale=1.0, seed=0, chunk_rows=CHUNK_ROWS, now=None, uuid_version=7):
+        self.scale = scale
+        self.seed = seed
+        self.chunk_rows = chunk_rows
+        self.uuid_version = uuid_version
+        self.now = np.datetime64((now or AS_OF).replace(microsecond=0), "s")
+        self.rows = {table: max(1, round(rows * scale)) for table, rows in BASE_ROWS.items()}
+        self.rows["orders"] = max(self.rows["orders"], self.rows["users"])
+        self.rows["reviews"] = max(self.rows["reviews"], 2 * self.rows["products"])
+        self._pools = None
+        self._key_tables = {}
+
+    # === Building blocks ===
+
+    def _rng(self, table, chunk):
+        return np.random.default_rng([self.seed, _TABLE_TAGS[table], chunk])
+
+    def _spans(self, table):
+        """(start, length) of each chunk of a table with a fixed row count"""
+        total = self.rows[table]
+        return [(start, min(self.chunk_rows, total - start)) for start in range(0, total, self.chunk_rows)]
+
+    def _keys(self, table, positions):
+        times = self._key_times(table, positions) if self.uuid_version == 7 else None
+        return key_uuids(self.seed, table, positions, times)
+
+    def _key_times(self, table, positions):
+        """Milliseconds behind version-7 keys: the table's history spread evenly over its rows.
+
+        Keys then sort in load order, like keys made at insert time, and still
+        depend on nothing but the row's position.
+        """
+        parent = PARENTS.get(table, table)
+        total = self.rows[parent] * (ITEM_KEY_STRIDE if table in PARENTS else 1)
+        end = self.now.astype("datetime64[ms]").astype(np.int64)
+        span = HISTORY_DAYS.get(parent, max(HISTORY_DAYS.values())) * 86_400_000
+        return end - span + (np.asarray(positions) / total * span).astype(np.int64)
+
+    def _ids(self, table, start, n):
+        return self._keys(table, np.arange(start, start + n))
+
+    def _refs(self, table, positions):
+        """Keys of rows of `table` referenced by position; a small table's keys are made once"""
+        if self.rows[table] > KEY_TABLE_ROWS:
+            return self._keys(table, positions)
+        if table not in self._key_tables:
+            self._key_tables[table] = self._ids(table, 0, self.rows[table])
+        return self._key_tables[table][positions]
+
+    def _item_ids(self, table, start, per_parent):
+        """Keys of the items of consecutive parents starting at position `start`"""
+        first = np.cumsum(per_parent) - per_parent
+        line = np.arange(int(per_parent.sum())) - np.repeat(first, per_parent)
+        parent = np.repeat(np.arange(start, start + len(per_parent)), per_parent)
+        return self._keys(table, parent * ITEM_KEY_STRIDE + line)
+
+    @property
+    def pools(self):
+        """Name parts, email parts and review comments, drawn once from Faker"""
+        if self._pools is None:
+            faker = Faker()
+            Faker.seed(self.seed)
+            first = sorted({faker.first_name() for _ in range(POOL_SIZE * 4)})[:POOL_SIZE]
+            last = sorted({faker.last_name() for _ in range(POOL_SIZE * 4)})[:POOL_SIZE]
+            local = [re.sub(r"[^a-z]", "", n.lower()).encode() for n in first]
+            domain = [re.sub(r"[^a-z]", "", n.lower()).encode() for n in last]
+            # Every first/last pairing, so a user's name and email are one lookup each
+            self._pools = {
+                "names": np.array([f"{f} {l}".encode() for f in first for l in last]),
+                "emails": np.array([f + b"." + l for f in local for l in domain]),
+                "comments": np.array([faker.sentence().encode() for _ in range(POOL_SIZE)]),
+            }
+        return self._pools
+
+    def _dates_before(self, rng, n, days):
+        """n timestamps uniformly within `days` before now"""
+        return self.now - rng.integers(0, days * 86400, size=n).astype("timedelta64[s]")
+
+    def _dates_between(self, rng, start):
+        """A timestamp uniformly between each of `start` and now"""
+        span = (self.now - start).astype(np.int64)
+        return start + (rng.random(len(start)) * span).astype("timedelta64[s]")
+
+    def date_range(self, table):
+        """(first, last) possible timestamp of a table's partition key"""
+        days = HISTORY_DAYS["orders" if table == "order_items" else table]
+        return self.now - np.timedelta64(days * 86400, "s"), self.now
+
+    # === Tables ===
+
+    def chunk_count(self, table):
+        return len(self._spans(PARENTS.get(table, table)))
+
+    def chunk(self, table, k):
+        """Chunk k of a table; depends only on the seed, scale, chunk size and now"""
+        start, n = self._spans(PARENTS.get(table, table))[k]
+        return getattr(self, f"_{table}")(k, start, n)
+
+    def chunks(self, table, first=0, stop=None):
+        for k in range(first, self.chunk_count(table) if stop is None else stop):
+            yield self.chunk(table, k)
+
+    def _users(self, k, start, n):
+        rng, pools = self._rng("users", k), self.pools
+        person = rng.integers(len(pools["names"]), size=n)
+        domains = np.array([d.encode() for d in EMAIL_DOMAINS])[rng.integers(len(EMAIL_DOMAINS), size=n)]
+        # The row number keeps emails unique at any scale
+        number = format_ints(np.arange(start, start + n))
+        return {
+            "user_id": self._ids("users", start, n),
+            "name": pools["names"][person],
+            "email": _join(pools["emails"][person], number, b"@", domains),
+            "signup_source": np.array(SIGNUP_SOURCES, dtype="S")[rng.integers(len(SIGNUP_SOURCES), size=n)],
+        }
+
+    def _products(self, k, start, n):
+        rng = self._rng("products", k)
+        # Each type/variation pair once, in a seeded order; later rounds get a series number
+        combos = len(PRODUCT_TYPES) * len(VARIATIONS)
+        order = np.random.default_rng([self.seed, _TABLE_TAGS["products"]]).permutation(combos)
+        position = np.arange(start, start + n)
+        combo, series = order[position % combos], position // combos
+        kind, variation = combo // len(VARIATIONS), combo % len(VARIATIONS)
+        types = np.array([t.encode() for _, t, _ in PRODUCT_TYPES])
+        categories = np.array([c.encode() for c, _, _ in PRODUCT_TYPES])
+        low = np.array([p[0] * 100 for _, _, p in PRODUCT_TYPES])
+        high = np.array([p[1] * 100 for _, _, p in PRODUCT_TYPES])
+        suffix = np.where(series > 0, _add(b" ", format_ints(series + 1)), b"")
+        return {
+            "product_id": self._ids("products", start, n),
+            "name": _join(types[kind], b" ", np.array(VARIATIONS, dtype="S")[variation], suffix),
+            "category": categories[kind],
+            "price": rng.integers(low[kind], high[kind] + 1),
+            "created_at": self._dates_before(rng, n, HISTORY_DAYS["products"]),
+            "is_active": np.ones(n, dtype=bool),
+        }
+
+    def _orders(self, k, start, n):
+        rng = self._rng("orders", k)
+        users = self.rows["users"]
+        # The first `users` orders go one to each user, so every user has an order
+        position = np.arange(start, start + n)
+        user = np.where(position < users, position, rng.integers(users, size=n))
+        return {
+            "order_id": self._ids("orders", start, n),
+            "user_id": self._refs("users", user),
+            "order_date": self._dates_before(rng, n, HISTORY_DAYS["orders"]),
+            "status": np.array(ORDER_STATUSES, dtype="S")[rng.integers(len(ORDER_STATUSES), size=n)],
+            "total_amount": rng.integers(2000, 50001, size=n),
+        }
+
+    def _order_items(self, k, start, n):
+        orders = self._orders(k, start, n)
+        rng = self._rng("order_items", k)
+        per_order = rng.integers(1, 6, size=n)
+        total = int(per_order.sum())
+        return {
+            "order_item_id": self._item_ids("order_items", start, per_order),
+            "order_id": np.repeat(orders["order_id"], per_order),
+            "order_date": np.repeat(orders["order_date"], per_order),
+            "product_id": self._refs("products", rng.integers(self.rows["products"], size=total)),
+            "quantity": rng.integers(1, 4, size=total),
+            "unit_price": rng.integers(1000, 50001, size=total),
+        }
+
+    def _reviews(self, k, start, n):
+        rng = self._rng("reviews", k)
+        products = self.rows["products"]
+        # The first two reviews of every product come first and lean positive
+        position = np.arange(start, start + n)
+        seeded = position < 2 * products
+        product = np.where(seeded, position // 2, rng.integers(products, size=n))
+        rating = np.where(seeded, rng.integers(3, 6, size=n), rng.integers(1, 6, size=n))
+        comments = self.pools["comments"]
+        return {
+            "review_id": self._ids("reviews", start, n),
+            "user_id": self._refs("users", rng.integers(self.rows["users"], size=n)),
+            "product_id": self._refs("products", product),
+            "rating": rating,
+            "comment": comments[rng.integers(len(comments), size=n)],
+            "review_date": self._dates_before(rng, n, HISTORY_DAYS["reviews"]),
+        }
+
+    def _carts(self, k, start, n):
+        rng = self._rng("carts", k)
+        return {
+            "cart_id": self._ids("carts", start, n),
+            "user_id": self._refs("users", rng.integers(self.rows["users"], size=n)),
+            "created_at": self._dates_before(rng, n, HISTORY_DAYS["carts"]),
+            "status": np.array(CART_STATUSES, dtype="S")[rng.integers(len(CART_STATUSES), size=n)],
+        }
+
+    def _cart_items(self, k, start, n):
+        carts = self._carts(k, start, n)
+        rng = self._rng("cart_items", k)
+        per_cart = rng.integers(1, 5, size=n)
+        total = int(per_cart.sum())
+        added = self._dates_between(rng, np.repeat(carts["created_at"], per_cart))
+        removed = self._dates_between(rng, added)
+        return {
+            "cart_item_id": self._item_ids("cart_items", start, per_cart),
+            "cart_id": np.repeat(carts["cart_id"], per_cart),
+            "product_id": self._refs("products", rng.integers(self.rows["products"], size=total)),
+            "added_at": added,
+            "removed_at": np.ma.masked_array(removed, mask=rng.random(total) >= 0.5),
+        }
+
+    def _sessions(self, k, start, n):
+        rng = self._rng("sessions", k)
+        users = self._refs("users", rng.integers(self.rows["users"], size=n))
+        session_start = self._dates_before(rng, n, HISTORY_DAYS["sessions"])
+        return {
+            "session_id": self._ids("sessions", start, n),
+            "user_id": np.ma.masked_array(users, mask=rng.random(n) >= 0.8),
+            "traffic_source": np.array(TRAFFIC_SOURCES, dtype="S")[rng.integers(len(TRAFFIC_SOURCES), size=n)],
+            "session_start": session_start,
+            "session_end": session_start + (rng.integers(5, 121, size=n) * 60).astype("timedelta64[s]"),
+            "made_purchase": rng.random(n) < 0.4,
+        }
+
+
+# === Rendering ===
+
+# Column kinds whose text always has the same length (36-character UUIDs, 19-character timestamps)
+FULL_WIDTH_KINDS = ("uuid", "timestamp")
+# Rows rendered at a time: a block's byte matrix and mask fit in a core's L2 cache
+RENDER_BLOCK_ROWS = 2048
+
+def column_text(kind, values):
+    """A column as an array of byte strings (masked entries are left to the caller)"""
+    values = np.ma.getdata(values)
+    if kind == "money":
+        return _join(format_ints(values // 100), b".", _two_digit_text()[values % 100])
+    if kind == "timestamp":
+        return format_timestamps(values)
+    if kind == "bool":
+        return np.where(values, b"TRUE", b"FALSE")
+    if kind == "int":
+        return format_ints(values)
+    return values
+
+
+def _escape(text, escapes):
+    """`text` with each (char, escaped) pair replaced in turn, rewriting only the values that need it"""
+    if not len(text) or not text.itemsize:
+        return text
+    special = np.zeros(256, dtype=bool)
+    special[[char[0] for char, _ in escapes]] = True
+    hits = special[np.ascontiguousarray(text).view(np.uint8)].reshape(len(text), text.itemsize).any(axis=1)
+    if not hits.any():
+        return text
+    fixed = text[hits]
+    for char, escaped in escapes:
+        fixed = _replace(fixed, char, escaped)
+    out = text.astype(f"S{max(text.itemsize, fixed.itemsize)}")
+    out[hits] = fixed
+    return out
+
+
+def _str_len(values):
+    return getattr(np, "strings", np.char).str_len(values)
+
+
+def _full_width(kind, text, mask):
+    """Text of a column whose values always fill their width as an (n, width) byte matrix"""
+    if kind in FULL_WIDTH_KINDS and not mask.any():
+        return np.ascontiguousarray(text).view(np.uint8).reshape(len(text), text.itemsize)
+    return text
+
+
+def render_rows(parts, n):
+    """One buffer holding, for each of n rows, the concatenation of `parts`.
+
+    A part is a byte-string array (one value per row), an (n, width) uint8
+    matrix of values that fill their width, or a bytes constant. Parts are laid
+    side by side in a (rows x sum of widths) byte matrix and the padding after
+    shorter values is masked out in one pass, so no per-row Python strings are
+    built. Rows go through in blocks of RENDER_BLOCK_ROWS so the matrix and its
+    mask stay in cache.
+    """
+    widths = [len(p) if isinstance(p, bytes) else p.shape[1] if p.ndim == 2 else p.itemsize for p in parts]
+    lengths = [None if isinstance(p, bytes) or p.ndim == 2 or not width else _str_len(p)
+               for p, width in zip(parts, widths)]
+    # Only columns with values shorter than their width need masking
+    padded = [length is not None and length.min() < width for length, width in zip(lengths, widths)] if n else []
+    matrix = np.empty((min(n, RENDER_BLOCK_ROWS), sum(widths)), dtype=np.uint8)
+    keep = np.ones(matrix.shape, dtype=bool) if any(padded) else None
+    column = 0
+    for part, width in zip(parts, widths):
+        if isinstance(part, bytes):
+            matrix[:, column:column + width] = np.frombuffer(part, dtype=np.uint8)
+        column += width
+    out = []
+    for first in range(0, n, RENDER_BLOCK_ROWS):
+        rows = min(RENDER_BLOCK_ROWS, n - first)
+        block, block_keep = matrix[:rows], None if keep is None else keep[:rows]
+        column = 0
+        for part, width, length, pad in zip(parts, widths, lengths, padded):
+            columns = slice(column, column + width)
+            if not isinstance(part, bytes) and width:
+                values = part[first:first + rows]
+                if part.ndim == 1:
+                    values = np.ascontiguousarray(values).view(np.uint8).reshape(rows, width)
+                block[:, columns] = values
+                if pad:
+                    block_keep[:, columns] = np.arange(width) < length[first:first + rows, None]
+            column += width
+        out.append((block if block_keep is None else block[block_keep]).tobytes())
+    return b"".join(out)
+
+
+_SQL_ESCAPES = ((b"'", b"''"),)
+
+
+def sql_rows(table, chunk):
+    """A chunk as the rows of an INSERT ... VALUES list"""
+    parts = []
+    for name, kind in TABLES[table]:
+        text = column_text(kind, chunk[name])
+        quote = kind in ("uuid", "text", "timestamp")
+        if kind == "text":
+            text = _escape(text, _SQL_ESCAPES)
+        mask = np.ma.getmaskarray(chunk[name])
+        if mask.any():
+            text = np.where(mask, b"NULL", _join(b"'", text, b"'") if quote else text)
+            quote = False
+        text = _full_width(kind, text, mask)
+        parts += [b", " if parts else b"(", *([b"'", text, b"'"] if quote else [text])]
+    return render_rows(parts + [b"),\n"], len(chunk[name]))[:-2]
+
+
+# Characters COPY's text format needs escaped; backslash first
+_COPY_ESCAPES = ((b"\\", b"\\\\"), (b"\t", b"\\t"), (b"\n", b"\\n"), (b"\r", b"\\r"))
+
+
+def copy_rows(table, chunk):
+    """A chunk in COPY's text format: tab-separated columns, \\N for NULL, one line per row"""
+    parts = []
+    for name, kind in TABLES[table]:
+        text = column_text(kind, chunk[name])
+        if kind == "text":
+            text = _escape(text, _COPY_ESCAPES)
+        mask = np.ma.getmaskarray(chunk[name])
+        if mask.any():
+            text = np.where(mask, b"\\N", text)
+        text = _full_width(kind, text, mask)
+        parts += [b"\t", text] if parts else [text]
+    return render_rows(parts + [b"\n"], len(chunk[name]))
@@ -1,5 +1,18 @@
+import argparse
+import multiprocessing
+import os
+import time
+from datetime import datetime
+
 import psycopg2
 from psycopg2 import sql
+from tabulate import tabulate
+
+from datagen import AS_OF, TABLES, DatasetGenerator
+from generate_data import init_worker, load_shard, partition_ranges, shards
+from migrate import migrate_up
+from partitions import PARTITIONED_TABLES, ensure_partitions
+from rollups import backfill
 
 # Change these according to your local setup
 DB_NAME = "postgres"
@@ -8,12 +21,107 @@ DB_PASSWORD = ""                   # probably no password
 DB_HOST = "localhost"
 DB_PORT = "5432"
 
+# Memory each index build in --fast may sort in
+FAST_MAINTENANCE_WORK_MEM = "1GB"
+
 def execute_sql_file(cursor, filename):
     with open(filename, 'r') as f:
         sql_content = f.read()
     cursor.execute(sql_content)
 
+def strip_constraints(cursor, tables):
+    """Drop the keys, foreign keys and secondary indexes of `tables` before a bulk load.
+
+    Returns what restore_constraints() needs to put them back: (table, name, definition)
+    for primary/unique keys and foreign keys, and (name, definition) for indexes.
+    Foreign keys from other tables into `tables` (the rollups') are included, since the
+    keys they point at are dropped. CHECK and NOT NULL constraints stay.
+    """
+    cursor.execute("""
+        SELECT conrelid::regclass::text, conname, contype, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE contype IN ('p', 'u', 'f') AND conparentid = 0
+          AND (conrelid = ANY(%s::regclass[]) OR (contype = 'f' AND confrelid = ANY(%s::regclass[])))
+        ORDER BY conrelid::regclass::text, conname
+    """, (list(tables), list(tables)))
+    constraints = cursor.fetchall()
+    keys = [(table, name, definition) for table, name, kind, definition in constraints if kind in "pu"]
+    foreign_keys = [(table, name, definition) for table, name, kind, definition in constraints if kind == "f"]
+
+    cursor.execute("""
+        SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = ANY(%s::regclass[])
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+    """, (list(tables),))
+    indexes = cursor.fetchall()
+
+    for table, name, _ in foreign_keys + keys:
+        cursor.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(sql.Identifier(table), sql.Identifier(name)))
+    for name, _ in indexes:
+        cursor.execute(sql.SQL("DROP INDEX {}").format(sql.Identifier(name)))
+    return {"keys": keys, "indexes": indexes, "foreign_keys": foreign_keys}
+
+def restore_constraints(cursor, constraints):
+    """Rebuild what strip_constraints() dropped; returns seconds per step"""
+    timings = []
+    cursor.execute(f"SET maintenance_work_mem = '{FAST_MAINTENANCE_WORK_MEM}'")
+
+    def timed(label, statement):
+        start = time.perf_counter()
+        cursor.execute(statement)
+        timings.append((label, time.perf_counter() - start))
+
+    for table, name, definition in constraints["keys"]:
+        timed(f"{table}.{name}", sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} ").format(
+            sql.Identifier(table), sql.Identifier(name)) + sql.SQL(definition))
+    for name, definition in constraints["indexes"]:
+        timed(name, definition)
+    # NOT VALID adds a foreign key without reading the table; VALIDATE then checks the rows
+    # under a lock that lets writes through. Postgres has no NOT VALID foreign keys on
+    # partitioned tables, so those are checked as they are added.
+    for table, name, definition in constraints["foreign_keys"]:
+        add = sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} ").format(sql.Identifier(table), sql.Identifier(name)) + sql.SQL(definition)
+        if table in PARTITIONED_TABLES:
+            timed(f"{table}.{name}", add)
+        else:
+            timed(f"{table}.{name} (add)", add + sql.SQL(" NOT VALID"))
+            timed(f"{table}.{name} (validate)", sql.SQL("ALTER TABLE {} VALIDATE CONSTRAINT {}").format(
+                sql.Identifier(table), sql.Identifier(name)))
+    return timings
+
+def bulk_load(cursor, generator, workers):
+    """COPY every table at once, one shard per worker per table; returns (table, rows, seconds) rows.
+
+    Without keys there is nothing to check between tables, so children need not wait
+    for their parents. A table's seconds run from its first shard's start to its last
+    shard's commit, so they are its own wall time while sharing the workers.
+    """
+    for table, (first, last) in partition_ranges(generator).items():
+        cursor.execute("SELECT create_monthly_partitions(%s, %s, %s)", (table, first, last))
+    tasks = [task for table in TABLES for task in shards(generator, table, workers)]
+    rows = dict.fromkeys(TABLES, 0)
+    started, finished = {}, {}
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=(generator, True)) as pool:
+        for table, shard_rows, seconds in pool.imap_unordered(load_shard, tasks):
+            now = time.perf_counter()
+            rows[table] += shard_rows
+            started[table] = min(started.get(table, now), now - seconds)
+            finished[table] = now
+    return [(table, rows[table], finished[table] - started[table]) for table in TABLES]
+
 def main():
+    parser = argparse.ArgumentParser(description="Create the schema and load the dummy data")
+    parser.add_argument("--fast", action="store_true",
+                        help="generate the data and COPY it in parallel, adding keys and indexes afterwards")
+    parser.add_argument("--scale", type=float, default=1.0, help="with --fast, size of the generated data")
+    parser.add_argument("--seed", type=int, default=0, help="with --fast, seed of the generated data")
+    parser.add_argument("--as-of", type=datetime.fromisoformat, metavar="TIMESTAMP",
+                        help=f"with --fast, date the generated history ends at (default: {AS_OF:%Y-%m-%d})")
+    parser.add_argument("--uuid-version", type=int, choices=(4, 7), default=7, help="with --fast, key version")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="with --fast, parallel COPY workers")
+    args = parser.parse_args()
+
     try:
         # Connect to PostgreSQL
         conn = psycopg2.connect(
@@ -25,16 +133,50 @@ def main():
         )
         conn.autocommit = True
         cursor = conn.cursor()
-        
+
         print("✅ Connected to database successfully!")
 
         # Create schema
         print("📜 Creating tables...")
         execute_sql_file(cursor, 'database/schema.sql')
-        
-        # Insert dummy data
-        print("📦 Inserting dummy data...")
-        execute_sql_file(cursor, 'database/dummy_data.sql')
+
+        if args.fast:
+            print("✂️  Dropping keys and indexes for the load...")
+            constraints = strip_constraints(cursor, TABLES)
+
+            print(f"📦 Copying data at scale {args.scale:g} with {args.workers} worker(s)...")
+            generator = DatasetGenerator(args.scale, args.seed, now=args.as_of, uuid_version=args.uuid_version)
+            loaded = bulk_load(cursor, generator, args.workers)
+            print(tabulate([[table, f"{rows:,}", f"{seconds:.1f}", f"{rows / seconds:,.0f}" if seconds else "-"]
+                            for table, rows, seconds in loaded],
+                           headers=["Table", "Rows", "Seconds", "Rows/sec"], tablefmt="grid"))
+
+            print("🔑 Building keys and indexes, validating foreign keys...")
+            timings = restore_constraints(cursor, constraints)
+            print(tabulate([[label, f"{seconds:.2f}"] for label, seconds in timings],
+                           headers=["Step", "Seconds"], tablefmt="grid"))
+        else:
+            # Insert dummy data
+            print("📦 Inserting dummy data...")
+            execute_sql_file(cursor, 'database/dummy_data.sql')
+
+        # Build the rating/sales rollups from the loaded history
+        print("📊 Building rollup tables...")
+        conn.autocommit = False
+        backfill(conn)
+
+        # Secondary indexes and any later schema changes
+        print("🗂️  Applying migrations...")
+        migrate_up(conn)
+
+        # Monthly partitions for the months ahead (the data file created those for its history)
+        print("🗓️  Creating upcoming partitions...")
+        ensure_partitions(conn)
+
+        if args.fast:
+            print("📈 Analyzing tables...")
+            conn.autocommit = True
+            cursor.execute(f"ANALYZE {', '.join(TABLES)}")
 
         cursor.close()
         conn.close()
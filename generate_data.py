@@ -1,258 +1,280 @@
-import uuid
-import random
-from datetime import datetime, timedelta
-from faker import Faker
-
-faker = Faker()
-
-# === Settings ===
-NUM_USERS = 1000
-NUM_PRODUCTS = 50
-NUM_ORDERS = 5000
-NUM_REVIEWS = 3000
-NUM_CARTS = 300
-NUM_SESSIONS = 500
-
-def random_uuid():
-    return str(uuid.uuid4())
-
-# === Generate functions ===
-
-def generate_users():
-    users = []
-    signup_sources = ['organic', 'ad', 'referral']
-    for _ in range(NUM_USERS):
-        user_id = random_uuid()
-        name = faker.name().replace("'", "''")
-        email = faker.unique.email()
-        source = random.choice(signup_sources)
-        users.append((user_id, name, email, source))
-    return users
-
-def generate_products():
-    products = []
-    # Electronics-specific categories
-    categories = ['Smartphones', 'Accessories', 'Audio', 'Charging', 'Cases']
-    
-    # Electronics product types and their variations with realistic price ranges
-    product_types = {
-        'Smartphones': [
-            ('iPhone', (699, 1299)),
-            ('Samsung Galaxy', (599, 1199)),
-            ('Google Pixel', (499, 899)),
-            ('OnePlus', (399, 799))
-        ],
-        'Accessories': [
-            ('Screen Protector', (9, 49)),
-            ('Stylus', (29, 129)),
-            ('Smart Watch', (199, 499)),
-            ('Fitness Tracker', (79, 299))
-        ],
-        'Audio': [
-            ('Wireless Earbuds', (49, 299)),
-            ('Headphones', (99, 399)),
-            ('Bluetooth Speaker', (79, 349)),
-            ('Soundbar', (199, 999))
-        ],
-        'Charging': [
-            ('Wireless Charger', (19, 99)),
-            ('Power Bank', (29, 149)),
-            ('USB-C Cable', (9, 39)),
-            ('Car Charger', (19, 59))
-        ],
-        'Cases': [
-            ('Phone Case', (19, 79)),
-            ('Tablet Case', (29, 99)),
-            ('Laptop Sleeve', (39, 129)),
-            ('Smart Watch Band', (19, 99))
-        ]
-    }
-    
-    # Product variations
-    variations = ['Pro', 'Max', 'Lite', 'Air', 'Plus', 'Ultra']
-    
-    # Keep track of used combinations to avoid duplicates
-    used_combinations = set()
-    
-    for _ in range(NUM_PRODUCTS):
-        while True:
-            category = random.choice(categories)
-            product_type, (min_price, max_price) = random.choice(product_types[category])
-            variation = random.choice(variations)
-            name = f"{product_type} {variation}"
-            
-            # Check if this combination has been used
-            if name not in used_combinations:
-                used_combinations.add(name)
-                product_id = random_uuid()
-                price = round(random.uniform(min_price, max_price), 2)
-                created_at = faker.date_time_between(start_date='-6M', end_date='now')
-                products.append((product_id, name, category, price, created_at))
-                break
-    
-    return products
-
-def generate_orders(valid_user_ids):
-    orders = []
-    # Ensure each user has at least one order
-    for user_id in valid_user_ids:
-        order_id = random_uuid()
-        order_date = faker.date_time_between(start_date='-3M', end_date='now')
-        status = random.choice(['pending', 'completed'])
-        total_amount = round(random.uniform(20, 500), 2)
-        orders.append((order_id, user_id, order_date, status, total_amount))
-    
-    # Add additional random orders
-    for _ in range(NUM_ORDERS - len(valid_user_ids)):
-        order_id = random_uuid()
-        user_id = random.choice(valid_user_ids)
-        order_date = faker.date_time_between(start_date='-3M', end_date='now')
-        status = random.choice(['pending', 'completed'])
-        total_amount = round(random.uniform(20, 500), 2)
-        orders.append((order_id, user_id, order_date, status, total_amount))
-    return orders
-
-def generate_order_items(order_list, product_ids):
-    items = []
-    for order_id, _, _, _, _ in order_list:
-        for _ in range(random.randint(1, 5)):
-            order_item_id = random_uuid()
-            product_id = random.choice(product_ids)
-            quantity = random.randint(1, 3)
-            unit_price = round(random.uniform(10, 500), 2)
-            items.append((order_item_id, order_id, product_id, quantity, unit_price))
-    return items
-
-def generate_reviews(valid_user_ids, product_ids):
-    reviews = []
-    # Ensure each product has at least 2 reviews
-    for product_id in product_ids:
-        for _ in range(2):
-            review_id = random_uuid()
-            user_id = random.choice(valid_user_ids)
-            rating = random.randint(3, 5)  # Bias towards positive reviews
-            comment = faker.sentence().replace("'", "''")
-            review_date = faker.date_time_between(start_date='-6M', end_date='now')
-            reviews.append((review_id, user_id, product_id, rating, comment, review_date))
-    
-    # Add additional random reviews
-    for _ in range(NUM_REVIEWS - (len(product_ids) * 2)):
-        review_id = random_uuid()
-        user_id = random.choice(valid_user_ids)
-        product_id = random.choice(product_ids)
-        rating = random.randint(1, 5)
-        comment = faker.sentence().replace("'", "''")
-        review_date = faker.date_time_between(start_date='-6M', end_date='now')
-        reviews.append((review_id, user_id, product_id, rating, comment, review_date))
-    return reviews
-
-def generate_carts(valid_user_ids):
-    carts = []
-    statuses = ['active', 'abandoned', 'converted']
-    for _ in range(NUM_CARTS):
-        cart_id = random_uuid()
-        user_id = random.choice(valid_user_ids)
-        created_at = faker.date_time_between(start_date='-3M', end_date='now')
-        status = random.choice(statuses)
-        carts.append((cart_id, user_id, created_at, status))
-    return carts
-
-def generate_cart_items(cart_list, product_ids):
-    cart_items = []
-    for cart_id, _, cart_created_at, _ in cart_list:
-        for _ in range(random.randint(1, 4)):
-            cart_item_id = random_uuid()
-            product_id = random.choice(product_ids)
-            added_at = faker.date_time_between(start_date=cart_created_at, end_date='now')
-            removed_at = faker.date_time_between(start_date=added_at, end_date='now') if random.random() < 0.5 else None
-            cart_items.append((cart_item_id, cart_id, product_id, added_at, removed_at))
-    return cart_items
-
-def generate_sessions(valid_user_ids):
-    sessions = []
-    traffic_sources = ['Google Ads', 'Organic', 'Email Campaign', 'Direct']
-    for _ in range(NUM_SESSIONS):
-        session_id = random_uuid()
-        user_id = random.choice(valid_user_ids) if random.random() < 0.8 else None
-        source = random.choice(traffic_sources)
-        session_start = faker.date_time_between(start_date='-2M', end_date='now')
-        session_end = session_start + timedelta(minutes=random.randint(5, 120))
-        made_purchase = True if random.random() < 0.4 else False
-        sessions.append((session_id, user_id, source, session_start, session_end, made_purchase))
-    return sessions
-
-# === Main generation ===
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+import psycopg2
+
+from datagen import AS_OF, BASE_ROWS, CHUNK_ROWS, TABLES, DatasetGenerator, copy_rows, sql_rows
+from partitions import PARTITIONED_TABLES
+from rollups import backfill
+
+# Database connection settings (used by --load and --replay)
+DB_CONFIG = {
+    "dbname": "postgres",
+    "user": "carterrobinson",
+    "password": "",
+    "host": "localhost",
+    "port": "5432"
+}
+
+COPY_READ_SIZE = 1 << 20    # bytes psycopg2 hands to COPY per call
+MANIFEST = "manifest.json"
+PENDING_PER_WORKER = 2      # rendered chunks queued per worker ahead of the writer
+
+# Per-process state of the worker pool
+_worker = {}
+
+
+class ChunkReader:
+    """File-like view of an iterator of byte chunks, for cursor.copy_expert.
+
+    Only the chunk being sent is held in memory, so a COPY of any size runs
+    in the memory of one chunk.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._view = memoryview(b"")
+
+    def read(self, size=-1):
+        while not self._view:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return b""
+            self._view = memoryview(chunk)
+        size = len(self._view) if size is None or size < 0 else size
+        data, self._view = self._view[:size], self._view[size:]
+        return bytes(data)
+
+
+def partition_ranges(generator):
+    """First and last month (YYYY-MM-01) of history per partitioned table"""
+    return {table: [str(d)[:7] + "-01" for d in generator.date_range(table)] for table in PARTITIONED_TABLES}
+
+
+def copy_statement(table):
+    return f"COPY {table} ({', '.join(name for name, _ in TABLES[table])}) FROM STDIN"
+
+
+def init_worker(generator, connect=False):
+    """Pool initializer: the generator, and with `connect` a database connection, for this worker"""
+    _worker["generator"] = generator
+    _worker["conn"] = psycopg2.connect(**DB_CONFIG) if connect else None
+
+
+def _render_chunk(task):
+    table, k, render = task
+    chunk = _worker["generator"].chunk(table, k)
+    return len(chunk[TABLES[table][0][0]]), render(table, chunk)
+
+
+def load_shard(task):
+    """COPY chunks [first, stop) of a table over this worker's connection; returns (table, rows, seconds)"""
+    table, first, stop = task
+    start = time.perf_counter()
+    counts = {}
+    conn = _worker["conn"]
+    cur = conn.cursor()
+    cur.copy_expert(copy_statement(table), ChunkReader(_copy_chunks(_worker["generator"], table, counts, first, stop)),
+                    size=COPY_READ_SIZE)
+    conn.commit()
+    cur.close()
+    return table, counts[table], time.perf_counter() - start
+
+
+def rendered(generator, table, render, pool=None, workers=1):
+    """(rows, bytes) of each chunk of a table, in chunk order whatever the worker count"""
+    tasks = ((table, k, render) for k in range(generator.chunk_count(table)))
+    if pool is None:
+        _worker["generator"] = generator
+        yield from map(_render_chunk, tasks)
+        return
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(_render_chunk, (task,)))
+        if len(pending) >= workers * PENDING_PER_WORKER:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def shards(generator, table, count):
+    """Split a table's chunks into up to `count` contiguous (table, first, stop) ranges"""
+    chunks = generator.chunk_count(table)
+    bounds = [chunks * i // count for i in range(count + 1)]
+    return [(table, first, stop) for first, stop in zip(bounds, bounds[1:]) if first < stop]
+
+
+def write_sql(generator, path, pool=None, workers=1):
+    """Write the dataset as INSERT statements, one per chunk; returns rows written per table"""
+    counts = {}
+    with open(path, "wb") as f:
+        # Partitions for every month of generated history
+        f.write(b"-- Monthly partitions for the history loaded below\n")
+        for table, (first, last) in partition_ranges(generator).items():
+            f.write(f"SELECT create_monthly_partitions('{table}', '{first}', '{last}');\n".encode())
+        f.write(b"\n")
+
+        for table, columns in TABLES.items():
+            f.write(f"-- {table}\n".encode())
+            header = f"INSERT INTO {table} ({', '.join(name for name, _ in columns)}) VALUES\n".encode()
+            counts[table] = 0
+            for rows, data in rendered(generator, table, sql_rows, pool, workers):
+                f.write(header)
+                f.write(data)
+                f.write(b";\n")
+                counts[table] += rows
+            f.write(b"\n")
+    return counts
+
+
+def _copy_chunks(generator, table, counts, first=0, stop=None):
+    counts[table] = 0
+    for chunk in generator.chunks(table, first, stop):
+        counts[table] += len(chunk[TABLES[table][0][0]])
+        yield copy_rows(table, chunk)
+
+
+def _prepare(conn, partitions, truncate):
+    cur = conn.cursor()
+    if truncate:
+        cur.execute(f"TRUNCATE {', '.join(TABLES)} CASCADE")
+    for table, (first, last) in partitions.items():
+        cur.execute("SELECT create_monthly_partitions(%s, %s, %s)", (table, first, last))
+    conn.commit()
+    cur.close()
+
+
+def _finish(conn):
+    """Rebuild the rollups from the loaded rows and refresh planner statistics"""
+    backfill(conn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"ANALYZE {', '.join(TABLES)}")
+    cur.close()
+    conn.autocommit = False
+
+
+def load(conn, generator, truncate=False, pool=None, workers=1):
+    """Stream the dataset into Postgres with COPY; returns rows loaded per table.
+
+    With a pool, each table is split into one shard per worker and the shards
+    are copied concurrently over the workers' own connections. A table starts
+    only once its parents are committed, so foreign keys check as usual.
+    """
+    _prepare(conn, partition_ranges(generator), truncate)
+    counts = {}
+    if pool is None:
+        _worker.update(generator=generator, conn=conn)
+    for table in TABLES:
+        start = time.perf_counter()
+        tasks = shards(generator, table, workers)
+        counts[table] = sum(rows for _, rows, _ in (pool.map(load_shard, tasks) if pool else map(load_shard, tasks)))
+        print(f"   {table}: {counts[table]:,} rows in {time.perf_counter() - start:.1f}s")
+    _finish(conn)
+    return counts
+
+
+def dump(generator, directory, pool=None, workers=1):
+    """Write one gzipped COPY file per table plus a manifest, for --replay; returns rows per table"""
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+    for table in TABLES:
+        counts[table] = 0
+        # mtime=0 keeps the gzip header, and so the files, identical between runs
+        with gzip.GzipFile(os.path.join(directory, f"{table}.copy.gz"), "wb", compresslevel=1, mtime=0) as f:
+            for rows, data in rendered(generator, table, copy_rows, pool, workers):
+                f.write(data)
+                counts[table] += rows
+        print(f"   {table}: {counts[table]:,} rows")
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump({"scale": generator.scale, "seed": generator.seed, "as_of": str(generator.now),
+                   "uuid_version": generator.uuid_version, "rows": counts,
+                   "partitions": partition_ranges(generator)}, f, indent=2)
+    return counts
+
+
+def replay(conn, directory, truncate=False):
+    """Load a --dump directory with one COPY per table; returns rows loaded per table"""
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    _prepare(conn, manifest["partitions"], truncate)
+    cur = conn.cursor()
+    for table in TABLES:
+        start = time.perf_counter()
+        with gzip.open(os.path.join(directory, f"{table}.copy.gz"), "rb") as f:
+            cur.copy_expert(copy_statement(table), f, size=COPY_READ_SIZE)
+        conn.commit()
+        print(f"   {table}: {manifest['rows'][table]:,} rows in {time.perf_counter() - start:.1f}s")
+    cur.close()
+    _finish(conn)
+    return manifest["rows"]
+
 
 def main():
-    print("🚀 Generating dummy data...")
-    
-    # === Generate users and products first ===
-    user_list = generate_users()
-    product_list = generate_products()
-
-    # === Extract user_ids and product_ids ===
-    user_ids = [u[0] for u in user_list]
-    product_ids = [p[0] for p in product_list]
-
-    # === Now generate things using valid IDs ===
-    order_list = generate_orders(user_ids)
-    order_items_list = generate_order_items(order_list, product_ids)
-    review_list = generate_reviews(user_ids, product_ids)
-    cart_list = generate_carts(user_ids)
-    cart_items_list = generate_cart_items(cart_list, product_ids)
-    session_list = generate_sessions(user_ids)
-
-    # === Write to dummy_data.sql ===
-    with open('database/dummy_data.sql', 'w') as f:
-        # Users
-        f.write("-- Users\n")
-        f.write("INSERT INTO users (user_id, name, email, signup_source) VALUES\n")
-        f.write(",\n".join(f"('{u[0]}', '{u[1]}', '{u[2]}', '{u[3]}')" for u in user_list) + ";\n\n")
-
-        # Products
-        f.write("-- Products\n")
-        f.write("INSERT INTO products (product_id, name, category, price, created_at, is_active) VALUES\n")
-        f.write(",\n".join(f"('{p[0]}', '{p[1]}', '{p[2]}', {p[3]}, '{p[4]}', TRUE)" for p in product_list) + ";\n\n")
-
-        # Orders
-        f.write("-- Orders\n")
-        f.write("INSERT INTO orders (order_id, user_id, order_date, status, total_amount) VALUES\n")
-        f.write(",\n".join(f"('{o[0]}', '{o[1]}', '{o[2]}', '{o[3]}', {o[4]})" for o in order_list) + ";\n\n")
-
-        # Order Items
-        f.write("-- Order Items\n")
-        f.write("INSERT INTO order_items (order_item_id, order_id, product_id, quantity, unit_price) VALUES\n")
-        f.write(",\n".join(f"('{oi[0]}', '{oi[1]}', '{oi[2]}', {oi[3]}, {oi[4]})" for oi in order_items_list) + ";\n\n")
-
-        # Reviews
-        f.write("-- Reviews\n")
-        f.write("INSERT INTO reviews (review_id, user_id, product_id, rating, comment, review_date) VALUES\n")
-        f.write(",\n".join(f"('{r[0]}', '{r[1]}', '{r[2]}', {r[3]}, '{r[4]}', '{r[5]}')" for r in review_list) + ";\n\n")
-
-        # Carts
-        f.write("-- Carts\n")
-        f.write("INSERT INTO carts (cart_id, user_id, created_at, status) VALUES\n")
-        f.write(",\n".join(f"('{c[0]}', '{c[1]}', '{c[2]}', '{c[3]}')" for c in cart_list) + ";\n\n")
-
-        # Cart Items
-        f.write("-- Cart Items\n")
-        f.write("INSERT INTO cart_items (cart_item_id, cart_id, product_id, added_at, removed_at) VALUES\n")
-        f.write(",\n".join(
-            f"('{ci[0]}', '{ci[1]}', '{ci[2]}', '{ci[3]}', " + (f"'{ci[4]}'" if ci[4] else "NULL") + ")"
-            for ci in cart_items_list
-        ) + ";\n\n")
-
-
-        # Sessions
-        f.write("-- Sessions\n")
-        f.write("INSERT INTO sessions (session_id, user_id, traffic_source, session_start, session_end, made_purchase) VALUES\n")
-        f.write(",\n".join(
-            f"('{s[0]}', " + (f"'{s[1]}'" if s[1] else "NULL") + f", '{s[2]}', '{s[3]}', '{s[4]}', {str(s[5]).upper()})"
-            for s in session_list
-        ) + ";\n\n")
-
-
-    print("✅ Dummy data written to 'database/dummy_data.sql' successfully!")
+    parser = argparse.ArgumentParser(description="Generate the store's dummy data")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help=f"multiplies every table's size (1 = {BASE_ROWS['users']:,} users, "
+                             f"{BASE_ROWS['orders']:,} orders, ...)")
+    parser.add_argument("--seed", type=int, default=0, help="same seed, same data")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows generated per chunk")
+    parser.add_argument("--as-of", type=datetime.fromisoformat, metavar="TIMESTAMP",
+                        help=f"date the history ends at (default: {AS_OF:%Y-%m-%d})")
+    parser.add_argument("--uuid-version", type=int, choices=(4, 7), default=7,
+                        help="7: keys ordered like their rows (default); 4: random keys")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes generating chunks (and, with --load, copying shards) in parallel")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--output", default="database/dummy_data.sql", help="SQL file to write (default)")
+    target.add_argument("--load", action="store_true", help="COPY straight into the database instead")
+    target.add_argument("--dump", metavar="DIR", help="write gzipped COPY files to DIR instead")
+    target.add_argument("--replay", metavar="DIR", help="COPY the files of an earlier --dump into the database")
+    parser.add_argument("--truncate", action="store_true", help="with --load/--replay, empty the tables first")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generator = DatasetGenerator(args.scale, args.seed, args.chunk_rows, args.as_of, args.uuid_version)
+    conn = psycopg2.connect(**DB_CONFIG) if args.load or args.replay else None
+    pool = None
+    if args.workers > 1 and not args.replay:
+        pool = multiprocessing.Pool(args.workers, initializer=init_worker, initargs=(generator, args.load))
+    try:
+        if args.replay:
+            print(f"📥 Replaying {args.replay}...")
+            counts = replay(conn, args.replay, args.truncate)
+            destination = "the database"
+        elif args.load:
+            print(f"🚀 Loading data at scale {args.scale:g}...")
+            counts = load(conn, generator, args.truncate, pool, args.workers)
+            destination = "the database"
+        elif args.dump:
+            print(f"🚀 Dumping data at scale {args.scale:g}...")
+            counts = dump(generator, args.dump, pool, args.workers)
+            destination = f"'{args.dump}'"
+        else:
+            print(f"🚀 Generating dummy data at scale {args.scale:g}...")
+            counts = write_sql(generator, args.output, pool, args.workers)
+            for table, rows in counts.items():
+                print(f"   {table}: {rows:,} rows")
+            destination = f"'{args.output}'"
+    except Exception as e:
+        print(f"❌ Data generation failed: {e}")
+        sys.exit(1)
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if conn is not None:
+            conn.close()
+
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(f"✅ {total:,} rows written to {destination} in {elapsed:.1f}s ({total / elapsed:,.0f} rows/sec)")
 
 if __name__ == "__main__":
     main()
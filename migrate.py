@@ -0,0 +1,233 @@
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+
+import psycopg2
+from tabulate import tabulate
+
+# Database connection settings
+DB_CONFIG = {
+    "dbname": "postgres",
+    "user": "carterrobinson",
+    "password": "",
+    "host": "localhost",
+    "port": "5432"
+}
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database", "migrations")
+
+# Migrations are files named <version>_<name>.sql, applied in version order. A file whose
+# first line is this marker runs outside a transaction, one statement at a time, which
+# CREATE INDEX CONCURRENTLY requires; on a partitioned table such a statement is carried out
+# partition by partition.
+NO_TRANSACTION = "-- migrate: no-transaction"
+
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s+ON\s+(\w+)\s+(.*)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Serializes runners across processes
+MIGRATION_LOCK_ID = 7_340_211
+
+CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        duration_ms DOUBLE PRECISION
+    )
+"""
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path) as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode()).hexdigest()
+        self.transactional = not self.sql.lstrip().startswith(NO_TRANSACTION)
+
+    def statements(self):
+        """Statements of a no-transaction migration; each must end with ';' at the end of a line"""
+        body = "\n".join(line for line in self.sql.splitlines() if not line.lstrip().startswith("--"))
+        return [s.strip() for s in re.split(r";\s*$", body, flags=re.MULTILINE) if s.strip()]
+
+
+def connect_db():
+    return psycopg2.connect(**DB_CONFIG)
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return sorted(migrations, key=lambda m: m.version)
+
+
+def applied_migrations(conn):
+    """version -> (name, checksum, applied_at, duration_ms)"""
+    cur = conn.cursor()
+    cur.execute(CREATE_MIGRATIONS_TABLE)
+    cur.execute("SELECT version, name, checksum, applied_at, duration_ms FROM schema_migrations")
+    applied = {row[0]: row[1:] for row in cur.fetchall()}
+    conn.commit()
+    cur.close()
+    return applied
+
+
+def _drop_invalid_index(cur, index_name):
+    """A failed CREATE INDEX CONCURRENTLY leaves an INVALID index that IF NOT EXISTS would skip over"""
+    cur.execute("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND NOT i.indisvalid AND c.relkind = 'i'
+    """, (index_name,))
+    if cur.fetchone():
+        print(f"   🧹 Dropping invalid index {index_name} left by an earlier attempt")
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+def _create_partitioned_index(cur, unique, index_name, table, definition):
+    """CREATE INDEX CONCURRENTLY for a partitioned table, which Postgres does not support directly.
+
+    The parent index is created ON ONLY the parent (instant, and invalid until every
+    partition has one), each partition's index is built concurrently and attached, and the
+    parent index becomes valid once the last one is attached. Partitions created later get
+    the index automatically.
+    """
+    unique = "UNIQUE " if unique else ""
+    cur.execute(f"CREATE {unique}INDEX IF NOT EXISTS {index_name} ON ONLY {table} {definition}")
+    cur.execute("""
+        SELECT c.relname,
+               EXISTS (SELECT 1 FROM pg_inherits ii WHERE ii.inhparent = %s::regclass
+                       AND ii.inhrelid IN (SELECT indexrelid FROM pg_index WHERE indrelid = c.oid))
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        ORDER BY c.relname
+    """, (index_name, table))
+    for partition, attached in cur.fetchall():
+        if attached:
+            continue
+        child = f"{index_name}_{partition}"[:63]
+        _drop_invalid_index(cur, child)
+        cur.execute(f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} {definition}")
+        cur.execute(f"ALTER INDEX {index_name} ATTACH PARTITION {child}")
+
+
+def _execute_outside_transaction(cur, statement):
+    match = CONCURRENT_INDEX.match(statement)
+    if match:
+        unique, index_name, table, definition = match.groups()
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+        row = cur.fetchone()
+        if row and row[0] == "p":
+            _create_partitioned_index(cur, unique, index_name, table, definition)
+            return
+        _drop_invalid_index(cur, index_name)
+    cur.execute(statement)
+
+
+def apply(conn, migration):
+    """Run one migration and record it; returns the duration in ms"""
+    start = time.perf_counter()
+    cur = conn.cursor()
+    if migration.transactional:
+        cur.execute(migration.sql)
+    else:
+        conn.autocommit = True
+        try:
+            for statement in migration.statements():
+                _execute_outside_transaction(cur, statement)
+        finally:
+            conn.autocommit = False
+    duration_ms = (time.perf_counter() - start) * 1000
+    # For a transactional migration this commits together with its changes
+    cur.execute("""
+        INSERT INTO schema_migrations (version, name, checksum, duration_ms)
+        VALUES (%s, %s, %s, %s)
+    """, (migration.version, migration.name, migration.checksum, duration_ms))
+    conn.commit()
+    cur.close()
+    return duration_ms
+
+
+def migrate_up(conn, target=None, directory=MIGRATIONS_DIR):
+    """Apply every pending migration up to `target` (inclusive); returns the versions applied"""
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+    conn.commit()
+    try:
+        applied = applied_migrations(conn)
+        done = []
+        for migration in load_migrations(directory):
+            if target is not None and migration.version > target:
+                break
+            if migration.version in applied:
+                if applied[migration.version][1] != migration.checksum:
+                    print(f"⚠️  {migration.path} changed after it was applied")
+                continue
+            print(f"⬆️  Applying {migration.version:04d}_{migration.name}...")
+            duration_ms = apply(conn, migration)
+            print(f"   ✅ done in {duration_ms:.0f} ms")
+            done.append(migration.version)
+        return done
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+        conn.commit()
+        cur.close()
+
+
+def status(conn, directory=MIGRATIONS_DIR):
+    applied = applied_migrations(conn)
+    rows = []
+    for migration in load_migrations(directory):
+        record = applied.get(migration.version)
+        if record is None:
+            state, applied_at, duration = "pending", "", ""
+        else:
+            state = "applied" if record[1] == migration.checksum else "applied (changed since)"
+            applied_at, duration = record[2].strftime("%Y-%m-%d %H:%M:%S"), f"{record[3]:.0f}"
+        rows.append([f"{migration.version:04d}", migration.name, state, applied_at, duration])
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations from database/migrations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    up = subparsers.add_parser("up", help="apply pending migrations")
+    up.add_argument("--to", type=int, help="stop after this version")
+    subparsers.add_parser("status", help="list migrations and whether they are applied")
+    args = parser.parse_args()
+
+    conn = connect_db()
+    try:
+        if args.command == "up":
+            done = migrate_up(conn, args.to)
+            print(f"🎉 Applied {len(done)} migration(s)" if done else "✅ Already up to date")
+        else:
+            print(tabulate(status(conn), headers=["Version", "Name", "State", "Applied at", "Duration (ms)"],
+                           tablefmt="grid"))
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
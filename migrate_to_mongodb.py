@@ -1,8 +1,9 @@
-import psycopg2
-from pymongo import MongoClient
+import argparse
+import multiprocessing
 from datetime import datetime
-import json
-from bson import ObjectId
+import psycopg2
+from pymongo import MongoClient, ReplaceOne
+from tabulate import tabulate
 import time
 import sys
 import logging
@@ -51,126 +52,488 @@ def get_mongo_connection():
     client = MongoClient(MONGO_URI)
     return client[MONGO_DB_NAME]
 
-def migrate_users(pg_conn, mongo_db):
-    logger.info("Starting user migration...")
-    cur = pg_conn.cursor()
-    cur.execute("SELECT user_id, name, email, signup_source FROM users")
-    users = cur.fetchall()
-    logger.info(f"Found {len(users)} users in PostgreSQL")
-    
-    mongo_users = mongo_db.users
-    mongo_users.delete_many({})  # Clear existing data
-    logger.info("Cleared existing MongoDB users collection")
-    
-    for user in users:
-        user_doc = {
-            "_id": user[0],
-            "name": user[1],
-            "email": user[2],
-            "signup_source": user[3]
+# Rows fetched from Postgres and written to MongoDB per round trip
+DEFAULT_BATCH_SIZE = 5000
+
+# Per-table high-water marks of the incremental sync (--sync)
+CHECKPOINT_COLLECTION = "sync_checkpoints"
+# A sync only copies rows last changed more than this long before it started, and the next
+# sync picks up from there; rows written by a transaction that commits within the lag are
+# therefore never skipped
+DEFAULT_SYNC_LAG = 60  # seconds
+
+
+# Reviews embedded, newest first, in each product's review summary
+RECENT_REVIEWS = 5
+
+
+def _money(value):
+    return float(value) if value is not None else None  # Convert Decimal to float
+
+def user_doc(row, orders, reviews):
+    order_count, total_spent = orders[0][1:] if orders else (0, 0)
+    review_count, avg_rating = reviews[0][1:] if reviews else (0, None)
+    return {
+        "_id": row[0],
+        "name": row[1],
+        "email": row[2],
+        "signup_source": row[3],
+        "stats": {
+            "order_count": order_count,
+            "total_spent": _money(total_spent),
+            "review_count": review_count,
+            "avg_rating": _money(avg_rating)
         }
-        mongo_users.insert_one(user_doc)
-    logger.info(f"Successfully migrated {len(users)} users to MongoDB")
+    }
 
-def migrate_products(pg_conn, mongo_db):
-    logger.info("Starting product migration...")
-    cur = pg_conn.cursor()
-    cur.execute("SELECT product_id, name, category, price, created_at, is_active FROM products")
-    products = cur.fetchall()
-    logger.info(f"Found {len(products)} products in PostgreSQL")
-    
-    mongo_products = mongo_db.products
-    mongo_products.delete_many({})  # Clear existing data
-    logger.info("Cleared existing MongoDB products collection")
-    
-    for product in products:
-        product_doc = {
-            "_id": product[0],
-            "name": product[1],
-            "category": product[2],
-            "price": float(product[3]),  # Convert Decimal to float
-            "created_at": product[4],
-            "is_active": product[5]
+def product_doc(row, reviews):
+    ratings = [review[3] for review in reviews if review[3] is not None]
+    return {
+        "_id": row[0],
+        "name": row[1],
+        "category": row[2],
+        "price": float(row[3]),  # Convert Decimal to float
+        "created_at": row[4],
+        "is_active": row[5],
+        "review_summary": {
+            "count": len(reviews),
+            "avg_rating": round(sum(ratings) / len(ratings), 2) if ratings else None,
+            "ratings": {str(r): ratings.count(r) for r in range(1, 6)},
+            "recent": [{
+                "review_id": review[1],
+                "user_id": review[2],
+                "rating": review[3],
+                "comment": review[4],
+                "review_date": review[5]
+            } for review in reviews[:RECENT_REVIEWS]]
         }
-        mongo_products.insert_one(product_doc)
-    logger.info(f"Successfully migrated {len(products)} products to MongoDB")
+    }
+
+def order_doc(row, items):
+    return {
+        "_id": row[0],
+        "user_id": row[1],
+        "user_name": row[2],  # snapshot at migration time, so listing orders needs no users lookup
+        "order_date": row[3],
+        "status": row[4],
+        "total_amount": _money(row[5]),
+        "items": [{
+            "order_item_id": item[1],
+            "product_id": item[2],
+            "quantity": item[3],
+            "unit_price": _money(item[4])
+        } for item in items]
+    }
+
+def review_doc(row):
+    return {
+        "_id": row[0],
+        "user_id": row[1],
+        "product_id": row[2],
+        "rating": row[3],
+        "comment": row[4],
+        "review_date": row[5]
+    }
+
+def cart_doc(row, items):
+    return {
+        "_id": row[0],
+        "user_id": row[1],
+        "created_at": row[2],
+        "status": row[3],
+        "items": [{
+            "cart_item_id": item[1],
+            "product_id": item[2],
+            "added_at": item[3],
+            "removed_at": item[4]
+        } for item in items]
+    }
+
+
+class Embed:
+    """Child rows merged into each parent document.
+
+    `query` has a {where} placeholder for the parent-key filter and returns
+    rows whose first column is the parent key, sorted on it, so they can be
+    merged with the parent rows in a single pass.
+    """
+
+    def __init__(self, key, query):
+        self.key = key
+        self.query = query
+
+
+class TableMigration:
+    """How one Postgres table becomes one MongoDB collection.
+
+    to_doc gets the row plus, for each embed, the list of child rows that
+    belong to it. `source` may join lookup tables onto `table`, so columns
+    and conditions are qualified with the table name.
+    """
+
+    def __init__(self, table, collection, key, columns, to_doc, indexes=(), source=None, embeds=()):
+        self.table = table
+        self.collection = collection
+        self.key = key            # primary key column: shard boundaries and sync checkpoints
+        self.columns = columns
+        self.to_doc = to_doc
+        self.indexes = indexes
+        self.source = source or table
+        self.embeds = embeds
+
+    def select(self, where="", extra_columns=""):
+        return f"SELECT {self.columns}{extra_columns} FROM {self.source} {where}"
+
+
+MIGRATIONS = [
+    TableMigration("users", "users", "user_id",
+                   "users.user_id, users.name, users.email, users.signup_source",
+                   user_doc, indexes=["email", [("stats.total_spent", -1)]],
+                   embeds=[
+                       Embed("user_id", "SELECT user_id, COUNT(*), SUM(total_amount) FROM orders {where} "
+                                        "GROUP BY user_id ORDER BY user_id"),
+                       Embed("user_id", "SELECT user_id, COUNT(*), AVG(rating) FROM reviews {where} "
+                                        "GROUP BY user_id ORDER BY user_id"),
+                   ]),
+    TableMigration("products", "products", "product_id",
+                   "products.product_id, products.name, products.category, products.price, "
+                   "products.created_at, products.is_active",
+                   product_doc, indexes=["category", [("review_summary.avg_rating", -1)]],
+                   embeds=[
+                       Embed("product_id", "SELECT product_id, review_id, user_id, rating, comment, review_date "
+                                           "FROM reviews {where} ORDER BY product_id, review_date DESC"),
+                   ]),
+    TableMigration("orders", "orders", "order_id",
+                   "orders.order_id, orders.user_id, users.name, orders.order_date, orders.status, "
+                   "orders.total_amount",
+                   order_doc, indexes=["user_id", "order_date"],
+                   source="orders LEFT JOIN users ON users.user_id = orders.user_id",
+                   embeds=[
+                       Embed("order_id", "SELECT order_id, order_item_id, product_id, quantity, unit_price "
+                                         "FROM order_items {where} ORDER BY order_id"),
+                   ]),
+    TableMigration("reviews", "reviews", "review_id",
+                   "reviews.review_id, reviews.user_id, reviews.product_id, reviews.rating, "
+                   "reviews.comment, reviews.review_date",
+                   review_doc, indexes=[[("product_id", 1), ("rating", 1)]]),
+    TableMigration("carts", "carts", "cart_id",
+                   "carts.cart_id, carts.user_id, carts.created_at, carts.status",
+                   cart_doc, indexes=["user_id"],
+                   embeds=[
+                       Embed("cart_id", "SELECT cart_id, cart_item_id, product_id, added_at, removed_at "
+                                        "FROM cart_items {where} ORDER BY cart_id"),
+                   ]),
+]
+
+
+MIGRATIONS_BY_TABLE = {m.table: m for m in MIGRATIONS}
+
+# Rows sampled to pick the key boundaries of the parallel mode's shards
+SHARD_SAMPLE_ROWS = 100000
+SHARDS_PER_WORKER = 4
+
+
+def merge_join(rows, *children):
+    """Yield (row, [child rows of each stream]) for each row.
+
+    `rows` and every child stream are sorted on their first column, so one
+    forward pass over each pairs them up; child rows without a parent are skipped.
+    """
+    streams = [iter(child) for child in children]
+    heads = [next(stream, None) for stream in streams]
+    for row in rows:
+        groups = []
+        for i, stream in enumerate(streams):
+            while heads[i] is not None and heads[i][0] < row[0]:
+                heads[i] = next(stream, None)
+            group = []
+            while heads[i] is not None and heads[i][0] == row[0]:
+                group.append(heads[i])
+                heads[i] = next(stream, None)
+            groups.append(group)
+        yield row, groups
+
+def _key_range(column, lower, upper):
+    """WHERE clause and parameters for lower <= column < upper; either bound may be None.
+
+    NULL keys are left out: they have no parent, and merge_join cannot compare them.
+    """
+    conditions, params = [f"{column} IS NOT NULL"], []
+    if lower is not None:
+        conditions.append(f"{column} >= %s")
+        params.append(lower)
+    if upper is not None:
+        conditions.append(f"{column} < %s")
+        params.append(upper)
+    return "WHERE " + " AND ".join(conditions), params
+
+def _write_batch(collection, batch, stages):
+    start = time.perf_counter()
+    collection.insert_many(batch, ordered=False)
+    stages["write"] += time.perf_counter() - start
+    return len(batch)
+
+def copy_rows(pg_conn, collection, migration, batch_size, key_range=(None, None), stages=None):
+    """Stream the rows with lower <= key < upper into `collection`; returns the row count.
+
+    The parent rows and each embed's child rows come through their own named
+    (server-side) cursor sorted on the parent key and are merge-joined as they
+    arrive, so no row is looked up individually and memory holds one batch of
+    documents however large the tables are. Each batch is written with one
+    unordered insert_many. The caller ends the transaction.
+
+    If given, `stages` accumulates the seconds spent reading from Postgres
+    ("read"), building documents ("transform") and writing them ("write").
+    """
+    stages = stages if stages is not None else {}
+    for stage in ("read", "transform", "write"):
+        stages.setdefault(stage, 0.0)
+    lower, upper = key_range
+    where, params = _key_range(f"{migration.table}.{migration.key}", lower, upper)
+    cursors = [pg_conn.cursor(name=f"migrate_{migration.table}")]
+    cursors[0].execute(migration.select(where) + f" ORDER BY {migration.table}.{migration.key}", params)
+    for i, embed in enumerate(migration.embeds):
+        cur = pg_conn.cursor(name=f"migrate_{migration.table}_embed_{i}")
+        child_where, child_params = _key_range(embed.key, lower, upper)
+        cur.execute(embed.query.format(where=child_where), child_params)
+        cursors.append(cur)
+    for cur in cursors:
+        cur.itersize = batch_size
+
+    rows, batch = 0, []
+    joined = merge_join(*cursors)
+    clock = time.perf_counter
+    try:
+        while True:
+            t0 = clock()
+            item = next(joined, None)
+            t1 = clock()
+            stages["read"] += t1 - t0
+            if item is None:
+                break
+            batch.append(migration.to_doc(item[0], *item[1]))
+            stages["transform"] += clock() - t1
+            if len(batch) == batch_size:
+                rows += _write_batch(collection, batch, stages)
+                batch = []
+        if batch:
+            rows += _write_batch(collection, batch, stages)
+    finally:
+        for cur in cursors:
+            cur.close()
+    return rows
+
+def migrate_table(pg_conn, mongo_db, migration, batch_size=DEFAULT_BATCH_SIZE, sync_lag=DEFAULT_SYNC_LAG,
+                  stages=None):
+    """Stream one table into its collection and return (rows, seconds); see copy_rows for `stages`"""
+    logger.info(f"Starting {migration.table} migration...")
+    start = time.perf_counter()
+    collection = mongo_db[migration.collection]
+    collection.drop()  # Clear existing data (indexes are rebuilt after the load)
+    logger.info(f"Cleared existing MongoDB {migration.collection} collection")
+
+    cutoff = sync_cutoff(pg_conn, sync_lag)
+    rows = copy_rows(pg_conn, collection, migration, batch_size, stages=stages)
+    pg_conn.commit()
+    save_checkpoint(mongo_db, migration.table, cutoff)
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Successfully migrated {rows} {migration.table} to MongoDB "
+                f"({rows / elapsed if elapsed else 0:,.0f} rows/sec)")
+    return rows, elapsed
+
+# === Parallel mode ===
 
-def migrate_orders(pg_conn, mongo_db):
-    logger.info("Starting order migration...")
+def key_ranges(pg_conn, migration, shards):
+    """Split the table's key space into `shards` [lower, upper) ranges of about equal row count.
+
+    Boundaries are quantiles of a Bernoulli sample of the keys, so the split
+    follows the real key distribution (random or time-ordered UUIDs alike).
+    The first and last ranges are open-ended, so every row falls in exactly one.
+    """
+    if shards <= 1:
+        return [(None, None)]
     cur = pg_conn.cursor()
     cur.execute("""
-        SELECT o.order_id, o.user_id, o.order_date, o.status, o.total_amount
-        FROM orders o
-    """)
-    orders = cur.fetchall()
-    logger.info(f"Found {len(orders)} orders in PostgreSQL")
-    
-    mongo_orders = mongo_db.orders
-    mongo_orders.delete_many({})  # Clear existing data
-    logger.info("Cleared existing MongoDB orders collection")
-    
-    for order in orders:
-        order_doc = {
-            "_id": order[0],
-            "user_id": order[1],
-            "order_date": order[2],
-            "status": order[3],
-            "total_amount": float(order[4])  # Convert Decimal to float
-        }
-        mongo_orders.insert_one(order_doc)
-    logger.info(f"Successfully migrated {len(orders)} orders to MongoDB")
+        SELECT COALESCE(SUM(reltuples) FILTER (WHERE reltuples > 0), 0)
+        FROM pg_class
+        WHERE oid = %s::regclass OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)
+    """, (migration.table, migration.table))
+    estimated_rows = cur.fetchone()[0]
+    percent = min(100.0, 100.0 * SHARD_SAMPLE_ROWS / max(estimated_rows, 1))
+    cur.execute(f"""
+        SELECT (percentile_disc(%s::float8[]) WITHIN GROUP (ORDER BY {migration.key}))::text[]
+        FROM {migration.table} TABLESAMPLE BERNOULLI (%s)
+    """, ([i / shards for i in range(1, shards)], percent))
+    boundaries = sorted(set(b for b in (cur.fetchone()[0] or []) if b is not None))
+    cur.close()
+    edges = [None, *boundaries, None]
+    return list(zip(edges[:-1], edges[1:]))
+
+_worker = {}
 
-def migrate_reviews(pg_conn, mongo_db):
-    logger.info("Starting review migration...")
+def _init_worker(snapshot_id):
+    """Give each worker process its own Postgres and MongoDB connections"""
+    _worker["pg_conn"] = get_postgres_connection()
+    _worker["pg_conn"].set_session(isolation_level="REPEATABLE READ", readonly=True)
+    _worker["mongo_db"] = get_mongo_connection()
+    _worker["snapshot_id"] = snapshot_id
+
+def _migrate_shard(task):
+    table, lower, upper, batch_size = task
+    migration = MIGRATIONS_BY_TABLE[table]
+    pg_conn = _worker["pg_conn"]
+    start = time.perf_counter()
     cur = pg_conn.cursor()
-    cur.execute("""
-        SELECT review_id, user_id, product_id, rating, comment, review_date
-        FROM reviews
-    """)
-    reviews = cur.fetchall()
-    logger.info(f"Found {len(reviews)} reviews in PostgreSQL")
-    
-    mongo_reviews = mongo_db.reviews
-    mongo_reviews.delete_many({})  # Clear existing data
-    logger.info("Cleared existing MongoDB reviews collection")
-    
-    for review in reviews:
-        review_doc = {
-            "_id": review[0],
-            "user_id": review[1],
-            "product_id": review[2],
-            "rating": review[3],
-            "comment": review[4],
-            "review_date": review[5]
-        }
-        mongo_reviews.insert_one(review_doc)
-    logger.info(f"Successfully migrated {len(reviews)} reviews to MongoDB")
+    # Every shard reads the coordinator's snapshot, so the shards add up to one consistent copy
+    cur.execute("SET TRANSACTION SNAPSHOT %s", (_worker["snapshot_id"],))
+    cur.close()
+    try:
+        rows = copy_rows(pg_conn, _worker["mongo_db"][migration.collection], migration, batch_size, (lower, upper))
+    finally:
+        pg_conn.rollback()
+    return table, rows, time.perf_counter() - start
+
+def migrate_parallel(pg_conn, mongo_db, migrations, workers, batch_size=DEFAULT_BATCH_SIZE,
+                     sync_lag=DEFAULT_SYNC_LAG):
+    """Migrate `migrations` with a pool of `workers` processes, each copying one key range at a time.
 
-def migrate_carts(pg_conn, mongo_db):
-    logger.info("Starting cart migration...")
+    Returns {table: (rows, shards, worker_seconds)}. Indexes are left to the
+    caller, to be built once every shard has finished.
+    """
+    # The exported snapshot stays importable while this transaction is open
+    pg_conn.rollback()
+    pg_conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
     cur = pg_conn.cursor()
-    cur.execute("""
-        SELECT cart_id, user_id, created_at, status
-        FROM carts
-    """)
-    carts = cur.fetchall()
-    logger.info(f"Found {len(carts)} carts in PostgreSQL")
-    
-    mongo_carts = mongo_db.carts
-    mongo_carts.delete_many({})  # Clear existing data
-    logger.info("Cleared existing MongoDB carts collection")
-    
-    for cart in carts:
-        cart_doc = {
-            "_id": cart[0],
-            "user_id": cart[1],
-            "created_at": cart[2],
-            "status": cart[3]
-        }
-        mongo_carts.insert_one(cart_doc)
-    logger.info(f"Successfully migrated {len(carts)} carts to MongoDB")
+    cur.execute("SELECT pg_export_snapshot()")
+    snapshot_id = cur.fetchone()[0]
+    cur.close()
+    cutoff = sync_cutoff(pg_conn, sync_lag)
+    try:
+        tasks = []
+        for migration in migrations:
+            mongo_db[migration.collection].drop()
+            ranges = key_ranges(pg_conn, migration, workers * SHARDS_PER_WORKER)
+            tasks.extend((migration.table, lower, upper, batch_size) for lower, upper in ranges)
+        logger.info(f"Migrating {len(tasks)} shards with {workers} workers...")
+
+        totals = {m.table: [0, 0, 0.0] for m in migrations}
+        shard_counts = {m.table: sum(1 for task in tasks if task[0] == m.table) for m in migrations}
+        start = time.perf_counter()
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(snapshot_id,)) as pool:
+            for done, (table, rows, seconds) in enumerate(pool.imap_unordered(_migrate_shard, tasks), 1):
+                totals[table][0] += rows
+                totals[table][1] += 1
+                totals[table][2] += seconds
+                all_rows = sum(t[0] for t in totals.values())
+                elapsed = time.perf_counter() - start
+                logger.info(f"[{done}/{len(tasks)}] {table}: {totals[table][1]}/{shard_counts[table]} shards, "
+                            f"{totals[table][0]:,} rows | all tables: {all_rows:,} rows, {all_rows / elapsed:,.0f} rows/sec")
+        for migration in migrations:
+            save_checkpoint(mongo_db, migration.table, cutoff)
+        return {table: tuple(t) for table, t in totals.items()}
+    finally:
+        pg_conn.rollback()
+        pg_conn.set_session(isolation_level="DEFAULT", readonly="DEFAULT")
+
+# === Incremental sync ===
+
+def sync_cutoff(pg_conn, lag):
+    """The time `lag` seconds before the current transaction started, in updated_at's terms"""
+    cur = pg_conn.cursor()
+    cur.execute("SELECT LOCALTIMESTAMP - make_interval(secs => %s)", (lag,))
+    cutoff = cur.fetchone()[0]
+    cur.close()
+    return cutoff
+
+def save_checkpoint(mongo_db, table, high_water, last_key=None):
+    """Everything up to (high_water, last_key) is in MongoDB; last_key None means up to but excluding high_water.
+
+    MongoDB stores milliseconds, so high_water rounds down and a resumed sync
+    may upsert a few rows a second time, never skip one.
+    """
+    mongo_db[CHECKPOINT_COLLECTION].replace_one(
+        {"_id": table},
+        {"_id": table, "high_water": high_water, "last_key": last_key, "saved_at": datetime.now()},
+        upsert=True,
+    )
+
+def _changed_docs(pg_conn, migration, batch):
+    """Documents for a batch of changed rows, with their embeds read for just those keys"""
+    batch = sorted(batch, key=lambda row: row[0])
+    keys = [row[0] for row in batch]
+    children = []
+    cur = pg_conn.cursor()
+    for embed in migration.embeds:
+        cur.execute(embed.query.format(where=f"WHERE {embed.key} = ANY(%s::uuid[])"), (keys,))
+        children.append(cur.fetchall())
+    cur.close()
+    return [migration.to_doc(row, *groups) for row, groups in merge_join(batch, *children)]
+
+def sync_table(pg_conn, mongo_db, migration, batch_size=DEFAULT_BATCH_SIZE, sync_lag=DEFAULT_SYNC_LAG):
+    """Upsert the rows changed since the table's checkpoint and return (rows, seconds).
+
+    Rows are read in (updated_at, primary key) order and the checkpoint moves
+    to the last row of every batch written, so an interrupted sync resumes
+    where it stopped. Without a checkpoint the whole table is upserted.
+    Deleted rows are not propagated; a full migration removes them.
+    """
+    logger.info(f"Syncing {migration.table}...")
+    start = time.perf_counter()
+    checkpoint = mongo_db[CHECKPOINT_COLLECTION].find_one({"_id": migration.table})
+    cutoff = sync_cutoff(pg_conn, sync_lag)
+
+    updated_at, key = f"{migration.table}.updated_at", f"{migration.table}.{migration.key}"
+    conditions, params = [f"{updated_at} < %s"], [cutoff]
+    if checkpoint is not None and checkpoint["last_key"] is None:
+        conditions.append(f"{updated_at} >= %s")
+        params.append(checkpoint["high_water"])
+    elif checkpoint is not None:
+        conditions.append(f"({updated_at}, {key}) > (%s, %s)")
+        params += [checkpoint["high_water"], checkpoint["last_key"]]
+    query = migration.select("WHERE " + " AND ".join(conditions), f", {updated_at}") + f" ORDER BY {updated_at}, {key}"
+
+    collection = mongo_db[migration.collection]
+    rows = 0
+    with pg_conn.cursor(name=f"sync_{migration.table}") as cur:
+        cur.itersize = batch_size
+        cur.execute(query, params)
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            collection.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True)
+                                   for doc in _changed_docs(pg_conn, migration, batch)], ordered=False)
+            rows += len(batch)
+            save_checkpoint(mongo_db, migration.table, batch[-1][-1], batch[-1][0])
+    pg_conn.commit()
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Synced {rows} changed {migration.table} rows to MongoDB in {elapsed:.2f}s")
+    return rows, elapsed
+
+def create_indexes(mongo_db, migrations):
+    for migration in migrations:
+        for index in migration.indexes:
+            mongo_db[migration.collection].create_index(index)
 
 def main():
+    parser = argparse.ArgumentParser(description="Copy the PostgreSQL tables into MongoDB")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="rows per Postgres fetch and per MongoDB insert_many")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes; above 1, tables are split into key ranges migrated in parallel")
+    parser.add_argument("--sync", action="store_true",
+                        help="only upsert rows changed since the last migration or sync")
+    parser.add_argument("--sync-lag", type=float, default=DEFAULT_SYNC_LAG,
+                        help="seconds of recent changes a sync leaves to the next one")
+    parser.add_argument("--tables", nargs="+", choices=[m.table for m in MIGRATIONS],
+                        default=[m.table for m in MIGRATIONS], help="tables to migrate")
+    args = parser.parse_args()
+    if args.sync and args.workers > 1:
+        parser.error("--sync runs with a single worker")
+    migrations = [m for m in MIGRATIONS if m.table in args.tables]
+
     # Check MongoDB connection first
     if not check_mongodb_connection():
         sys.exit(1)
@@ -180,33 +543,40 @@ def main():
     pg_conn = None
     try:
         pg_conn = get_postgres_connection()
+        # One snapshot per table, so embedded child rows always match their parents
+        pg_conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
         mongo_db = get_mongo_connection()
         
         logger.info("Starting migration process...")
         
-        migrate_users(pg_conn, mongo_db)
-        migrate_products(pg_conn, mongo_db)
-        migrate_orders(pg_conn, mongo_db)
-        migrate_reviews(pg_conn, mongo_db)
-        migrate_carts(pg_conn, mongo_db)
+        results = []
+        if args.sync:
+            for migration in migrations:
+                rows, elapsed = sync_table(pg_conn, mongo_db, migration, args.batch_size, args.sync_lag)
+                results.append([migration.collection, rows, f"{elapsed:.2f}", f"{rows / elapsed if elapsed else 0:,.0f}"])
+        elif args.workers > 1:
+            totals = migrate_parallel(pg_conn, mongo_db, migrations, args.workers, args.batch_size, args.sync_lag)
+            for migration in migrations:
+                rows, shards, worker_seconds = totals[migration.table]
+                results.append([migration.collection, rows, f"{worker_seconds:.2f} ({shards} shards)",
+                                f"{rows / worker_seconds if worker_seconds else 0:,.0f}"])
+        else:
+            for migration in migrations:
+                rows, elapsed = migrate_table(pg_conn, mongo_db, migration, args.batch_size, args.sync_lag)
+                results.append([migration.collection, rows, f"{elapsed:.2f}", f"{rows / elapsed if elapsed else 0:,.0f}"])
         
-        # Create indexes
+        # Create indexes once every collection is fully loaded
         print("\nCreating indexes...")
-        mongo_db.users.create_index("email")
-        mongo_db.products.create_index("category")
-        mongo_db.orders.create_index("user_id")
-        mongo_db.orders.create_index("order_date")
-        mongo_db.reviews.create_index([("product_id", 1), ("rating", 1)])
-        mongo_db.carts.create_index("user_id")
+        create_indexes(mongo_db, migrations)
         
         # Verify data
         print("\nVerification:")
-        print(f"Users: {mongo_db.users.count_documents({})}")
-        print(f"Products: {mongo_db.products.count_documents({})}")
-        print(f"Orders: {mongo_db.orders.count_documents({})}")
-        print(f"Reviews: {mongo_db.reviews.count_documents({})}")
-        print(f"Carts: {mongo_db.carts.count_documents({})}")
+        for migration in migrations:
+            print(f"{migration.collection.capitalize()}: {mongo_db[migration.collection].count_documents({})}")
         
+        print()
+        # In parallel mode the seconds are summed over workers, so rows/sec is per worker
+        print(tabulate(results, headers=["Collection", "Rows", "Seconds", "Rows/sec"], tablefmt="grid"))
         print(f"\nMigration completed in {time.time() - start_time:.2f} seconds")
         
         logger.info("Migration completed successfully!")
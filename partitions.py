@@ -0,0 +1,122 @@
+import argparse
+import os
+import re
+import sys
+from datetime import date
+
+import psycopg2
+from tabulate import tabulate
+
+# Appended rather than put first: app/ has its own generate_data.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+
+from partition_maintainer import PARTITIONED_TABLES, ensure_partitions  # noqa: E402
+
+# Database connection settings
+DB_CONFIG = {
+    "dbname": "postgres",
+    "user": "carterrobinson",
+    "password": "",
+    "host": "localhost",
+    "port": "5432"
+}
+
+BOUNDS = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def connect_db():
+    return psycopg2.connect(**DB_CONFIG)
+
+
+def list_partitions(conn, table):
+    """(partition, from, to, estimated rows, size) for each partition of `table`, oldest first"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint,
+               pg_size_pretty(pg_total_relation_size(c.oid))
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, (table,))
+    partitions = []
+    for name, bound, rows, size in cur.fetchall():
+        match = BOUNDS.search(bound)
+        if match:
+            partitions.append((name, match.group(1)[:10], match.group(2)[:10], max(rows, 0), size))
+    cur.close()
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def archive_partitions(conn, keep_months, archive_schema="archive", drop=False):
+    """Detach every partition whose whole month is older than `keep_months` months ago.
+
+    Detached partitions are moved to `archive_schema` (or dropped with
+    drop=True); they no longer show up in any query against the parent.
+    Returns the partitions archived.
+    """
+    today = date.today()
+    months = today.year * 12 + today.month - 1 - keep_months
+    cutoff = date(months // 12, months % 12 + 1, 1).isoformat()
+
+    conn.autocommit = True    # DETACH ... CONCURRENTLY cannot run inside a transaction
+    cur = conn.cursor()
+    try:
+        if not drop:
+            cur.execute(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}")
+        archived = []
+        for table in PARTITIONED_TABLES:
+            for name, _, upper, _, _ in list_partitions(conn, table):
+                if upper > cutoff:
+                    continue
+                print(f"📦 Detaching {name}...")
+                cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name} CONCURRENTLY")
+                # A detached order_items partition keeps its foreign key to orders, which would
+                # stop the matching orders partition from being detached next
+                cur.execute("""
+                    SELECT conname FROM pg_constraint
+                    WHERE conrelid = %s::regclass AND contype = 'f' AND confrelid = 'orders'::regclass
+                """, (name,))
+                for (constraint,) in cur.fetchall():
+                    cur.execute(f"ALTER TABLE {name} DROP CONSTRAINT {constraint}")
+                if drop:
+                    cur.execute(f"DROP TABLE {name}")
+                else:
+                    cur.execute(f"ALTER TABLE {name} SET SCHEMA {archive_schema}")
+                archived.append(name)
+        return archived
+    finally:
+        cur.close()
+        conn.autocommit = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of orders, order_items and sessions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ensure = subparsers.add_parser("ensure", help="create partitions for the coming months")
+    ensure.add_argument("--ahead", type=int, default=3, help="months ahead to cover")
+    subparsers.add_parser("list", help="list partitions with their ranges and sizes")
+    archive = subparsers.add_parser("archive", help="detach partitions older than --keep-months")
+    archive.add_argument("--keep-months", type=int, required=True)
+    archive.add_argument("--schema", default="archive", help="schema the detached partitions move to")
+    archive.add_argument("--drop", action="store_true", help="drop detached partitions instead of keeping them")
+    args = parser.parse_args()
+
+    conn = connect_db()
+    try:
+        if args.command == "ensure":
+            print(f"✅ Created {ensure_partitions(conn, args.ahead)} partition(s)")
+        elif args.command == "list":
+            rows = [[table, *p] for table in PARTITIONED_TABLES for p in list_partitions(conn, table)]
+            print(tabulate(rows, headers=["Table", "Partition", "From", "To", "Rows (est.)", "Size"], tablefmt="grid"))
+        else:
+            archived = archive_partitions(conn, args.keep_months, args.schema, args.drop)
+            print(f"🎉 Archived {len(archived)} partition(s)")
+    except Exception as e:
+        print(f"❌ Partition maintenance failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,14 +13,16 @@ LIMIT 10;
 
 
 -- Top Selling Products This Quarter
+-- A plain range on the partition key (rather than DATE_TRUNC(order_date)) lets the planner
+-- prune order_items down to this quarter's three monthly partitions
 SELECT 
     p.product_id,
     p.name,
     SUM(oi.quantity) AS total_units_sold
 FROM order_items oi
-JOIN orders o ON oi.order_id = o.order_id
 JOIN products p ON oi.product_id = p.product_id
-WHERE DATE_TRUNC('quarter', o.order_date) = DATE_TRUNC('quarter', CURRENT_DATE)
+WHERE oi.order_date >= DATE_TRUNC('quarter', CURRENT_DATE)
+  AND oi.order_date < DATE_TRUNC('quarter', CURRENT_DATE) + INTERVAL '3 months'
 GROUP BY p.product_id, p.name
 ORDER BY total_units_sold DESC
 LIMIT 10;
@@ -0,0 +1,182 @@
+"""Every SQL statement the app issues while serving requests, with parameters to run it.
+
+Statements the app keeps in module constants (checkout, catalog pages, the
+overview snapshot, the customer behavior analyses) are imported from app/, so
+they cannot drift; the ones written inline in app/app.py routes are repeated
+here and have to be kept in step with it. Background maintenance (matview
+refreshes, the affinity and sampler loads) is left out.
+
+Writes are flagged: whoever runs them does so in a transaction it rolls back.
+"""
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+
+from behavior import UNITS as BEHAVIOR_UNITS  # noqa: E402
+from catalog import CATALOG_PAGE_SIZE, SORTS, _query as catalog_query  # noqa: E402
+from ids import new_id  # noqa: E402
+from orders import CHECKOUT_SQL  # noqa: E402
+from overview import OVERVIEW_SQL  # noqa: E402
+
+
+class Query:
+    """One statement: `params(ctx)` builds its parameters from sample_context()"""
+
+    def __init__(self, name, route, sql, params=None, writes=False, dashboard=False):
+        self.name = name
+        self.route = route
+        self.sql = sql
+        self.params = params or (lambda ctx: None)
+        self.writes = writes
+        self.dashboard = dashboard
+
+
+def sample_context(conn):
+    """Real ids (a user, a product, a cart with items if any) and a second-page cursor per catalog sort"""
+    cur = conn.cursor()
+    cur.execute("SELECT user_id FROM users LIMIT 1")
+    user_id = cur.fetchone()[0]
+    cur.execute("SELECT product_id FROM products WHERE is_active = TRUE LIMIT 1")
+    product_id = cur.fetchone()[0]
+    cur.execute("SELECT cart_id FROM cart_items WHERE removed_at IS NULL LIMIT 1")
+    cart = cur.fetchone()
+    ctx = {"user_id": user_id, "product_id": product_id, "cart_id": cart[0] if cart else None, "after": {}}
+    for sort in SORTS:
+        # The last row of the first page, or the first row of a catalog shorter than a page
+        cur.execute(catalog_query(sort, None) + " OFFSET %s LIMIT 1", (CATALOG_PAGE_SIZE - 1,))
+        row = cur.fetchone()
+        if row is None:
+            cur.execute(catalog_query(sort, None) + " LIMIT 1")
+            row = cur.fetchone()
+        ctx["after"][sort] = (row[4], row[0])
+    cur.close()
+    return ctx
+
+
+def _catalog_queries():
+    queries = []
+    for sort in SORTS:
+        queries.append(Query(f"catalog_{sort}", "/products", catalog_query(sort, None) + " LIMIT %s;",
+                             lambda ctx: (CATALOG_PAGE_SIZE + 1,)))
+        queries.append(Query(f"catalog_{sort}_next_page", "/products", catalog_query(sort, ("", "")) + " LIMIT %s;",
+                             lambda ctx, sort=sort: (*ctx["after"][sort], CATALOG_PAGE_SIZE + 1)))
+    return queries
+
+
+QUERIES = [
+    *_catalog_queries(),
+    Query("cart_contents", "/cart", """
+        SELECT p.product_id, p.name, p.price
+        FROM cart_items ci
+        JOIN products p ON ci.product_id = p.product_id
+        WHERE ci.cart_id = %s
+        AND ci.removed_at IS NULL
+    """, lambda ctx: (ctx["cart_id"],)),
+    Query("top_rated", "/top-rated", """
+        SELECT p.name, rs.avg_rating, rs.rating_count as num_reviews
+        FROM product_rating_stats rs
+        JOIN products p ON p.product_id = rs.product_id
+        WHERE p.is_active = TRUE AND rs.rating_count > 0
+        ORDER BY rs.avg_rating DESC NULLS LAST, rs.rating_count DESC
+        LIMIT 10;
+    """, dashboard=True),
+    Query("top_selling", "/top-selling", """
+        SELECT p.name, ss.order_count as total_orders, ss.units_sold as total_quantity, ss.revenue as total_revenue
+        FROM product_sales_stats ss
+        JOIN products p ON p.product_id = ss.product_id
+        WHERE ss.units_sold > 0
+        ORDER BY ss.units_sold DESC
+        LIMIT 10;
+    """, dashboard=True),
+    Query("repeat_customers", "/repeat-customers", """
+        SELECT month_text, repeat_customers
+        FROM mv_repeat_customers
+        ORDER BY month;
+    """, dashboard=True),
+    Query("matview_refresh_status", "/repeat-customers",
+          "SELECT refreshed_at, duration_ms FROM matview_refreshes WHERE view_name = %s",
+          lambda ctx: ("mv_repeat_customers",)),
+    Query("abandoned", "/abandoned", """
+        SELECT p.name, COUNT(ci.cart_id) as abandoned_count
+        FROM products p
+        JOIN cart_items ci ON p.product_id = ci.product_id
+        JOIN carts c ON ci.cart_id = c.cart_id
+        WHERE c.status = 'abandoned'
+        GROUP BY p.product_id
+        ORDER BY abandoned_count DESC
+        LIMIT 10;
+    """, dashboard=True),
+    Query("product_affinity", "/product_affinity", """
+        SELECT product1_name, product2_name, times_bought_together, affinity_percentage
+        FROM mv_product_affinity
+        ORDER BY times_bought_together DESC
+        LIMIT 10;
+    """, dashboard=True),
+    Query("data_overview", "/data-overview", OVERVIEW_SQL, dashboard=True),
+    *[Query(f"behavior_{unit.name}", "/customer-behavior", unit.sql, dashboard=True) for unit in BEHAVIOR_UNITS],
+    Query("visualization_users", "/database-visualization",
+          "SELECT user_id, name, email, signup_source FROM users LIMIT 5"),
+    Query("visualization_products", "/database-visualization",
+          "SELECT product_id, name, category, price FROM products LIMIT 5"),
+    Query("visualization_orders", "/database-visualization", """
+        SELECT o.order_id, u.name, o.order_date, o.total_amount
+        FROM orders o
+        JOIN users u ON o.user_id = u.user_id
+        LIMIT 5
+    """),
+    Query("visualization_user_count", "/database-visualization", "SELECT COUNT(*) FROM users"),
+    Query("visualization_product_count", "/database-visualization", "SELECT COUNT(*) FROM products"),
+    Query("visualization_order_count", "/database-visualization", "SELECT COUNT(*) FROM orders"),
+    Query("comparison_customers", "/database_comparison", """
+        SELECT u.name, COUNT(o.order_id) as order_count,
+               SUM(o.total_amount) as total_spent,
+               AVG(r.rating) as avg_rating
+        FROM users u
+        LEFT JOIN orders o ON u.user_id = o.user_id
+        LEFT JOIN reviews r ON u.user_id = r.user_id
+        GROUP BY u.name
+        ORDER BY total_spent DESC
+        LIMIT 5
+    """, dashboard=True),
+    Query("comparison_prices", "/database_comparison", """
+        SELECT COUNT(*) as total_products,
+               AVG(price) as avg_price,
+               MIN(price) as min_price,
+               MAX(price) as max_price
+        FROM products
+    """),
+    Query("sample_user", "(user sampler fallback)",
+          "SELECT user_id FROM users TABLESAMPLE SYSTEM (1) LIMIT 1;"),
+    Query("create_cart", "/add_to_cart", """
+        INSERT INTO carts (cart_id, user_id, created_at, status)
+        VALUES (%s, %s, %s, %s)
+    """, lambda ctx: (new_id(), ctx["user_id"], datetime.now(), "active"), writes=True),
+    Query("add_cart_item", "/add_to_cart", """
+        INSERT INTO cart_items (cart_item_id, cart_id, product_id, added_at, removed_at)
+        VALUES (%s, %s, %s, %s, NULL)
+    """, lambda ctx: (new_id(), ctx["cart_id"], ctx["product_id"], datetime.now()), writes=True),
+    Query("insert_review", "/rate", """
+        INSERT INTO reviews (review_id, user_id, product_id, rating, comment, review_date)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, lambda ctx: (new_id(), ctx["user_id"], ctx["product_id"], 5, "Rated from frontend", datetime.now()),
+          writes=True),
+    Query("bump_rating_stats", "/rate", """
+        INSERT INTO product_rating_stats (product_id, rating_sum, rating_count)
+        VALUES (%s, %s, 1)
+        ON CONFLICT (product_id) DO UPDATE
+        SET rating_sum = product_rating_stats.rating_sum + EXCLUDED.rating_sum,
+            rating_count = product_rating_stats.rating_count + 1
+    """, lambda ctx: (ctx["product_id"], 5), writes=True),
+    Query("abandon_cart", "/abandon-cart", """
+        UPDATE carts
+        SET status = 'abandoned'
+        WHERE cart_id = %s
+    """, lambda ctx: (ctx["cart_id"],), writes=True),
+    Query("checkout", "/checkout", CHECKOUT_SQL,
+          lambda ctx: {"cart_id": ctx["cart_id"], "order_id": new_id(), "user_id": ctx["user_id"],
+                       "order_date": datetime.now()}, writes=True),
+]
+
+QUERIES_BY_NAME = {query.name: query for query in QUERIES}
@@ -0,0 +1,111 @@
+import argparse
+import sys
+
+import psycopg2
+from tabulate import tabulate
+
+# Database connection settings
+DB_CONFIG = {
+    "dbname": "postgres",
+    "user": "carterrobinson",
+    "password": "",
+    "host": "localhost",
+    "port": "5432"
+}
+
+# Full recomputes of the rollups, in the same shape as the rollup tables
+RATING_RECOMPUTE = """
+    SELECT product_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count
+    FROM reviews
+    WHERE rating IS NOT NULL
+    GROUP BY product_id
+"""
+
+SALES_RECOMPUTE = """
+    SELECT oi.product_id,
+           SUM(oi.quantity) AS units_sold,
+           SUM(oi.quantity * oi.unit_price) AS revenue,
+           COUNT(oi.order_id) AS order_count
+    FROM order_items oi
+    JOIN orders o ON oi.order_id = o.order_id AND oi.order_date = o.order_date
+    WHERE o.status = 'completed'
+    GROUP BY oi.product_id
+"""
+
+
+def connect_db():
+    return psycopg2.connect(**DB_CONFIG)
+
+
+def backfill(conn):
+    """Rebuild both rollups from scratch in one transaction"""
+    cur = conn.cursor()
+    # SHARE mode lets readers through but holds off reviews/checkouts until the rebuild commits,
+    # so no increment can land between the recompute and the swap
+    cur.execute("LOCK TABLE reviews, orders, order_items IN SHARE MODE")
+    cur.execute("TRUNCATE product_rating_stats, product_sales_stats")
+    cur.execute(f"""
+        INSERT INTO product_rating_stats (product_id, rating_sum, rating_count)
+        {RATING_RECOMPUTE}
+    """)
+    ratings = cur.rowcount
+    cur.execute(f"""
+        INSERT INTO product_sales_stats (product_id, units_sold, revenue, order_count)
+        {SALES_RECOMPUTE}
+    """)
+    sales = cur.rowcount
+    conn.commit()
+    cur.close()
+    return ratings, sales
+
+
+def check(conn):
+    """Compare the rollups with a full recompute; returns the list of mismatches"""
+    cur = conn.cursor()
+    cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+    cur.execute(f"""
+        SELECT 'rating', COALESCE(r.product_id, f.product_id),
+               ARRAY[r.rating_sum, r.rating_count]::numeric[],
+               ARRAY[f.rating_sum, f.rating_count]::numeric[]
+        FROM product_rating_stats r
+        FULL OUTER JOIN ({RATING_RECOMPUTE}) f ON f.product_id = r.product_id
+        WHERE (r.rating_sum, r.rating_count) IS DISTINCT FROM (f.rating_sum, f.rating_count)
+    """)
+    mismatches = cur.fetchall()
+    cur.execute(f"""
+        SELECT 'sales', COALESCE(s.product_id, f.product_id),
+               ARRAY[s.units_sold, s.revenue, s.order_count]::numeric[],
+               ARRAY[f.units_sold, f.revenue, f.order_count]::numeric[]
+        FROM product_sales_stats s
+        FULL OUTER JOIN ({SALES_RECOMPUTE}) f ON f.product_id = s.product_id
+        WHERE (s.units_sold, s.revenue, s.order_count) IS DISTINCT FROM (f.units_sold, f.revenue, f.order_count)
+    """)
+    mismatches += cur.fetchall()
+    conn.rollback()
+    cur.close()
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the product rating/sales rollup tables")
+    parser.add_argument("command", choices=["backfill", "check"])
+    args = parser.parse_args()
+
+    conn = connect_db()
+    try:
+        if args.command == "backfill":
+            ratings, sales = backfill(conn)
+            print(f"✅ Rollups rebuilt: {ratings} rated products, {sales} sold products")
+        else:
+            mismatches = check(conn)
+            if mismatches:
+                print(f"❌ {len(mismatches)} rollup rows differ from a full recompute:")
+                print(tabulate(mismatches, headers=["Rollup", "Product", "Stored", "Recomputed"], tablefmt="grid"))
+                sys.exit(1)
+            print("✅ Rollups match a full recompute")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
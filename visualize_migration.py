@@ -84,16 +84,13 @@ def visualize_data():
         print_table("PostgreSQL Orders", ["ID", "User", "Date", "Total"], pg_orders)
         
         # MongoDB Orders
-        mongo_orders = list(mongo_db.orders.find({}, {"_id": 1, "user_id": 1, "order_date": 1, "total_amount": 1}).limit(5))
-        mongo_orders_data = []
-        for order in mongo_orders:
-            user = mongo_db.users.find_one({"_id": order["user_id"]})
-            mongo_orders_data.append((
-                order["_id"],
-                user["name"] if user else "Unknown",
-                order["order_date"],
-                order["total_amount"]
-            ))
+        mongo_orders = list(mongo_db.orders.find({}, {"_id": 1, "user_name": 1, "order_date": 1, "total_amount": 1}).limit(5))
+        mongo_orders_data = [(
+            order["_id"],
+            order.get("user_name") or "Unknown",
+            order["order_date"],
+            order["total_amount"]
+        ) for order in mongo_orders]
         print_table("MongoDB Orders", ["ID", "User", "Date", "Total"], mongo_orders_data)
         
         # 4. Statistics